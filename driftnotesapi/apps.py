@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DriftnotesapiConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'driftnotesapi'
+
+    def ready(self):
+        # Connect the cache invalidation, search index and SQLite tuning receivers
+        from . import signals  # noqa: F401
@@ -0,0 +1,49 @@
+"""
+Work done after the response has been sent.
+
+Threads here run outside the request, so each closes its own database
+connection when done. Deployments that need retries or several processes can
+call the same functions from a task queue or from cron (see the purge_trips
+command) and turn TRIP_PURGE_IN_BACKGROUND off.
+"""
+
+import logging
+import threading
+from django.db import connection
+from driftnotesapi.models import Trip
+from driftnotesapi.permissions import forget_trip_ids
+
+logger = logging.getLogger(__name__)
+
+
+def purge_deleted_trips(trip_ids=None, batch_size=100):
+    """
+    Purge the soft-deleted trips, or only those among `trip_ids`, `batch_size`
+    trips per transaction. Returns how many were purged.
+    """
+    deleted = Trip.all_objects.filter(deleted_at__isnull=False)
+    if trip_ids is not None:
+        deleted = deleted.filter(pk__in=trip_ids)
+    pending = list(deleted.order_by("pk").values_list("pk", flat=True))
+    for start in range(0, len(pending), batch_size):
+        # Memberships are already gone, but a purge also clears any left by a race
+        for user_id in Trip.purge(*pending[start:start + batch_size]):
+            forget_trip_ids(user_id)
+    return len(pending)
+
+
+def purge_in_background(trip_ids):
+    """Purge soft-deleted trips in a daemon thread"""
+
+    def run():
+        try:
+            purge_deleted_trips(trip_ids)
+        except Exception:
+            # Left marked deleted, so the purge_trips command picks them up later
+            logger.exception("Could not purge trips %s", trip_ids)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=run, name="purge-trips", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,86 @@
+import hashlib
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from driftnotesapi.models import Trip
+
+
+def make_etag(*parts):
+    """Quoted ETag built from the values a response depends on"""
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'"{digest}"'
+
+
+def timestamp(*datetimes):
+    """Latest of the given datetimes as a unix timestamp, None if none are known"""
+    known = [int(value.timestamp()) for value in datetimes if value is not None]
+    return max(known) if known else None
+
+
+def collection_validators(request, trip_ids):
+    """
+    ETag of a list of trips, days or events the user can see.
+
+    Every change to a day or event bumps its trip's revision, so the ids,
+    revisions and update times of the user's trips are enough to tell whether
+    any of those lists changed. Collections carry no Last-Modified, since a trip
+    leaving the list would not move it forward.
+    """
+    versions = list(_trip_versions(trip_ids))
+    return make_etag(request.get_full_path(), versions), None
+
+
+async def acollection_validators(request, trip_ids):
+    """collection_validators() for async views"""
+    versions = [version async for version in _trip_versions(trip_ids)]
+    return make_etag(request.get_full_path(), versions), None
+
+
+def _trip_versions(trip_ids):
+    return (
+        Trip.objects.filter(id__in=trip_ids)
+        .order_by("id")
+        .values_list("id", "revision", "updated_at")
+    )
+
+
+def conditional_response(request, validators, build_response):
+    """
+    Answer a GET with 304 Not Modified when the client's copy is current.
+
+    Method arguments:
+      request -- The full HTTP request object
+      validators -- (etag, last modified timestamp) of the current representation
+      build_response -- Called to serialize the representation when it changed
+    """
+    etag, last_modified = _negotiated(request, validators)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = build_response()
+    return _with_validators(response, etag, last_modified)
+
+
+async def aconditional_response(request, validators, build_response):
+    """conditional_response() for async views, where build_response is a coroutine function"""
+    etag, last_modified = _negotiated(request, validators)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = await build_response()
+    return _with_validators(response, etag, last_modified)
+
+
+def _negotiated(request, validators):
+    etag, last_modified = validators
+    # Each negotiated format (JSON, MessagePack, ...) is a representation of its own
+    renderer = getattr(request, "accepted_renderer", None)
+    if renderer is not None and renderer.format != "json":
+        etag = make_etag(etag, renderer.format)
+    return etag, last_modified
+
+
+def _with_validators(response, etag, last_modified):
+    if 200 <= response.status_code < 300 or response.status_code == 304:
+        response["ETag"] = etag
+        if last_modified is not None:
+            response["Last-Modified"] = http_date(last_modified)
+        patch_vary_headers(response, ("Accept",))
+    return response
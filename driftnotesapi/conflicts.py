@@ -0,0 +1,148 @@
+"""
+Overlapping events within a day.
+
+Events are swept in start time order while tracking the latest end seen so far,
+so a day of n events is checked in O(n log n) (O(n) when the database already
+returns them sorted) instead of comparing every pair. Overlaps are reported as
+clusters: maximal runs of events that overlap one another directly or through
+a chain, which keeps the report linear in the number of events even when many
+of them overlap. An event ending exactly when the next one starts is no conflict.
+
+Create and update check the event they write against the other events of its day
+with one indexed query, and a batch checks every event it writes with one query.
+What happens on a conflict is chosen per request with
+`?conflicts=allow|warn|reject`, defaulting to settings.EVENT_CONFLICTS.
+"""
+
+from django.conf import settings
+from driftnotesapi.models import Event
+
+CONFLICT_MODES = ("allow", "warn", "reject")
+
+
+def conflict_mode(request):
+    """What to do when a written event overlaps another: allow, warn or reject"""
+    mode = request.query_params.get("conflicts") or getattr(settings, "EVENT_CONFLICTS", "allow")
+    return mode if mode in CONFLICT_MODES else "allow"
+
+
+def overlapping_events(event):
+    """Other events of the event's day overlapping it, in start time order"""
+    return list(
+        Event.objects.filter(
+            day_id=event.day_id,
+            start_time__lt=event.end_time,
+            end_time__gt=event.start_time,
+        )
+        .exclude(pk=event.pk)
+        .order_by("start_time", "id")
+        .values("id", "title", "start_time", "end_time")
+    )
+
+
+def batch_overlaps(events, deleted_ids=()):
+    """
+    Overlaps of each of several events about to be written together, in start
+    time order: against the other events of their days, with one query, and
+    against each other. Events deleted in the same batch are left out.
+    """
+    written_ids = {event.pk for event in events if event.pk is not None}
+    rows = Event.objects.filter(day_id__in={event.day_id for event in events}).exclude(
+        pk__in=written_ids | set(deleted_ids)
+    )
+    by_day = {}
+    for row in rows.values("id", "title", "start_time", "end_time", "day_id"):
+        by_day.setdefault(row.pop("day_id"), []).append(row)
+    entries = [
+        {
+            "id": event.pk,
+            "title": event.title,
+            "start_time": event.start_time,
+            "end_time": event.end_time,
+        }
+        for event in events
+    ]
+    for event, entry in zip(events, entries):
+        by_day.setdefault(event.day_id, []).append(entry)
+
+    return [
+        sorted(
+            (
+                other
+                for other in by_day[event.day_id]
+                if other is not entry
+                and other["start_time"] < event.end_time
+                and other["end_time"] > event.start_time
+            ),
+            # Events still to be created have no id yet
+            key=lambda other: (other["start_time"], other["id"] or 0),
+        )
+        for event, entry in zip(events, entries)
+    ]
+
+
+def sweep(events):
+    """
+    Clusters of overlapping events among dicts with `start_time` and `end_time`,
+    each a list of at least two events in start time order.
+    """
+    clusters = []
+    cluster, cluster_end = [], None
+    # Events ending before they start are treated as instants
+    def bounds(event):
+        return event["start_time"], max(event["start_time"], event["end_time"])
+
+    for event in sorted(events, key=bounds):
+        end = bounds(event)[1]
+        if cluster and event["start_time"] < cluster_end:
+            cluster.append(event)
+            cluster_end = max(cluster_end, end)
+            continue
+        if len(cluster) > 1:
+            clusters.append(cluster)
+        cluster, cluster_end = [event], end
+    if len(cluster) > 1:
+        clusters.append(cluster)
+    return clusters
+
+
+def trip_conflicts(trip_id, day_id=None):
+    """Clusters of overlapping events of each day of a trip, or of one of its days"""
+    events = Event.objects.filter(day__trip_id=trip_id)
+    if day_id is not None:
+        events = events.filter(day_id=day_id)
+    rows = events.order_by("day__date", "day_id", "start_time", "id").values(
+        "id", "title", "start_time", "end_time", "day_id", "day__date"
+    )
+
+    report = []
+
+    def add_day(day_events):
+        for cluster in sweep(day_events):
+            report.append(
+                {
+                    "day": day_events[0]["day_id"],
+                    "date": day_events[0]["day__date"],
+                    "start_time": cluster[0]["start_time"],
+                    "end_time": max(max(event["start_time"], event["end_time"]) for event in cluster),
+                    "events": [
+                        {
+                            "id": event["id"],
+                            "title": event["title"],
+                            "start_time": event["start_time"],
+                            "end_time": event["end_time"],
+                        }
+                        for event in cluster
+                    ],
+                }
+            )
+
+    day_events = []
+    for row in rows.iterator(chunk_size=2000):
+        if day_events and row["day_id"] != day_events[0]["day_id"]:
+            add_day(day_events)
+            day_events = []
+        day_events.append(row)
+    if day_events:
+        add_day(day_events)
+    return report
@@ -0,0 +1,64 @@
+"""
+Date windows and trip scoping of the day, event and calendar queries.
+
+`?from=` and `?to=` are inclusive ISO dates (YYYY-MM-DD) and `?trip=` limits a
+list to one of the user's trips. They become WHERE clauses on Day.date and
+Day.trip, which the (trip, date) index of days serves.
+"""
+
+from calendar import monthrange
+from datetime import date
+from django.utils.dateparse import parse_date
+from driftnotesapi.permissions import trip_ids_for
+
+
+def _date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f"{name} must be a date (YYYY-MM-DD)")
+    return parsed
+
+
+def date_window(request):
+    """(first, last) dates asked for with ?from= and ?to=, None when open, raises ValueError"""
+    first = _date_param(request.query_params, "from")
+    last = _date_param(request.query_params, "to")
+    if first and last and first > last:
+        raise ValueError("from must not be after to")
+    return first, last
+
+
+def month_window(value):
+    """First and last date of a YYYY-MM month, raises ValueError"""
+    try:
+        year, month = (int(part) for part in value.split("-"))
+        first = date(year, month, 1)
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError("month must be a month (YYYY-MM)")
+    return first, first.replace(day=monthrange(year, month)[1])
+
+
+def scoped_trip_ids(request):
+    """Ids of the user's trips, or only the one of ?trip= when the user collaborates on it"""
+    trip_ids = trip_ids_for(request)
+    trip = request.query_params.get("trip")
+    if trip is None:
+        return trip_ids
+    if not trip.isdigit():
+        raise ValueError("trip must be an id")
+    return trip_ids & {int(trip)}
+
+
+def filter_dates(queryset, first, last, field="date"):
+    """Rows of a queryset whose `field` falls within the window"""
+    if first is not None:
+        queryset = queryset.filter(**{f"{field}__gte": first})
+    if last is not None:
+        queryset = queryset.filter(**{f"{field}__lte": last})
+    return queryset
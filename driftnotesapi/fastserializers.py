@@ -0,0 +1,187 @@
+"""
+Read-only serializers that build response dicts straight from .values() rows.
+
+They produce exactly the same output as the ModelSerializers in driftnotesapi.views,
+without DRF's per-row field machinery, and are used by the list endpoints.
+Each class declares its output fields in order; only the columns behind the
+fields and nested objects a request asks for (see driftnotesapi.sparse) are selected.
+"""
+
+from driftnotesapi.sparse import is_expanded, requested_expansions, requested_fields
+from driftnotesapi.urlbuilder import detail_url
+
+
+def iso(value):
+    """Dates and times the way DRF renders them by default"""
+    return None if value is None else value.isoformat()
+
+
+class FlatSerializer:
+    """
+    Minimal stand-in for a read-only ModelSerializer(many=True).
+
+    `instance` is a queryset, or rows already read from one prepared by
+    `prepare_queryset` (a page or a streamed chunk).
+
+    Class attributes:
+      basename -- Router basename used for the `url` field
+      fields -- Output fields in order
+      sources -- Column of a field when it differs from the field name
+      dates -- Fields rendered as ISO 8601 dates or times
+      relations -- Nested flat serializer and foreign key column of each nested field
+    """
+
+    basename = None
+    fields = ()
+    sources = {}
+    dates = ()
+    relations = {}
+
+    def __init__(self, instance, many=True, context=None):
+        assert many, "Flat serializers only render lists"
+        self.instance = instance
+        self.context = context or {}
+
+    @classmethod
+    def columns(cls, fields=None, expansions=None, prefix="", path=""):
+        """Columns needed to render the given fields and expansions"""
+        columns = [f"{prefix}id"]
+        for field in cls.fields:
+            if field == "url" or (fields is not None and field not in fields):
+                continue
+            if field in cls.relations:
+                nested, foreign_key = cls.relations[field]
+                if is_expanded(expansions, f"{path}{field}"):
+                    columns += nested.columns(
+                        expansions=expansions,
+                        prefix=f"{prefix}{field}__",
+                        path=f"{path}{field}.",
+                    )
+                else:
+                    columns.append(f"{prefix}{foreign_key}")
+            else:
+                columns.append(f"{prefix}{cls.sources.get(field, field)}")
+        return list(dict.fromkeys(columns))
+
+    @classmethod
+    def prepare_queryset(cls, queryset, request=None, extra_columns=()):
+        """Restrict the queryset to the columns the rows are built from"""
+        fields = expansions = None
+        if request is not None:
+            fields = requested_fields(request)
+            expansions = requested_expansions(request)
+        # Joins in .values() can change the database's scan order, so unordered
+        # lists are pinned to primary key order to match the model serializers
+        if not queryset.ordered:
+            queryset = queryset.order_by("pk")
+        annotations = tuple(queryset.query.annotations)
+        columns = cls.columns(fields, expansions)
+        columns += [
+            column
+            for column in extra_columns
+            if column not in columns and column not in annotations
+        ]
+        return queryset.values(*columns, *annotations)
+
+    @property
+    def data(self):
+        request = self.context["request"]
+        rows = self.instance
+        if hasattr(rows, "query") and not getattr(rows, "_fields", None):
+            rows = self.prepare_queryset(rows, request)
+        fields = requested_fields(request)
+        expansions = requested_expansions(request)
+        return [self.to_representation(row, request, fields, expansions) for row in rows]
+
+    @classmethod
+    def to_representation(cls, row, request, fields=None, expansions=None, prefix="", path=""):
+        pk = row[f"{prefix}id"]
+        if pk is None:
+            # Nullable relation that is not set
+            return None
+
+        representation = {}
+        for field in cls.fields:
+            if fields is not None and field not in fields:
+                continue
+            if field == "url":
+                representation[field] = detail_url(request, cls.basename, pk)
+            elif field in cls.relations:
+                nested, foreign_key = cls.relations[field]
+                if is_expanded(expansions, f"{path}{field}"):
+                    representation[field] = nested.to_representation(
+                        row,
+                        request,
+                        expansions=expansions,
+                        prefix=f"{prefix}{field}__",
+                        path=f"{path}{field}.",
+                    )
+                else:
+                    representation[field] = row[f"{prefix}{foreign_key}"]
+            else:
+                value = row[f"{prefix}{cls.sources.get(field, field)}"]
+                representation[field] = iso(value) if field in cls.dates else value
+        return representation
+
+
+class FlatUserSerializer(FlatSerializer):
+    """Same output as UserSerializer"""
+
+    basename = "user"
+    fields = ("id", "url", "username", "first_name", "last_name", "email")
+
+
+class FlatCategorySerializer(FlatSerializer):
+    """Same output as CategorySerializer"""
+
+    basename = "category"
+    fields = ("id", "url", "name")
+
+
+class FlatTripSerializer(FlatSerializer):
+    """Same output as TripSerializer"""
+
+    basename = "trip"
+    fields = ("id", "url", "creator", "title", "city", "start_date", "end_date")
+    dates = ("start_date", "end_date")
+    relations = {"creator": (FlatUserSerializer, "creator_id")}
+
+
+class FlatDayTripSerializer(FlatSerializer):
+    """Same output as DayTripSerializer"""
+
+    fields = ("id", "title", "city", "start_date", "end_date", "creator")
+    sources = {"creator": "creator_id"}
+    dates = ("start_date", "end_date")
+
+
+class FlatDaySerializer(FlatSerializer):
+    """Same output as DaySerializer"""
+
+    basename = "day"
+    fields = ("id", "url", "trip", "date")
+    dates = ("date",)
+    relations = {"trip": (FlatDayTripSerializer, "trip_id")}
+
+
+class FlatEventSerializer(FlatSerializer):
+    """Same output as EventSerializer"""
+
+    basename = "event"
+    fields = ("id", "url", "day", "title", "location", "start_time", "end_time", "category")
+    dates = ("start_time", "end_time")
+    relations = {
+        "day": (FlatDaySerializer, "day_id"),
+        "category": (FlatCategorySerializer, "category_id"),
+    }
+
+
+class FlatUserTripSerializer(FlatSerializer):
+    """Same output as UserTripSerializer"""
+
+    basename = "usertrip"
+    fields = ("id", "url", "user", "trip")
+    relations = {
+        "user": (FlatUserSerializer, "user_id"),
+        "trip": (FlatTripSerializer, "trip_id"),
+    }
@@ -0,0 +1,171 @@
+"""
+Per-route query counts and latencies.
+
+InstrumentationMiddleware (see driftnotesapi.middleware) times every request
+when settings.INSTRUMENTATION_ENABLED is set and records it under its router
+name (`trip-list`, `event-detail`, ...). Time is split into:
+
+  db -- Time spent executing SQL, on every database connection
+  serialize -- Time spent in the view outside the database, building the data
+  render -- Time spent rendering the response body (JSON, MessagePack, ...)
+  total -- Time from the middleware to the rendered response
+
+Streamed bodies are produced after the middleware returns, so their rows
+are not part of these numbers.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+
+# Upper bounds of the latency buckets, in milliseconds
+DURATION_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+# Upper bounds of the query count buckets
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """Counts of observations per bucket, with their count, sum and maximum"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0
+        self.max = 0
+
+    def add(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of observations"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return round(min(bound, self.max), 3)
+        return round(self.max, 3)
+
+    def as_dict(self):
+        buckets = {f"le_{bound}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets["inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean": round(self.sum / self.count, 3) if self.count else None,
+            "max": round(self.max, 3),
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "buckets": buckets,
+        }
+
+
+class RequestTimings:
+    """
+    Query count and time per phase of one request, in milliseconds.
+
+    Installed as an execute wrapper on the database connections, so every
+    query the request runs goes through __call__.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.db = 0.0
+        self.view = None
+        self.db_in_view = None
+        self.total = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += (time.perf_counter() - started) * 1000
+            self.queries += 1
+
+    def elapsed(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def view_done(self):
+        """Called when the view has returned and its response is about to be rendered"""
+        self.view = self.elapsed()
+        self.db_in_view = self.db
+
+    def finish(self):
+        self.total = self.elapsed()
+        if self.view is None:
+            # Responses that need no rendering (e.g. HttpResponse, streaming)
+            self.view, self.db_in_view = self.total, self.db
+
+    @property
+    def serialize(self):
+        return max(self.view - self.db_in_view, 0.0)
+
+    @property
+    def render(self):
+        return max(self.total - self.view - (self.db - self.db_in_view), 0.0)
+
+    def server_timing(self):
+        """Value of the Server-Timing response header"""
+        return ", ".join(
+            (
+                f'db;dur={self.db:.2f};desc="queries: {self.queries}"',
+                f"serialize;dur={self.serialize:.2f}",
+                f"render;dur={self.render:.2f}",
+                f"total;dur={self.total:.2f}",
+            )
+        )
+
+
+class RouteMetrics:
+    """Histograms of the requests of each route, aggregated in this process"""
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, timings):
+        with self._lock:
+            histograms = self._routes.get(route)
+            if histograms is None:
+                histograms = self._routes[route] = {
+                    "queries": Histogram(QUERY_BUCKETS),
+                    "db": Histogram(DURATION_BUCKETS),
+                    "serialize": Histogram(DURATION_BUCKETS),
+                    "render": Histogram(DURATION_BUCKETS),
+                    "total": Histogram(DURATION_BUCKETS),
+                }
+            histograms["queries"].add(timings.queries)
+            histograms["db"].add(timings.db)
+            histograms["serialize"].add(timings.serialize)
+            histograms["render"].add(timings.render)
+            histograms["total"].add(timings.total)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                route: {name: histogram.as_dict() for name, histogram in histograms.items()}
+                for route, histograms in sorted(self._routes.items())
+            }
+
+    def reset(self):
+        with self._lock:
+            self._routes.clear()
+
+
+route_metrics = RouteMetrics()
+
+
+def route_name(request):
+    """Router name of the request's route, e.g. `trip-list`"""
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return match.url_name or match.route or match.view_name
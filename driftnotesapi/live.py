@@ -0,0 +1,220 @@
+"""
+Change notifications for the live feed (see driftnotesapi.views.live).
+
+The viewsets call notify_trip() and notify_members() when they write. The
+messages are published once the transaction commits, on channels like
+`trip:<id>` (changes to the trip and its days, events and collaborators) and
+`user:<id>` (the user joined or left a trip).
+
+Messages go through the broker named by settings.LIVE_BROKER:
+
+  LocalBroker -- Delivers within this process only, enough for a single ASGI
+                 worker and for development
+  RedisBroker -- Delivers across processes through Redis pub/sub, needs the
+                 `redis` package and settings.LIVE_REDIS_URL
+
+Other brokers subclass Broker.
+"""
+
+import asyncio
+import json
+from abc import ABC, abstractmethod
+import threading
+from collections import defaultdict
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+try:
+    import redis
+    import redis.asyncio as redis_asyncio
+except ImportError:
+    redis = redis_asyncio = None
+
+# Returned by Subscription.get() when messages were dropped because the client
+# read too slowly, so it has to fetch the current state again
+OVERFLOW = {"action": "resync"}
+
+
+def trip_channel(trip_id):
+    return f"trip:{trip_id}"
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+class Broker(ABC):
+    """Publishes messages (JSON-serializable dicts) to the subscribers of a channel"""
+
+    @abstractmethod
+    def publish(self, channel, message):
+        """Send a message to every subscriber, from any thread"""
+
+    @abstractmethod
+    def subscribe(self, channels):
+        """
+        Subscription to the channels, used as an async context manager from the
+        event loop that reads it
+        """
+
+
+class LocalSubscription:
+    def __init__(self, broker, channels):
+        self.broker = broker
+        self.channels = list(channels)
+        self.loop = None
+        self.queue = None
+        self.overflowed = False
+
+    async def __aenter__(self):
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=getattr(settings, "LIVE_QUEUE_SIZE", 100))
+        self.broker._add(self)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.broker._remove(self)
+
+    def deliver(self, message):
+        # Publishers run in other threads, so the message is handed to the reading loop
+        try:
+            self.loop.call_soon_threadsafe(self._put, message)
+        except RuntimeError:
+            # The loop is closed, the subscriber is gone
+            self.broker._remove(self)
+
+    def _put(self, message):
+        if self.queue.full():
+            self.overflowed = True
+        else:
+            self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        """Next message, or None when none came within `timeout` seconds"""
+        if self.overflowed:
+            return OVERFLOW
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker(Broker):
+    """In-process broker, reaching only the subscribers of this process"""
+
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber.deliver(message)
+
+    def subscribe(self, channels):
+        return LocalSubscription(self, channels)
+
+    def _add(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscribers[channel].add(subscription)
+
+    def _remove(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscribers.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[channel]
+
+
+class RedisSubscription:
+    def __init__(self, url, channels):
+        self.url = url
+        self.channels = list(channels)
+        self.client = None
+        self.pubsub = None
+
+    async def __aenter__(self):
+        self.client = redis_asyncio.Redis.from_url(self.url)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self.pubsub.subscribe(*self.channels)
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+    async def get(self, timeout):
+        """Next message, or None when none came within `timeout` seconds"""
+        message = await self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message["data"])
+
+
+class RedisBroker(Broker):
+    """Broker shared by every process through Redis pub/sub"""
+
+    def __init__(self):
+        if redis is None:
+            raise ImportError("RedisBroker needs the redis package")
+        self.url = settings.LIVE_REDIS_URL
+        self.client = redis.Redis.from_url(self.url)
+
+    def publish(self, channel, message):
+        self.client.publish(channel, json.dumps(message, cls=DjangoJSONEncoder))
+
+    def subscribe(self, channels):
+        return RedisSubscription(self.url, channels)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The broker of settings.LIVE_BROKER, created once per process"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, "LIVE_BROKER", "driftnotesapi.live.LocalBroker")
+                _broker = import_string(path)()
+    return _broker
+
+
+def _publish_on_commit(channels, message):
+    def publish():
+        broker = get_broker()
+        for channel in channels:
+            broker.publish(channel, message)
+
+    # Subscribers would otherwise fetch rows that are not committed yet, or never will be
+    transaction.on_commit(publish)
+
+
+def notify_trip(trip_id, model, action, ids):
+    """
+    Tell the collaborators of a trip that trips, days, events or usertrips
+    were `created`, `updated` or `deleted`
+    """
+    # Ids may come straight from the request data
+    trip_id = int(trip_id)
+    _publish_on_commit(
+        [trip_channel(trip_id)],
+        {"trip": trip_id, "model": model, "action": action, "ids": [int(pk) for pk in ids]},
+    )
+
+
+def notify_members(user_ids, trip_id, action):
+    """Tell users that they `joined` or `left` a trip, so their feeds subscribe again"""
+    trip_id = int(trip_id)
+    _publish_on_commit(
+        [user_channel(int(user_id)) for user_id in user_ids],
+        {"trip": trip_id, "model": "membership", "action": action, "ids": [trip_id]},
+    )
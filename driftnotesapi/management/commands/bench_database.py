@@ -0,0 +1,136 @@
+import json
+import logging
+import threading
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import setup_test_environment
+from rest_framework.authtoken.models import Token
+from driftnotesapi.models import Event, Trip
+from .bench_routes import Command as BenchRoutes, percentile
+
+
+def worker(client, requests, ends, latencies, errors):
+    """Send the requests in turn until `ends`, from a thread with its own connection"""
+    index = 0
+    try:
+        while time.monotonic() < ends:
+            method, path, body = requests[index % len(requests)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                response = client.generic(method, path, body, content_type="application/json")
+                status_code = response.status_code
+            except Exception as ex:
+                status_code = type(ex).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not isinstance(status_code, int) or status_code >= 400:
+                errors.append(status_code)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        "Run concurrent readers and writers against the API for a while and report their "
+        "throughput, tail latency and errors (e.g. database is locked) under the database "
+        "profile of the environment. Run it once per DB_PROFILE to compare. Writes are "
+        "committed: they rename an event to its own title and bump its trip's revision."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Username to run as, defaults to the user with most trips")
+        parser.add_argument("--readers", type=int, default=8, help="Threads sending reads")
+        parser.add_argument("--writers", type=int, default=2, help="Threads sending writes")
+        parser.add_argument("--duration", type=float, default=10, help="Seconds of load")
+        parser.add_argument("--output", help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        # Lets the test client through ALLOWED_HOSTS and turns DEBUG off, as in production
+        setup_test_environment()
+        logging.getLogger("django.request").setLevel(logging.CRITICAL)
+
+        user = BenchRoutes().bench_user(options["user"])
+        token = Token.objects.get_or_create(user=user)[0]
+        trip = Trip.objects.filter(usertrips__user=user).order_by("-revision", "id").first()
+        event = Event.objects.filter(day__trip=trip).order_by("id").first()
+        if event is None:
+            raise CommandError(f"{user.username} has no events to write")
+        reads = [
+            ("GET", "/trips", ""),
+            ("GET", f"/trips/{trip.id}/itinerary", ""),
+            ("GET", "/events", ""),
+            ("GET", f"/events/{event.id}", ""),
+        ]
+        writes = [("PUT", f"/events/{event.id}", json.dumps({"title": event.title}))]
+
+        self.stdout.write(f"Running as {user.username} with {self.profile()}")
+        # Each thread opens connections of its own, as each worker thread of a server does
+        connection.close()
+        kinds = [("read", reads, options["readers"]), ("write", writes, options["writers"])]
+        samples = {kind: ([], []) for kind, _requests, _threads in kinds}
+        ends = time.monotonic() + options["duration"]
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(
+                target=worker,
+                args=(Client(HTTP_AUTHORIZATION=f"Token {token.key}"), requests, ends, *samples[kind]),
+            )
+            for kind, requests, count in kinds
+            for _ in range(count)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{'kind':<8}{'threads':>8}{'requests':>10}{'req/s':>10}{'p50 ms':>10}"
+            f"{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}"
+        )
+        results = {"profile": self.profile()}
+        for kind, _requests, count in kinds:
+            latencies, errors = samples[kind]
+            if not latencies:
+                continue
+            result = {
+                "threads": count,
+                "requests": len(latencies),
+                "requests_per_second": len(latencies) / elapsed,
+                "p50_ms": percentile(latencies, 0.5),
+                "p95_ms": percentile(latencies, 0.95),
+                "p99_ms": percentile(latencies, 0.99),
+                "max_ms": max(latencies),
+                "errors": len(errors),
+            }
+            results[kind] = result
+            self.stdout.write(
+                f"{kind:<8}{count:>8}{result['requests']:>10}{result['requests_per_second']:>10.1f}"
+                f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                f"{result['max_ms']:>10.2f}{result['errors']:>8}"
+            )
+            if errors:
+                counts = {str(error): errors.count(error) for error in set(errors)}
+                self.stderr.write(f"  {kind} errors: {counts}")
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+
+    def profile(self):
+        """The database settings under test, as a short description"""
+        database = connection.settings_dict
+        described = [
+            f"DB_PROFILE={getattr(settings, 'DB_PROFILE', 'default')}",
+            connection.vendor,
+            f"CONN_MAX_AGE={database['CONN_MAX_AGE']}",
+        ]
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                for pragma in ("journal_mode", "synchronous", "busy_timeout", "mmap_size"):
+                    cursor.execute(f"PRAGMA {pragma}")
+                    described.append(f"{pragma}={cursor.fetchone()[0]}")
+        return ", ".join(described)
@@ -0,0 +1,87 @@
+import time
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_test_environment
+from django.db.models import Count, Prefetch
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from driftnotesapi.fastserializers import FlatEventSerializer
+from driftnotesapi.messagepack import MessagePackRenderer
+from driftnotesapi.middleware import BROTLI_QUALITY, brotli
+from driftnotesapi.models import Day, Event, Trip
+from driftnotesapi.views.trip import ItinerarySerializer
+
+
+class Command(BaseCommand):
+    help = "Compare encode time and payload size of JSON and MessagePack, raw and compressed"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=5000, help="Events in the /events document")
+        parser.add_argument("--trip", type=int, help="Trip of the itinerary document, defaults to the one with most events")
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per encoding, best is reported")
+
+    def handle(self, *args, **options):
+        # Lets the factory's requests through ALLOWED_HOSTS when building absolute URLs
+        setup_test_environment()
+        request = Request(APIRequestFactory().get("/"))
+        context = {"request": request}
+
+        events = Event.objects.order_by("pk")[: options["limit"]]
+        documents = [("events", FlatEventSerializer(events, many=True, context=context).data)]
+
+        trip_id = options["trip"]
+        if trip_id is None:
+            trip_id = (
+                Trip.objects.annotate(events=Count("day__event"))
+                .order_by("-events", "id")
+                .values_list("id", flat=True)
+                .first()
+            )
+        if trip_id is not None:
+            trip = (
+                Trip.objects.select_related("creator")
+                .prefetch_related(
+                    Prefetch("day_set", queryset=Day.objects.order_by("date", "id")),
+                    Prefetch(
+                        "day_set__event_set",
+                        queryset=Event.objects.select_related("category").order_by("start_time", "id"),
+                    ),
+                )
+                .get(pk=trip_id)
+            )
+            documents.append((f"itinerary {trip_id}", ItinerarySerializer(trip, context=context).data))
+
+        renderers = (("json", JSONRenderer()), ("msgpack", MessagePackRenderer()))
+        compressors = [("none", None), ("gzip", compress_string)]
+        if brotli is not None:
+            compressors.append(("br", lambda data: brotli.compress(data, quality=BROTLI_QUALITY)))
+
+        self.stdout.write(
+            f"{'document':<16}{'format':<9}{'encoding':<10}{'bytes':>10}{'ratio':>8}"
+            f"{'render ms':>11}{'compress ms':>13}"
+        )
+        for name, data in documents:
+            baseline = None
+            for format_name, renderer in renderers:
+                render_seconds, body = self.best_of(options["repeat"], lambda: renderer.render(data))
+                for encoding, compress in compressors:
+                    compress_seconds, payload = 0, body
+                    if compress is not None:
+                        compress_seconds, payload = self.best_of(options["repeat"], lambda: compress(body))
+                    baseline = baseline or len(payload)
+                    self.stdout.write(
+                        f"{name:<16}{format_name:<9}{encoding:<10}{len(payload):>10,}"
+                        f"{len(payload) / baseline:>8.2f}{render_seconds * 1000:>11.2f}"
+                        f"{compress_seconds * 1000:>13.2f}"
+                    )
+
+    def best_of(self, repeat, encode):
+        """Fastest wall time of `repeat` runs"""
+        best, result = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = encode()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
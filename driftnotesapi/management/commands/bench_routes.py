@@ -0,0 +1,241 @@
+import json
+import logging
+import time
+from urllib.parse import quote
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import setup_test_environment
+from rest_framework.authtoken.models import Token
+from driftnotesapi.models import Category, Day, Event, Trip, UserTrip
+from driftnotesapi.views.sync import encode_token
+from driftnotesproject.urls import router
+
+
+class QueryCounter:
+    """Execute wrapper counting the queries of a request"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a list of numbers"""
+    ordered = sorted(values)
+    index = max(int(round(fraction * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive every route of the API through the test client as one user and report "
+        "p50/p95 latency, queries per request and throughput. Writes are rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Username to run as, defaults to the user with most trips")
+        parser.add_argument("--password", default="password", help="Password of that user, used by the login routes")
+        parser.add_argument("--requests", type=int, default=50, help="Timed requests per route")
+        parser.add_argument("--warmup", type=int, default=3, help="Untimed requests per route")
+        parser.add_argument("--route", action="append", default=[], help="Only run routes whose name contains this")
+        parser.add_argument("--output", help="Write the results to this JSON file")
+        parser.add_argument("--compare", help="Fail when the results regress against this JSON file")
+        parser.add_argument(
+            "--tolerance", type=float, default=0.25, help="Allowed p95 slowdown against --compare (0.25 = 25%%)"
+        )
+
+    def handle(self, *args, **options):
+        # Lets the test client through ALLOWED_HOSTS and turns DEBUG off, as in production
+        setup_test_environment()
+        # 4xx responses (e.g. /metrics for non-admins) would log a warning per request
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+
+        user = self.bench_user(options["user"])
+        token = Token.objects.get_or_create(user=user)[0]
+        client = Client(HTTP_AUTHORIZATION=f"Token {token.key}")
+
+        cases = self.cases(user, options["password"])
+        uncovered = self.router_names() - {name.split(":")[0] for name, *_ in cases}
+        if uncovered:
+            self.stderr.write(f"Routes without a benchmark case: {', '.join(sorted(uncovered))}")
+        if options["route"]:
+            cases = [case for case in cases if any(part in case[0] for part in options["route"])]
+
+        self.stdout.write(
+            f"Running as {user.username}, {options['requests']} requests per route\n"
+            f"{'route':<18}{'method':<8}{'status':>7}{'p50 ms':>10}{'p95 ms':>10}{'queries':>9}{'req/s':>10}"
+        )
+        results = {}
+        for name, method, path, body in cases:
+            key = f"{method} {name}"
+            result = self.run_case(client, method, path, body, options["warmup"], options["requests"])
+            results[key] = result
+            self.stdout.write(
+                f"{name:<18}{method:<8}{result['status']:>7}{result['p50_ms']:>10.2f}"
+                f"{result['p95_ms']:>10.2f}{result['queries']:>9g}{result['requests_per_second']:>10.1f}"
+            )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+
+        if options["compare"]:
+            with open(options["compare"], encoding="utf-8") as baseline_file:
+                baseline = json.load(baseline_file)
+            regressions = self.regressions(baseline, results, options["tolerance"])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No regressions against the baseline"))
+
+    def bench_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist as ex:
+                raise CommandError(f'User "{username}" does not exist') from ex
+        user = User.objects.annotate(memberships=Count("usertrips")).order_by("-memberships", "id").first()
+        if user is None:
+            raise CommandError("The database has no users, run generate_data first")
+        return user
+
+    def router_names(self):
+        names = {pattern.name for pattern in router.urls if pattern.name and pattern.name != "api-root"}
+        return names | {"register", "login", "api-token-auth"}
+
+    def cases(self, user, password):
+        """
+        (route name, method, path, JSON body) of every benchmarked request.
+        Names after a colon tell apart cases of the same route.
+        """
+        trip = Trip.objects.filter(usertrips__user=user).order_by("-revision", "id").first()
+        own_trip = Trip.objects.filter(creator=user).order_by("id").first() or trip
+        if trip is None:
+            raise CommandError(f"{user.username} is not part of any trip")
+        day = Day.objects.filter(trip=trip).order_by("date", "id").first()
+        event = Event.objects.filter(day__trip=trip).order_by("id").first()
+        usertrip = UserTrip.objects.filter(trip=trip).exclude(user=trip.creator).order_by("id").first()
+        usertrip = usertrip or UserTrip.objects.filter(trip=trip).order_by("id").first()
+        category = Category.objects.order_by("id").first()
+        outsider = User.objects.exclude(usertrips__trip=trip).order_by("id").first()
+        since = encode_token(trip.updated_at) if trip.updated_at else "0"
+
+        cases = [
+            ("user-list", "GET", "/users", None),
+            ("user-detail", "GET", f"/users/{user.id}", None),
+            ("user-detail", "PUT", f"/users/{user.id}", {"first_name": user.first_name}),
+            ("calendar-list", "GET", f"/calendar?month={trip.start_date:%Y-%m}", None),
+            ("category-list", "GET", "/categories", None),
+            ("category-list", "POST", "/categories", {"name": "Benchmark"}),
+            ("trip-list", "GET", "/trips", None),
+            (
+                "trip-list",
+                "POST",
+                "/trips",
+                {"title": "Benchmark", "city": "Nashville", "start_date": "05/01/2024", "end_date": "05/07/2024"},
+            ),
+            ("trip-detail", "GET", f"/trips/{trip.id}", None),
+            ("trip-detail", "PUT", f"/trips/{trip.id}", {"title": trip.title}),
+            ("trip-detail", "DELETE", f"/trips/{own_trip.id}", None),
+            ("trip-itinerary", "GET", f"/trips/{trip.id}/itinerary", None),
+            ("trip-conflicts", "GET", f"/trips/{trip.id}/conflicts", None),
+            ("usertrip-list", "GET", "/usertrips", None),
+            ("day-list", "GET", "/days", None),
+            ("day-list:window", "GET", f"/days?trip={trip.id}&from={trip.start_date}&to={trip.end_date}", None),
+            ("day-list", "POST", "/days", {"trip": trip.id, "date": str(trip.end_date)}),
+            ("event-list", "GET", "/events", None),
+            ("event-list:window", "GET", f"/events?from={trip.start_date}&to={trip.start_date}", None),
+            ("search-list", "GET", f"/search?q={quote(trip.city)}", None),
+            ("sync-list", "GET", "/sync", None),
+            ("sync-list:since", "GET", f"/sync?since={since}", None),
+            ("metrics-list", "GET", "/metrics", None),
+            ("metrics-reset", "POST", "/metrics/reset", None),
+            ("login", "POST", "/login", {"username": user.username, "password": password}),
+            ("api-token-auth", "POST", "/api-token-auth", {"username": user.username, "password": password}),
+            (
+                "register",
+                "POST",
+                "/register",
+                {
+                    "username": "benchmark-user",
+                    "email": "benchmark@example.com",
+                    "password": "benchmark",
+                    "first_name": "Bench",
+                    "last_name": "Mark",
+                },
+            ),
+        ]
+        if category is not None:
+            cases.append(("category-detail", "GET", f"/categories/{category.id}", None))
+            cases.append(("category-detail", "DELETE", f"/categories/{category.id}", None))
+        if usertrip is not None:
+            cases.append(("usertrip-detail", "GET", f"/usertrips/{usertrip.id}", None))
+            cases.append(("usertrip-detail", "DELETE", f"/usertrips/{usertrip.id}", None))
+        if outsider is not None:
+            cases.append(("usertrip-list", "POST", "/usertrips", {"user": outsider.id, "trip": trip.id}))
+        if day is not None:
+            cases.append(("day-detail", "GET", f"/days/{day.id}", None))
+            cases.append(("day-detail", "DELETE", f"/days/{day.id}", None))
+            cases.append(("event-list", "POST", "/events", {"day": day.id, "title": "Benchmark"}))
+        if event is not None:
+            cases.append(("event-detail", "GET", f"/events/{event.id}", None))
+            cases.append(("event-detail", "PUT", f"/events/{event.id}", {"title": event.title}))
+            cases.append(("event-detail", "DELETE", f"/events/{event.id}", None))
+            operations = [{"op": "update", "id": event.id, "title": event.title}]
+            if day is not None:
+                operations.append({"op": "create", "day": day.id, "title": "Benchmark"})
+            cases.append(("event-batch", "POST", "/events/batch", {"operations": operations}))
+        return sorted(cases, key=lambda case: (case[0], case[1]))
+
+    def run_case(self, client, method, path, body, warmup, requests):
+        data = json.dumps(body) if body is not None else ""
+        durations = []
+        queries = []
+        status_code = None
+        started = time.perf_counter()
+        for iteration in range(warmup + requests):
+            counter = QueryCounter()
+            request_started = time.perf_counter()
+            # Writes are rolled back so that every request sees the same data
+            with transaction.atomic():
+                with connections["default"].execute_wrapper(counter):
+                    response = client.generic(method, path, data, content_type="application/json")
+                    if response.streaming:
+                        b"".join(response.streaming_content)
+                transaction.set_rollback(True)
+            if iteration < warmup:
+                started = time.perf_counter()
+                continue
+            durations.append((time.perf_counter() - request_started) * 1000)
+            queries.append(counter.count)
+            status_code = response.status_code
+        elapsed = time.perf_counter() - started
+
+        return {
+            "status": status_code,
+            "p50_ms": percentile(durations, 0.5),
+            "p95_ms": percentile(durations, 0.95),
+            # Writes run inside the benchmark's transaction, so their own
+            # transactions count a SAVEPOINT and a RELEASE statement
+            "queries": sum(queries) / len(queries),
+            "requests_per_second": requests / elapsed if elapsed else 0,
+        }
+
+    def regressions(self, baseline, results, tolerance):
+        found = []
+        for key, result in sorted(results.items()):
+            before = baseline.get(key)
+            if before is None:
+                continue
+            if result["status"] != before["status"]:
+                found.append(f"{key}: status {before['status']} -> {result['status']}")
+            if result["queries"] > before["queries"]:
+                found.append(f"{key}: {before['queries']:g} -> {result['queries']:g} queries")
+            if result["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+                found.append(f"{key}: p95 {before['p95_ms']:.2f} -> {result['p95_ms']:.2f} ms")
+        return found
@@ -0,0 +1,85 @@
+import time
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test.utils import setup_test_environment
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+from driftnotesapi.fastserializers import (
+    FlatCategorySerializer,
+    FlatDaySerializer,
+    FlatEventSerializer,
+    FlatTripSerializer,
+    FlatUserSerializer,
+    FlatUserTripSerializer,
+)
+from driftnotesapi.models import Category, Day, Event, Trip, UserTrip
+from driftnotesapi.views.category import CategorySerializer
+from driftnotesapi.views.day import DaySerializer
+from driftnotesapi.views.event import EventSerializer
+from driftnotesapi.views.trip import TripSerializer
+from driftnotesapi.views.user import UserSerializer
+from driftnotesapi.views.usertrip import UserTripSerializer
+
+
+class Command(BaseCommand):
+    help = "Compare rows/sec of the model serializers and the flat serializers on the current database"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=5000, help="Rows serialized per model")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per serializer, best is reported")
+
+    def handle(self, *args, **options):
+        # Lets the factory's requests through ALLOWED_HOSTS when building absolute URLs
+        setup_test_environment()
+        request = Request(APIRequestFactory().get("/"))
+        context = {"request": request}
+        limit = options["limit"]
+        cases = (
+            ("users", User.objects.all(), UserSerializer, FlatUserSerializer),
+            ("categories", Category.objects.all(), CategorySerializer, FlatCategorySerializer),
+            ("trips", Trip.objects.select_related("creator"), TripSerializer, FlatTripSerializer),
+            ("days", Day.objects.select_related("trip"), DaySerializer, FlatDaySerializer),
+            (
+                "events",
+                Event.objects.select_related("day__trip", "category"),
+                EventSerializer,
+                FlatEventSerializer,
+            ),
+            (
+                "usertrips",
+                UserTrip.objects.select_related("user", "trip__creator"),
+                UserTripSerializer,
+                FlatUserTripSerializer,
+            ),
+        )
+
+        self.stdout.write(f"{'model':<12}{'rows':>8}{'model rows/s':>16}{'flat rows/s':>16}{'speedup':>10}  same")
+        for name, queryset, serializer_class, flat_class in cases:
+            queryset = queryset.order_by("pk")[:limit]
+            model_seconds, model_data = self.best_of(
+                options["repeat"], lambda: serializer_class(queryset, many=True, context=context).data
+            )
+            flat_seconds, flat_data = self.best_of(
+                options["repeat"], lambda: flat_class(queryset, many=True, context=context).data
+            )
+            rows = len(model_data)
+            same = JSONRenderer().render(model_data) == JSONRenderer().render(flat_data)
+            self.stdout.write(
+                f"{name:<12}{rows:>8}{self.rate(rows, model_seconds):>16,.0f}"
+                f"{self.rate(rows, flat_seconds):>16,.0f}"
+                f"{model_seconds / flat_seconds if flat_seconds else 0:>9.1f}x  {same}"
+            )
+
+    def best_of(self, repeat, serialize):
+        """Fastest wall time of `repeat` runs, database reads included"""
+        best, data = None, None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            data = serialize()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, data
+
+    def rate(self, rows, seconds):
+        return rows / seconds if seconds else 0
@@ -0,0 +1,237 @@
+import asyncio
+import importlib.util
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.authtoken.models import Token
+from driftnotesapi.models import Day, Event, Trip
+from .bench_routes import Command as BenchRoutes, percentile
+
+# Each server, as (module run with python -m, its arguments, extra environment)
+SERVERS = {
+    "wsgi": (
+        "gunicorn",
+        [
+            "driftnotesproject.wsgi:application",
+            "--workers",
+            "{workers}",
+            "--bind",
+            "127.0.0.1:{port}",
+            "--log-level",
+            "warning",
+        ],
+        {"ASYNC_READ_VIEWS": "False"},
+    ),
+    "asgi": (
+        "uvicorn",
+        [
+            "driftnotesproject.asgi:application",
+            "--workers",
+            "{workers}",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            "{port}",
+            "--log-level",
+            "warning",
+        ],
+        {"ASYNC_READ_VIEWS": "True"},
+    ),
+}
+
+
+async def fetch(connection, request):
+    """Send one request on a keep-alive connection, returns (status, whether it stays open)"""
+    reader, writer = connection
+    writer.write(request)
+    await writer.drain()
+    status_line = await reader.readuntil(b"\r\n")
+    status_code = int(status_line.split()[1])
+    length = 0
+    keep_alive = True
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "connection" and value.strip().lower() == "close":
+            keep_alive = False
+    await reader.readexactly(length)
+    return status_code, keep_alive
+
+
+async def client(port, requests, ends, latencies, errors):
+    """One simulated client sending the requests in turn until `ends`"""
+    connection = None
+    index = 0
+    while time.monotonic() < ends:
+        request = requests[index % len(requests)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            if connection is None:
+                connection = await asyncio.open_connection("127.0.0.1", port)
+            status_code, keep_alive = await fetch(connection, request)
+        except (OSError, ValueError, asyncio.IncompleteReadError):
+            status_code, keep_alive = None, False
+        latencies.append((time.perf_counter() - started) * 1000)
+        if status_code is None or status_code >= 400:
+            errors.append(status_code)
+        if not keep_alive and connection is not None:
+            connection[1].close()
+            connection = None
+    if connection is not None:
+        connection[1].close()
+
+
+async def load(port, requests, concurrency, seconds):
+    latencies = []
+    errors = []
+    ends = time.monotonic() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(client(port, requests, ends, latencies, errors) for _ in range(concurrency))
+    )
+    return latencies, errors, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the API with gunicorn (WSGI, sync views) and with uvicorn (ASGI, async read "
+        "views) at the same worker count, and report throughput and tail latency of the "
+        "read routes at each concurrency level."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Username to run as, defaults to the user with most trips")
+        parser.add_argument("--server", action="append", choices=sorted(SERVERS), help="Only run these servers")
+        parser.add_argument("--workers", type=int, default=4, help="Worker processes of each server")
+        parser.add_argument(
+            "--concurrency", type=int, action="append", help="Concurrent clients, may be repeated (default 8, 64)"
+        )
+        parser.add_argument("--duration", type=float, default=10, help="Seconds of load per concurrency level")
+        parser.add_argument("--warmup", type=float, default=2, help="Seconds of untimed load before the first level")
+        parser.add_argument("--port", type=int, default=8765, help="Port the servers listen on")
+        parser.add_argument("--output", help="Write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        servers = options["server"] or sorted(SERVERS, reverse=True)
+        for name in servers:
+            module = SERVERS[name][0]
+            if importlib.util.find_spec(module) is None:
+                raise CommandError(f"The {name} benchmark needs {module}, pip install {module}")
+
+        user = BenchRoutes().bench_user(options["user"])
+        token = Token.objects.get_or_create(user=user)[0]
+        paths = self.read_paths(user)
+        requests = [
+            (
+                f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nAuthorization: Token {token.key}\r\n"
+                "Accept: application/json\r\n\r\n"
+            ).encode()
+            for path in paths
+        ]
+        levels = options["concurrency"] or [8, 64]
+
+        self.stdout.write(
+            f"Running as {user.username}, {options['workers']} workers, {len(paths)} read routes\n"
+            f"{'server':<8}{'clients':>8}{'requests':>10}{'req/s':>10}{'p50 ms':>10}"
+            f"{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}"
+        )
+        results = {}
+        for name in servers:
+            with self.serve(name, options["workers"], options["port"]):
+                asyncio.run(load(options["port"], requests, max(levels), options["warmup"]))
+                for concurrency in levels:
+                    latencies, errors, elapsed = asyncio.run(
+                        load(options["port"], requests, concurrency, options["duration"])
+                    )
+                    result = {
+                        "requests": len(latencies),
+                        "requests_per_second": len(latencies) / elapsed if elapsed else 0,
+                        "p50_ms": percentile(latencies, 0.5),
+                        "p95_ms": percentile(latencies, 0.95),
+                        "p99_ms": percentile(latencies, 0.99),
+                        "max_ms": max(latencies),
+                        "errors": len(errors),
+                    }
+                    results[f"{name} {concurrency}"] = result
+                    self.stdout.write(
+                        f"{name:<8}{concurrency:>8}{result['requests']:>10}{result['requests_per_second']:>10.1f}"
+                        f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                        f"{result['max_ms']:>10.2f}{result['errors']:>8}"
+                    )
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as output:
+                json.dump(results, output, indent=2, sort_keys=True)
+
+    def read_paths(self, user):
+        """The read routes served by the async views, on data the user can see"""
+        trip = Trip.objects.filter(usertrips__user=user).order_by("-revision", "id").first()
+        if trip is None:
+            raise CommandError(f"{user.username} is not part of any trip")
+        paths = ["/trips", f"/trips/{trip.id}", f"/trips/{trip.id}/itinerary", "/days", "/events"]
+        day = Day.objects.filter(trip=trip).order_by("date", "id").first()
+        if day is not None:
+            paths.append(f"/days/{day.id}")
+        event = Event.objects.filter(day__trip=trip).order_by("id").first()
+        if event is not None:
+            paths.append(f"/events/{event.id}")
+        return paths
+
+    def serve(self, name, workers, port):
+        module, arguments, environment = SERVERS[name]
+        env = dict(os.environ, DJANGO_ALLOWED_HOSTS="127.0.0.1,localhost", **environment)
+        env.setdefault("DJANGO_SETTINGS_MODULE", "driftnotesproject.settings")
+        command = [sys.executable, "-m", module] + [
+            argument.format(workers=workers, port=port) for argument in arguments
+        ]
+        return RunningServer(command, env, port, settings.BASE_DIR)
+
+
+class RunningServer:
+    """Server process started on entering and stopped on leaving"""
+
+    def __init__(self, command, env, port, cwd, timeout=30):
+        self.command = command
+        self.env = env
+        self.port = port
+        self.cwd = cwd
+        self.timeout = timeout
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            self.command, env=self.env, cwd=self.cwd, stdout=subprocess.DEVNULL
+        )
+        gives_up = time.monotonic() + self.timeout
+        while time.monotonic() < gives_up:
+            if self.process.poll() is not None:
+                raise CommandError(f"{' '.join(self.command)} exited with {self.process.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=1).close()
+                return self
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise CommandError(f"{' '.join(self.command)} did not listen on port {self.port}")
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stop(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
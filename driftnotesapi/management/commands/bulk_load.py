@@ -0,0 +1,284 @@
+import csv
+import json
+import os
+import re
+from collections import Counter
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.core.serializers.base import DeserializationError
+from django.core.serializers.python import Deserializer as PythonDeserializer
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, transaction
+from driftnotesapi.search import rebuild_index
+
+# Fixtures of driftnotesapi/fixtures in dependency order, loaded when no file is given
+SEED_FIXTURES = ("user", "category", "token", "trip", "usertrip", "day", "event")
+FIXTURE_EXTENSIONS = ("json", "jsonl", "csv")
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+
+def iter_json_array(stream, chunk_size=1 << 16):
+    """
+    Items of a top-level JSON array, decoded one at a time while `stream` is read
+    in chunks, so memory holds one chunk and one item instead of the whole file.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    state = "start"  # then "first" after "[", "next" after an item, "item" after ","
+
+    while True:
+        pos = WHITESPACE.match(buffer, pos).end()
+        if pos == len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of the JSON array")
+            chunk = stream.read(chunk_size)
+            buffer, pos, eof = chunk, 0, not chunk
+            continue
+
+        char = buffer[pos]
+        if state == "start":
+            if char != "[":
+                raise ValueError("Expected a JSON array")
+            pos, state = pos + 1, "first"
+        elif char == "]" and state in ("first", "next"):
+            return
+        elif state == "next":
+            if char != ",":
+                raise ValueError(f"Expected ',' or ']' but found {char!r}")
+            pos, state = pos + 1, "item"
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                end = None
+            # An item reaching the end of the buffer may continue in the next chunk
+            if end is None or (end == len(buffer) and not eof):
+                chunk = stream.read(chunk_size)
+                buffer, pos, eof = buffer[pos:] + chunk, 0, not chunk
+                continue
+            yield item
+            pos, state = end, "next"
+
+
+def iter_json_lines(stream):
+    """Objects of a JSON Lines file, one per line"""
+    for line in stream:
+        if line.strip():
+            yield json.loads(line)
+
+
+def iter_csv(stream, model):
+    """
+    Rows of a CSV export of `model` as fixture objects. The header holds field
+    names or column names (`trip` or `trip_id`), and `id` holds the primary key.
+    Rows without one are inserted as new objects.
+    """
+    label = model._meta.label_lower
+    columns = {field.attname: field for field in model._meta.concrete_fields}
+    columns.update({field.name: field for field in model._meta.concrete_fields})
+    for row in csv.DictReader(stream):
+        pk = None
+        fields = {}
+        for column, value in row.items():
+            field = columns.get(column)
+            if field is None:
+                continue
+            if field.null and value == "":
+                value = None
+            if field.primary_key:
+                pk = value or None
+            else:
+                fields[field.name] = value
+        yield {"model": label, "pk": pk, "fields": fields}
+
+
+class Command(BaseCommand):
+    help = (
+        "Load fixtures and large JSON, JSON Lines or CSV exports with bulk inserts in one "
+        "transaction. Without arguments, loads every fixture of driftnotesapi in order."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("files", nargs="*", help="Fixture names (like loaddata) or paths of .json, .jsonl or .csv files")
+        parser.add_argument("--model", help="Model of the CSV files (app_label.model), defaults to the file name")
+        parser.add_argument("--batch-size", type=int, default=2000, help="Objects per INSERT")
+        parser.add_argument(
+            "--on-conflict",
+            choices=("error", "ignore", "update"),
+            default="update",
+            help=(
+                "What to do with rows whose primary key already exists. The default replaces "
+                "them, as loaddata does, so later rows of a file win over earlier ones"
+            ),
+        )
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database to load into")
+
+    def handle(self, *args, **options):
+        self.using = options["database"]
+        self.batch_size = options["batch_size"]
+        self.on_conflict = options["on_conflict"]
+        self.counts = Counter()
+        connection = connections[self.using]
+
+        paths = [self.find(name) for name in options["files"] or SEED_FIXTURES]
+        try:
+            self.load_all(connection, paths, options["model"])
+        except IntegrityError as ex:
+            raise CommandError(f"Nothing was loaded: {ex}") from ex
+
+        for label, count in self.counts.items():
+            self.stdout.write(f"{label}: {count}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Loaded {sum(self.counts.values())} objects from {len(paths)} file(s)")
+        )
+
+    def load_all(self, connection, paths, model_label):
+        """Load every file in one transaction"""
+        models = set()
+        with transaction.atomic(using=self.using):
+            # Foreign keys are checked once at the end instead of on every row, so
+            # rows may reference objects that come later in the same import
+            with connection.constraint_checks_disabled():
+                if connection.vendor == "postgresql":
+                    with connection.cursor() as cursor:
+                        cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+                for path in paths:
+                    models |= self.load(path, model_label)
+            connection.check_constraints(table_names=[model._meta.db_table for model in models])
+
+            # Rows were inserted with explicit ids, so sequences must move past them
+            self.reset_sequences(models)
+
+            # Rows were inserted without going through the viewsets
+            rebuild_index(self.using)
+
+    def reset_sequences(self, models):
+        connection = connections[self.using]
+        statements = connection.ops.sequence_reset_sql(no_style(), list(models))
+        if statements:
+            with connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+
+    def find(self, name):
+        """Path of a file, or of a fixture found the way loaddata looks for it"""
+        if os.path.isfile(name):
+            return name
+        directories = [
+            os.path.join(app_config.path, "fixtures") for app_config in apps.get_app_configs()
+        ] + [str(directory) for directory in settings.FIXTURE_DIRS]
+        candidates = [name] + [f"{name}.{extension}" for extension in FIXTURE_EXTENSIONS]
+        for directory in directories:
+            for candidate in candidates:
+                path = os.path.join(directory, candidate)
+                if os.path.isfile(path):
+                    return path
+        raise CommandError(f'No fixture named "{name}" found')
+
+    def csv_model(self, path, model_label):
+        if model_label:
+            try:
+                return apps.get_model(model_label)
+            except (LookupError, ValueError) as ex:
+                raise CommandError(f'Unknown model "{model_label}"') from ex
+        name = os.path.splitext(os.path.basename(path))[0].lower()
+        matches = [model for model in apps.get_models() if model._meta.model_name == name]
+        if len(matches) != 1:
+            raise CommandError(f"Cannot tell the model of {path} from its name, pass --model")
+        return matches[0]
+
+    def load(self, path, model_label):
+        """Insert the objects of one file in batches, returns the models it held"""
+        extension = os.path.splitext(path)[1].lower()
+        models = set()
+        with open(path, encoding="utf-8", newline="" if extension == ".csv" else None) as stream:
+            if extension == ".csv":
+                objects = iter_csv(stream, self.csv_model(path, model_label))
+            elif extension == ".jsonl":
+                objects = iter_json_lines(stream)
+            else:
+                objects = iter_json_array(stream)
+
+            batch = []
+            try:
+                for deserialized in PythonDeserializer(
+                    objects, using=self.using, ignorenonexistent=True, handle_forward_references=False
+                ):
+                    if batch and type(deserialized.object) is not type(batch[0].object):
+                        models.add(self.insert(batch))
+                        batch = []
+                    batch.append(deserialized)
+                    if len(batch) >= self.batch_size:
+                        models.add(self.insert(batch))
+                        batch = []
+                if batch:
+                    models.add(self.insert(batch))
+            except (DeserializationError, ValueError) as ex:
+                raise CommandError(f"Could not load {path}: {ex}") from ex
+        return models
+
+    def insert(self, batch):
+        """
+        INSERT the objects of one model with bulk_create(). No signals are sent, as
+        with loaddata's raw saves, but auto_now fields are set to the time of the load.
+        """
+        model = type(batch[0].object)
+        if model._meta.parents:
+            raise CommandError(f"{model._meta.label} uses multi-table inheritance, use loaddata")
+
+        if self.on_conflict != "error":
+            # A statement cannot insert the same key twice, so only the row that
+            # would win (the last one, or the first when ignoring) is kept. Rows
+            # without a primary key are all new and are all kept
+            rows = {}
+            for index, deserialized in enumerate(batch):
+                pk = deserialized.object.pk
+                key = ("new", index) if pk is None else pk
+                if self.on_conflict == "update":
+                    rows.pop(key, None)
+                rows.setdefault(key, deserialized)
+            batch = list(rows.values())
+        objects = [deserialized.object for deserialized in batch]
+        conflict = {}
+        if self.on_conflict == "ignore":
+            conflict = {"ignore_conflicts": True}
+        elif self.on_conflict == "update":
+            conflict = {
+                "update_conflicts": True,
+                "update_fields": [
+                    field.name for field in model._meta.local_concrete_fields if not field.primary_key
+                ],
+                "unique_fields": [model._meta.pk.name],
+            }
+
+        if any(obj.pk is None for obj in objects):
+            # New rows take ids from the sequence, which must first move past the
+            # explicit ids inserted so far
+            self.reset_sequences([model])
+        model._base_manager.using(self.using).bulk_create(
+            objects, batch_size=self.batch_size, **conflict
+        )
+
+        # Many-to-many values (e.g. user groups) go to their through tables
+        through_rows = {}
+        for deserialized in batch:
+            for name, related_ids in (deserialized.m2m_data or {}).items():
+                field = model._meta.get_field(name)
+                through = field.remote_field.through
+                source = through._meta.get_field(field.m2m_field_name()).attname
+                target = through._meta.get_field(field.m2m_reverse_field_name()).attname
+                through_rows.setdefault(through, []).extend(
+                    through(**{source: deserialized.object.pk, target: related_id})
+                    for related_id in related_ids
+                )
+        for through, rows in through_rows.items():
+            through.objects.using(self.using).bulk_create(
+                rows, batch_size=self.batch_size, ignore_conflicts=self.on_conflict != "error"
+            )
+
+        self.counts[model._meta.label] += len(objects)
+        return model
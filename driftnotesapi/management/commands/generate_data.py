@@ -0,0 +1,155 @@
+import random
+from datetime import date, time, timedelta
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+from driftnotesapi.models import Category, Day, Event, Trip, UserTrip
+from driftnotesapi.search import rebuild_index
+
+CITIES = (
+    "New York", "Paris", "Tokyo", "Lisbon", "Nashville", "Mexico City",
+    "Cape Town", "Seoul", "Reykjavik", "Buenos Aires", "Hanoi", "Berlin",
+)
+CATEGORIES = ("Business", "Leisure", "Food", "Sightseeing", "Transit", "Outdoors")
+EVENT_TITLES = (
+    "Breakfast", "Museum Visit", "Client Meeting", "Walking Tour", "Lunch",
+    "Train Ride", "Hike", "Dinner", "Concert", "Market", "Coffee", "Check-in",
+)
+# Every generated trip starts within a year of this date, so a seed always gives the same data
+FIRST_DATE = date(2024, 1, 1)
+
+
+class Command(BaseCommand):
+    help = "Generate a reproducible synthetic dataset with bulk inserts (users, trips, days, events, collaborators)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=100, help="Users to create")
+        parser.add_argument("--trips-per-user", type=int, default=5, help="Trips created by each user")
+        parser.add_argument("--trip-days", type=int, default=7, help="Length of each trip in days")
+        parser.add_argument("--events-per-day", type=int, default=4, help="Events on each day")
+        parser.add_argument("--collaborators", type=int, default=2, help="Other users added to each trip")
+        parser.add_argument("--seed", type=int, default=0, help="Random seed, the same seed gives the same data")
+        parser.add_argument("--prefix", default="load", help="Prefix of the generated usernames")
+        parser.add_argument("--password", default="password", help="Password of every generated user")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per INSERT")
+
+    def handle(self, *args, **options):
+        users_count = options["users"]
+        collaborators = options["collaborators"]
+        if users_count < 1 or options["trip_days"] < 1:
+            raise CommandError("--users and --trip-days must be at least 1")
+        if collaborators >= users_count:
+            raise CommandError("--collaborators must be lower than --users")
+
+        prefix = options["prefix"]
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(f'Users starting with "{prefix}" already exist, pick another --prefix')
+
+        rng = random.Random(options["seed"])
+        batch_size = options["batch_size"]
+
+        with transaction.atomic():
+            categories = self.categories()
+
+            # Hashing is slow by design, so every user shares one hash of the same password
+            password = make_password(options["password"])
+            users = User.objects.bulk_create(
+                [
+                    User(
+                        username=f"{prefix}{n}",
+                        first_name="Load",
+                        last_name=f"User {n}",
+                        email=f"{prefix}{n}@example.com",
+                        password=password,
+                    )
+                    for n in range(users_count)
+                ],
+                batch_size=batch_size,
+            )
+            Token.objects.bulk_create(
+                [Token(key=Token.generate_key(), user=user) for user in users],
+                batch_size=batch_size,
+            )
+
+            trips = Trip.objects.bulk_create(
+                [
+                    self.trip(rng, creator, options["trip_days"])
+                    for creator in users
+                    for _ in range(options["trips_per_user"])
+                ],
+                batch_size=batch_size,
+            )
+
+            usertrips = []
+            for trip in trips:
+                members = {trip.creator_id}
+                while len(members) < collaborators + 1:
+                    members.add(rng.choice(users).id)
+                usertrips += [UserTrip(user_id=user_id, trip=trip) for user_id in sorted(members)]
+            UserTrip.objects.bulk_create(usertrips, batch_size=batch_size)
+
+            days = Day.objects.bulk_create(
+                [
+                    Day(trip=trip, date=trip.start_date + timedelta(days=offset))
+                    for trip in trips
+                    for offset in range(options["trip_days"])
+                ],
+                batch_size=batch_size,
+            )
+
+            events = 0
+            batch = []
+            for day in days:
+                for slot in range(options["events_per_day"]):
+                    batch.append(self.event(rng, day, slot, options["events_per_day"], categories))
+                if len(batch) >= batch_size:
+                    Event.objects.bulk_create(batch, batch_size=batch_size)
+                    events += len(batch)
+                    batch = []
+            Event.objects.bulk_create(batch, batch_size=batch_size)
+            events += len(batch)
+            rebuild_index()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Created {len(users)} users, {len(trips)} trips, {len(usertrips)} collaborators, "
+                f"{len(days)} days and {events} events"
+            )
+        )
+
+    def categories(self):
+        """The standard categories, created when missing"""
+        existing = {category.name: category for category in Category.objects.filter(name__in=CATEGORIES)}
+        missing = [Category(name=name) for name in CATEGORIES if name not in existing]
+        categories = list(existing.values()) + Category.objects.bulk_create(missing)
+        return sorted(categories, key=lambda category: category.name)
+
+    def trip(self, rng, creator, trip_days):
+        start_date = FIRST_DATE + timedelta(days=rng.randrange(365))
+        city = rng.choice(CITIES)
+        return Trip(
+            creator=creator,
+            title=f"{rng.choice(('Trip to', 'Weekend in', 'Work in', 'Holidays in'))} {city}",
+            city=city,
+            start_date=start_date,
+            end_date=start_date + timedelta(days=trip_days - 1),
+        )
+
+    def event(self, rng, day, slot, slots, categories):
+        # Events are spread between 7:00 and 23:00 without overlapping
+        minutes_per_slot = max(16 * 60 // slots, 1)
+        start = 7 * 60 + slot * minutes_per_slot
+        if minutes_per_slot >= 15:
+            end = start + rng.randrange(15, minutes_per_slot + 1, 15)
+        else:
+            end = start + minutes_per_slot
+        return Event(
+            day=day,
+            title=rng.choice(EVENT_TITLES),
+            location=f"{rng.randrange(1, 999)} {rng.choice(('Main', 'Oak', 'Pine', 'Elm'))} St",
+            start_time=time(start // 60, start % 60),
+            end_time=time(end // 60, end % 60),
+            category=rng.choice(categories) if rng.random() < 0.8 else None,
+        )
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from driftnotesapi.background import purge_deleted_trips
+
+
+class Command(BaseCommand):
+    help = "Delete the days, events and rows of trips that were soft-deleted (see TRIP_SOFT_DELETE)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100, help="Trips purged per transaction")
+
+    def handle(self, *args, **options):
+        purged = purge_deleted_trips(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} trip(s)"))
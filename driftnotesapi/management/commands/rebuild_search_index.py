@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+from driftnotesapi.search import create_index, index_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Create the full-text search index if it is missing and index every trip and event again"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default=DEFAULT_DB_ALIAS, help="Database to index")
+
+    def handle(self, *args, **options):
+        using = options["database"]
+        with transaction.atomic(using=using):
+            create_index(using)
+            backend = index_backend(using)
+            if backend is None:
+                raise CommandError("This database has no full-text index, searches use icontains lookups")
+            rebuild_index(using)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt the {backend} search index"))
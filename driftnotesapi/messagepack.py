@@ -0,0 +1,244 @@
+"""
+MessagePack renderer and parser, a compact binary alternative to JSON.
+
+Clients opt in with `Accept: application/msgpack` (or `?format=msgpack`) and
+may send request bodies with `Content-Type: application/msgpack`. The documents
+are the same as the JSON ones: dates, times and decimals are encoded as the
+strings JSONRenderer writes. The `msgpack` package is used when it is installed,
+otherwise the pure-Python codec below handles the types an API document holds.
+"""
+
+import struct
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils import encoders
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MEDIA_TYPE = "application/msgpack"
+
+# Converts what JSON cannot hold either (dates, decimals, uuids, ...)
+_default = encoders.JSONEncoder().default
+
+
+def _pack(obj, out):
+    if obj is None:
+        out.append(b"\xc0")
+    elif obj is True:
+        out.append(b"\xc3")
+    elif obj is False:
+        out.append(b"\xc2")
+    elif isinstance(obj, int):
+        if 0 <= obj < 0x80:
+            out.append(struct.pack("B", obj))
+        elif -0x20 <= obj < 0:
+            out.append(struct.pack("b", obj))
+        elif 0 <= obj <= 0xFF:
+            out.append(struct.pack(">BB", 0xCC, obj))
+        elif 0 <= obj <= 0xFFFF:
+            out.append(struct.pack(">BH", 0xCD, obj))
+        elif 0 <= obj <= 0xFFFFFFFF:
+            out.append(struct.pack(">BI", 0xCE, obj))
+        elif 0 <= obj <= 0xFFFFFFFFFFFFFFFF:
+            out.append(struct.pack(">BQ", 0xCF, obj))
+        elif -0x80 <= obj < 0:
+            out.append(struct.pack(">Bb", 0xD0, obj))
+        elif -0x8000 <= obj < 0:
+            out.append(struct.pack(">Bh", 0xD1, obj))
+        elif -0x80000000 <= obj < 0:
+            out.append(struct.pack(">Bi", 0xD2, obj))
+        elif -0x8000000000000000 <= obj < 0:
+            out.append(struct.pack(">Bq", 0xD3, obj))
+        else:
+            raise OverflowError("Integer out of MessagePack range")
+    elif isinstance(obj, float):
+        out.append(struct.pack(">Bd", 0xCB, obj))
+    elif isinstance(obj, str):
+        data = obj.encode("utf-8")
+        size = len(data)
+        if size < 0x20:
+            out.append(struct.pack("B", 0xA0 | size))
+        elif size <= 0xFF:
+            out.append(struct.pack(">BB", 0xD9, size))
+        elif size <= 0xFFFF:
+            out.append(struct.pack(">BH", 0xDA, size))
+        else:
+            out.append(struct.pack(">BI", 0xDB, size))
+        out.append(data)
+    elif isinstance(obj, (bytes, bytearray, memoryview)):
+        data = bytes(obj)
+        size = len(data)
+        if size <= 0xFF:
+            out.append(struct.pack(">BB", 0xC4, size))
+        elif size <= 0xFFFF:
+            out.append(struct.pack(">BH", 0xC5, size))
+        else:
+            out.append(struct.pack(">BI", 0xC6, size))
+        out.append(data)
+    elif isinstance(obj, (list, tuple)):
+        size = len(obj)
+        if size < 0x10:
+            out.append(struct.pack("B", 0x90 | size))
+        elif size <= 0xFFFF:
+            out.append(struct.pack(">BH", 0xDC, size))
+        else:
+            out.append(struct.pack(">BI", 0xDD, size))
+        for item in obj:
+            _pack(item, out)
+    elif isinstance(obj, dict):
+        size = len(obj)
+        if size < 0x10:
+            out.append(struct.pack("B", 0x80 | size))
+        elif size <= 0xFFFF:
+            out.append(struct.pack(">BH", 0xDE, size))
+        else:
+            out.append(struct.pack(">BI", 0xDF, size))
+        for key, value in obj.items():
+            _pack(key, out)
+            _pack(value, out)
+    else:
+        _pack(_default(obj), out)
+
+
+class _Reader:
+    """Decodes one MessagePack document from a bytes object"""
+
+    # Fixed size formats: (struct format, size in bytes)
+    SCALARS = {
+        0xCA: (">f", 4),
+        0xCB: (">d", 8),
+        0xCC: (">B", 1),
+        0xCD: (">H", 2),
+        0xCE: (">I", 4),
+        0xCF: (">Q", 8),
+        0xD0: (">b", 1),
+        0xD1: (">h", 2),
+        0xD2: (">i", 4),
+        0xD3: (">q", 8),
+    }
+    # Variable size formats: (kind, struct format of the length, size of the length)
+    CONTAINERS = {
+        0xC4: ("bin", ">B", 1),
+        0xC5: ("bin", ">H", 2),
+        0xC6: ("bin", ">I", 4),
+        0xD9: ("str", ">B", 1),
+        0xDA: ("str", ">H", 2),
+        0xDB: ("str", ">I", 4),
+        0xDC: ("array", ">H", 2),
+        0xDD: ("array", ">I", 4),
+        0xDE: ("map", ">H", 2),
+        0xDF: ("map", ">I", 4),
+    }
+
+    def __init__(self, data):
+        self.data = data
+        self.offset = 0
+
+    def take(self, size):
+        end = self.offset + size
+        if end > len(self.data):
+            raise ValueError("Unexpected end of data")
+        chunk = self.data[self.offset:end]
+        self.offset = end
+        return chunk
+
+    def unpack(self, fmt, size):
+        return struct.unpack(fmt, self.take(size))[0]
+
+    def read(self):
+        code = self.take(1)[0]
+        if code < 0x80:
+            return code
+        if code >= 0xE0:
+            return code - 0x100
+        if 0x80 <= code <= 0x8F:
+            return self.read_map(code & 0x0F)
+        if 0x90 <= code <= 0x9F:
+            return self.read_array(code & 0x0F)
+        if 0xA0 <= code <= 0xBF:
+            return self.take(code & 0x1F).decode("utf-8")
+        if code == 0xC0:
+            return None
+        if code == 0xC2:
+            return False
+        if code == 0xC3:
+            return True
+        if code in self.SCALARS:
+            return self.unpack(*self.SCALARS[code])
+        if code in self.CONTAINERS:
+            kind, fmt, size = self.CONTAINERS[code]
+            length = self.unpack(fmt, size)
+            if kind == "bin":
+                return self.take(length)
+            if kind == "str":
+                return self.take(length).decode("utf-8")
+            if kind == "array":
+                return self.read_array(length)
+            return self.read_map(length)
+        raise ValueError(f"Unsupported MessagePack type 0x{code:02x}")
+
+    def read_array(self, length):
+        return [self.read() for _ in range(length)]
+
+    def read_map(self, length):
+        result = {}
+        for _ in range(length):
+            key = self.read()
+            if not isinstance(key, (str, bytes)):
+                raise ValueError(f"{type(key).__name__} is not allowed for map key")
+            result[key] = self.read()
+        return result
+
+
+def packb(obj):
+    """Encode a document as MessagePack"""
+    if msgpack is not None:
+        return msgpack.packb(obj, default=_default, use_bin_type=True)
+    out = []
+    _pack(obj, out)
+    return b"".join(out)
+
+
+def unpackb(data):
+    """Decode a MessagePack document, raises ValueError for malformed data"""
+    if msgpack is not None:
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except msgpack.UnpackException as ex:
+            # Malformed data mostly raises ValueError subclasses already
+            raise ValueError(str(ex)) from ex
+    reader = _Reader(bytes(data))
+    obj = reader.read()
+    if reader.offset != len(reader.data):
+        raise ValueError("Extra data after the document")
+    return obj
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Renders responses as MessagePack"""
+
+    media_type = MEDIA_TYPE
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return packb(data)
+
+
+class MessagePackParser(BaseParser):
+    """Parses MessagePack request bodies"""
+
+    media_type = MEDIA_TYPE
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return unpackb(stream.read())
+        except (ValueError, UnicodeDecodeError) as ex:
+            raise ParseError(f"MessagePack parse error - {ex}")
@@ -0,0 +1,162 @@
+from contextlib import ExitStack
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.text import compress_sequence, compress_string
+from driftnotesapi.instrumentation import RequestTimings, route_metrics, route_name
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Quality 5 compresses API documents better than gzip -6 at a similar speed
+BROTLI_QUALITY = 5
+
+
+def accepted_encodings(header):
+    """Content codings of an Accept-Encoding header, without the ones refused with q=0"""
+    encodings = set()
+    for part in header.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            encodings.add(coding)
+    return encodings
+
+
+def brotli_sequence(sequence):
+    """Brotli-compress an iterator of bytes, flushing after each chunk"""
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for item in sequence:
+        data = compressor.process(item) + compressor.flush()
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with brotli when the client accepts it and the `brotli`
+    package is installed, otherwise with gzip.
+
+    Works like django.middleware.gzip.GZipMiddleware, but responses smaller
+    than settings.COMPRESSION_MIN_SIZE bytes are sent as they are, since
+    compressing them costs more time than it saves on the wire.
+    """
+
+    # Random bytes added to gzip headers to mitigate BREACH, as GZipMiddleware does
+    max_random_bytes = 100
+
+    def process_response(self, request, response):
+        min_size = getattr(settings, "COMPRESSION_MIN_SIZE", 1024)
+        if not response.streaming and len(response.content) < min_size:
+            return response
+
+        # Avoid compressing twice
+        if response.has_header("Content-Encoding"):
+            return response
+
+        # Server-sent events must reach the client as soon as they are sent
+        if response.get("Content-Type", "").startswith("text/event-stream"):
+            return response
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        accepted = accepted_encodings(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+        if brotli is not None and "br" in accepted:
+            encoding = "br"
+        elif "gzip" in accepted:
+            encoding = "gzip"
+        else:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                # Bind the iterator now in case streaming_content is replaced later
+                original_iterator = response.streaming_content
+
+                async def async_wrapper():
+                    compressor = brotli.Compressor(quality=BROTLI_QUALITY) if encoding == "br" else None
+                    async for chunk in original_iterator:
+                        if compressor is None:
+                            yield compress_string(chunk, max_random_bytes=self.max_random_bytes)
+                        else:
+                            yield compressor.process(chunk) + compressor.flush()
+                    if compressor is not None:
+                        yield compressor.finish()
+
+                response.streaming_content = async_wrapper()
+            elif encoding == "br":
+                response.streaming_content = brotli_sequence(response.streaming_content)
+            else:
+                response.streaming_content = compress_sequence(
+                    response.streaming_content, max_random_bytes=self.max_random_bytes
+                )
+            # The compressed size is unknown until the body has been streamed
+            del response.headers["Content-Length"]
+        else:
+            if encoding == "br":
+                compressed = brotli.compress(response.content, quality=BROTLI_QUALITY)
+            else:
+                compressed = compress_string(
+                    response.content, max_random_bytes=self.max_random_bytes
+                )
+            # Return the compressed content only if it's actually shorter
+            if len(compressed) >= len(response.content):
+                return response
+            response.content = compressed
+            response.headers["Content-Length"] = str(len(compressed))
+
+        # A strong ETag names one exact byte sequence, so it becomes weak (RFC 9110 8.8.1);
+        # If-None-Match uses weak comparison, so 304s keep working
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+
+class InstrumentationMiddleware:
+    """
+    Record the query count and the db, serialize and render time of each request
+    per route (see driftnotesapi.instrumentation), and send them back in a
+    Server-Timing header.
+
+    Only installed when settings.INSTRUMENTATION_ENABLED is set, so it costs
+    nothing otherwise. It should be the last middleware, so the timings cover
+    the view and its rendering only.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, "INSTRUMENTATION_ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        timings = RequestTimings()
+        request._timings = timings
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timings))
+            response = self.get_response(request)
+        timings.finish()
+
+        route_metrics.record(route_name(request), timings)
+        response["Server-Timing"] = timings.server_timing()
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered right after this hook returns
+        request._timings.view_done()
+        return response
@@ -1,5 +1,6 @@
 from .category import Category
 from .day import Day
 from .event import Event, event_end, event_start
+from .tombstone import Tombstone
 from .trip import Trip
 from .usertrip import UserTrip
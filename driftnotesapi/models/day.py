@@ -2,5 +2,12 @@ from django.db import models
 
 
 class Day(models.Model):
-    trip = models.ForeignKey("Trip", on_delete=models.CASCADE)
+    # day_trip_date_idx serves lookups by trip, so the key needs no index of its own
+    trip = models.ForeignKey("Trip", on_delete=models.CASCADE, db_index=False)
     date = models.DateField()
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["trip", "date"], name="day_trip_date_idx"),
+        ]
@@ -11,7 +11,8 @@ def event_end():
 
 
 class Event(models.Model):
-    day = models.ForeignKey("Day", on_delete=models.CASCADE)
+    # event_day_start_idx serves lookups by day, so the key needs no index of its own
+    day = models.ForeignKey("Day", on_delete=models.CASCADE, db_index=False)
     title = models.CharField(max_length=155)
     location = models.CharField(max_length=155, blank=True, null=True)
     start_time = models.TimeField(default=event_start)
@@ -19,3 +20,9 @@ class Event(models.Model):
     category = models.ForeignKey(
         "Category", on_delete=models.DO_NOTHING, null=True, blank=True
     )
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["day", "start_time"], name="event_day_start_idx"),
+        ]
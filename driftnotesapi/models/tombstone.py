@@ -0,0 +1,40 @@
+from django.db import models
+from django.contrib.auth.models import User
+from .usertrip import UserTrip
+
+
+class Tombstone(models.Model):
+    """
+    Record of a deleted trip, day, event or usertrip, kept so that delta sync
+    can tell each collaborator what to remove. Deleting a parent implies its
+    children: a trip tombstone covers the trip's days and events.
+    """
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="tombstones")
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "deleted_at"], name="tombstone_user_deleted_idx"),
+        ]
+
+    @classmethod
+    def record(cls, model, object_ids, trip_id=None, user_ids=()):
+        """
+        Record the deletion of objects for every collaborator of `trip_id`
+        and for the extra `user_ids`. Must run before the memberships are deleted.
+        """
+        user_ids = set(user_ids)
+        if trip_id is not None:
+            user_ids.update(
+                UserTrip.objects.filter(trip_id=trip_id).values_list("user", flat=True)
+            )
+        cls.objects.bulk_create(
+            [
+                cls(user_id=user_id, model=model, object_id=object_id)
+                for user_id in user_ids
+                for object_id in object_ids
+            ]
+        )
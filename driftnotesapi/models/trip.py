@@ -1,5 +1,20 @@
-from django.db import models
+from datetime import timedelta
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
+from django.utils import timezone
+from driftnotesapi import search
+from .day import Day
+from .event import Event
+from .tombstone import Tombstone
+from .usertrip import UserTrip
+
+
+class TripManager(models.Manager):
+    """Trips that have not been deleted"""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
 
 
 class Trip(models.Model):
@@ -12,3 +27,89 @@ class Trip(models.Model):
     end_date = models.DateField(
         null=True
     )
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+    # Bumped whenever a day or event of the trip changes
+    revision = models.PositiveIntegerField(default=0)
+    # Set when the trip was deleted but its rows are not purged yet
+    deleted_at = models.DateTimeField(null=True, blank=True)
+
+    objects = TripManager()
+    all_objects = models.Manager()
+
+    @classmethod
+    def bump_revision(cls, *trip_ids):
+        """Record that the days or events of the given trips changed"""
+        cls.objects.filter(pk__in=trip_ids).update(
+            revision=F("revision") + 1, updated_at=timezone.now()
+        )
+
+    @classmethod
+    def purge(cls, *trip_ids):
+        """
+        Delete trips with their events, days and usertrips.
+
+        Tables are emptied from the events up: events have no dependents or
+        receivers, so the collector deletes them with one DELETE without loading
+        them, and the days and trips left to collect have no events to cascade to.
+        Usertrips go through their post_delete receivers. Returns the ids of the
+        trips' members, whose cached memberships the caller drops again once the
+        transaction is committed.
+        """
+        with transaction.atomic():
+            member_ids = set(
+                UserTrip.objects.filter(trip__in=trip_ids).values_list("user", flat=True)
+            )
+            search.unindex_trips(*trip_ids)
+            Event.objects.filter(day__trip__in=trip_ids).delete()
+            Day.objects.filter(trip__in=trip_ids).delete()
+            cls.all_objects.filter(pk__in=trip_ids).delete()
+        return member_ids
+
+    def soft_delete(self):
+        """
+        Hide the trip right away and leave its rows to purge_deleted_trips().
+
+        Only the memberships are deleted here, which is enough to take the trip,
+        its days and its events out of every collaborator's lists. Returns the ids
+        of the former members, like purge().
+        """
+        with transaction.atomic():
+            memberships = UserTrip.objects.filter(trip=self)
+            member_ids = set(memberships.values_list("user", flat=True))
+            memberships.delete()
+            self.deleted_at = timezone.now()
+            Trip.all_objects.filter(pk=self.pk).update(deleted_at=self.deleted_at)
+        return member_ids
+
+    def sync_days(self):
+        """
+        Make the trip's days match its date range.
+
+        Days outside of the range are removed and missing dates are bulk inserted,
+        so the number of queries stays the same no matter how long the trip is.
+        """
+        if self.start_date is None or self.end_date is None:
+            return
+
+        with transaction.atomic():
+            stale_day_ids = list(
+                Day.objects.filter(trip=self)
+                .exclude(date__range=(self.start_date, self.end_date))
+                .values_list("id", flat=True)
+            )
+            if stale_day_ids:
+                Tombstone.record("day", stale_day_ids, trip_id=self.id)
+                search.unindex_days(*stale_day_ids)
+                # The collector deletes the days' events with one statement per batch of days
+                Day.objects.filter(pk__in=stale_day_ids).delete()
+
+            existing_dates = set(
+                Day.objects.filter(trip=self).values_list("date", flat=True)
+            )
+            trip_length = (self.end_date - self.start_date).days + 1
+            trip_dates = (
+                self.start_date + timedelta(days=x) for x in range(trip_length)
+            )
+            Day.objects.bulk_create(
+                [Day(trip=self, date=date) for date in trip_dates if date not in existing_dates]
+            )
@@ -5,3 +5,10 @@ from django.contrib.auth.models import User
 class UserTrip(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="usertrips")
     trip = models.ForeignKey("Trip", on_delete=models.CASCADE, related_name="usertrips")
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+
+    class Meta:
+        constraints = [
+            # Also serves as the (user, trip) index behind every collaborator check
+            models.UniqueConstraint(fields=["user", "trip"], name="unique_user_trip"),
+        ]
@@ -0,0 +1,73 @@
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+from driftnotesapi.streaming import stream_list, stream_requested
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination for the list endpoints.
+
+    Pages are opt-in: a client asks for them by sending `page_size` or `cursor`,
+    otherwise the list endpoints keep returning the whole result set.
+    As in DRF's CursorPagination, a cursor holds the value of the first ordering
+    column only, plus an offset among the rows sharing that value; the other
+    columns just make the order deterministic. Pages seek on the first column, so
+    many rows with the same value there (events of one date) are counted through
+    with the offset, and rows added or removed among them can shift a page.
+    """
+
+    ordering = ("id",)
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = ordering
+
+    @classmethod
+    def requested(cls, request):
+        """Whether the client asked for a page instead of the whole list"""
+        params = request.query_params
+        return cls.cursor_query_param in params or cls.page_size_query_param in params
+
+
+def list_response(view, request, queryset, serializer_class, ordering=None):
+    """
+    Serialize a list queryset, one page at a time when the client asks for pages,
+    or streamed chunk by chunk when it sends `stream=true`.
+
+    Method arguments:
+      view -- The viewset handling the request
+      request -- The full HTTP request object
+      queryset -- The rows the user is allowed to see
+      serializer_class -- Serializer used for each row
+      ordering -- Ordering of the pages, defaults to ("id",)
+    """
+    context = {"request": request}
+    # Flat serializers read plain .values() rows instead of model instances,
+    # limited to the requested fields plus the columns the cursor is built from
+    prepare_queryset = getattr(serializer_class, "prepare_queryset", None)
+    if prepare_queryset is not None:
+        queryset = prepare_queryset(
+            queryset, request, extra_columns=ordering or KeysetPagination.ordering
+        )
+
+    if KeysetPagination.requested(request):
+        paginator = KeysetPagination(ordering)
+        try:
+            page = paginator.paginate_queryset(queryset, request, view=view)
+        except NotFound:
+            # Raised for cursors that do not decode; the views would turn it into a 500
+            return Response(
+                {"message": "Invalid cursor"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = serializer_class(page, many=True, context=context)
+        return paginator.get_paginated_response(serializer.data)
+
+    if stream_requested(request):
+        return stream_list(request, queryset, serializer_class)
+
+    serializer = serializer_class(queryset, many=True, context=context)
+    return Response(serializer.data)
@@ -0,0 +1,97 @@
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.permissions import BasePermission
+from driftnotesapi.models import Trip, Day, Event, UserTrip
+
+
+def _cache_key(user_id):
+    return f"driftnotes:trip-ids:{user_id}"
+
+
+def trip_ids_for(request):
+    """
+    Ids of the trips the requesting user collaborates on.
+
+    The set is resolved once per request. When MEMBERSHIP_CACHE_TIMEOUT is set it is
+    also shared across requests, and dropped whenever one of the user's UserTrip rows
+    is created or deleted (see driftnotesapi.signals).
+    """
+    trip_ids = getattr(request, "_collaborator_trip_ids", None)
+    if trip_ids is not None:
+        return trip_ids
+
+    user = request.user
+    if not user.is_authenticated:
+        trip_ids = frozenset()
+    else:
+        timeout = getattr(settings, "MEMBERSHIP_CACHE_TIMEOUT", 0)
+        trip_ids = cache.get(_cache_key(user.pk)) if timeout else None
+        if trip_ids is None:
+            trip_ids = frozenset(
+                UserTrip.objects.filter(user=user).values_list("trip", flat=True)
+            )
+            if timeout:
+                cache.set(_cache_key(user.pk), trip_ids, timeout)
+
+    request._collaborator_trip_ids = trip_ids
+    return trip_ids
+
+
+async def atrip_ids_for(request):
+    """trip_ids_for() for async views"""
+    trip_ids = getattr(request, "_collaborator_trip_ids", None)
+    if trip_ids is not None:
+        return trip_ids
+
+    user = request.user
+    if not user.is_authenticated:
+        trip_ids = frozenset()
+    else:
+        timeout = getattr(settings, "MEMBERSHIP_CACHE_TIMEOUT", 0)
+        trip_ids = await cache.aget(_cache_key(user.pk)) if timeout else None
+        if trip_ids is None:
+            trip_ids = frozenset(
+                [
+                    trip_id
+                    async for trip_id in UserTrip.objects.filter(user=user).values_list(
+                        "trip", flat=True
+                    )
+                ]
+            )
+            if timeout:
+                await cache.aset(_cache_key(user.pk), trip_ids, timeout)
+
+    request._collaborator_trip_ids = trip_ids
+    return trip_ids
+
+
+def forget_trip_ids(user_id):
+    """Drop the cached trip ids of a user whose memberships changed"""
+    cache.delete(_cache_key(user_id))
+
+
+def is_collaborator(request, trip_id):
+    """Whether the requesting user collaborates on the trip with the given id"""
+    return trip_id in trip_ids_for(request)
+
+
+def trip_id_of(obj):
+    """Id of the trip a trip, day, event or usertrip belongs to"""
+    if isinstance(obj, Trip):
+        return obj.pk
+    if isinstance(obj, Event):
+        return obj.day.trip_id
+    if isinstance(obj, (Day, UserTrip)):
+        return obj.trip_id
+    return None
+
+
+class IsTripCollaborator(BasePermission):
+    """
+    Object level permission that only lets collaborators of the object's trip through.
+    """
+
+    message = "You need to be part of a trip to view this resource."
+
+    def has_object_permission(self, request, view, obj):
+        return is_collaborator(request, trip_id_of(obj))
@@ -0,0 +1,255 @@
+"""
+Full-text search over event titles and locations, and trip titles and cities.
+
+Documents live in one table next to the models, created after migrate:
+
+  SQLite -- An FTS5 virtual table, ranked with bm25()
+  PostgreSQL -- A table with a generated tsvector column under a GIN index,
+                ranked with ts_rank()
+
+Other databases, or SQLite builds without FTS5, fall back to icontains
+lookups on the models, unranked.
+
+Each document is keyed by the id of its object, doubled for events and doubled
+plus one for trips (the FTS5 rowid), so it is replaced or removed with an
+indexed lookup. The viewsets and Trip call index_*() after writing rows and
+unindex_*() before deleting them, in the same transaction. Documents only
+carry their trip id and searches join it with the caller's memberships, so
+leaving a trip hides its documents at once.
+"""
+
+import logging
+import re
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+TABLE = "driftnotes_search"
+# Words of a query after the first ones are ignored
+MAX_TERMS = 8
+
+_backends = {}
+
+
+def _table(model_name):
+    return apps.get_model("driftnotesapi", model_name)._meta.db_table
+
+
+def _key_column(connection):
+    return "rowid" if connection.vendor == "sqlite" else "doc_id"
+
+
+def index_backend(using=DEFAULT_DB_ALIAS):
+    """`fts5`, `tsvector` or None when the database has no search index"""
+    if using not in _backends:
+        connection = connections[using]
+        backend = None
+        if connection.vendor in ("sqlite", "postgresql"):
+            with connection.cursor() as cursor:
+                if TABLE in connection.introspection.table_names(cursor):
+                    backend = "fts5" if connection.vendor == "sqlite" else "tsvector"
+        _backends[using] = backend
+    return _backends[using]
+
+
+def create_index(using=DEFAULT_DB_ALIAS):
+    """Create the search table if the database supports it, and fill it when empty"""
+    connection = connections[using]
+    if connection.vendor == "sqlite":
+        statements = [
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5("
+            "kind UNINDEXED, object_id UNINDEXED, trip_id UNINDEXED, title, body, "
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        ]
+    elif connection.vendor == "postgresql":
+        document = (
+            "setweight(to_tsvector('simple', title), 'A') || "
+            "setweight(to_tsvector('simple', body), 'B')"
+        )
+        statements = [
+            f"CREATE TABLE IF NOT EXISTS {TABLE} ("
+            "doc_id bigint PRIMARY KEY, kind varchar(5) NOT NULL, object_id bigint NOT NULL, "
+            "trip_id bigint NOT NULL, title text NOT NULL, body text NOT NULL, "
+            f"document tsvector GENERATED ALWAYS AS ({document}) STORED)",
+            f"CREATE INDEX IF NOT EXISTS {TABLE}_document_idx ON {TABLE} USING GIN (document)",
+            f"CREATE INDEX IF NOT EXISTS {TABLE}_trip_idx ON {TABLE} (trip_id)",
+        ]
+    else:
+        return
+
+    _backends.pop(using, None)
+    try:
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+    except DatabaseError as ex:
+        # e.g. SQLite compiled without FTS5
+        logger.warning("Search falls back to icontains lookups: %s", ex)
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT 1 FROM {TABLE} LIMIT 1")
+        empty = cursor.fetchone() is None
+    if empty:
+        rebuild_index(using)
+
+
+def rebuild_index(using=DEFAULT_DB_ALIAS):
+    """Index every trip and event again, e.g. after a bulk import"""
+    if index_backend(using) is None:
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE}")
+    _index("trip", None, using)
+    _index("event", None, using)
+
+
+def _index(kind, ids, using):
+    connection = connections[using]
+    key = _key_column(connection)
+    if kind == "trip":
+        select = f"SELECT id * 2 + 1, 'trip', id, id, title, city FROM {_table('Trip')}"
+        conditions = ["deleted_at IS NULL"]
+        column = "id"
+    else:
+        select = (
+            "SELECT e.id * 2, 'event', e.id, d.trip_id, e.title, COALESCE(e.location, '') "
+            f"FROM {_table('Event')} e INNER JOIN {_table('Day')} d ON d.id = e.day_id"
+        )
+        conditions = []
+        column = "e.id"
+    if ids is not None:
+        conditions.append(f"{column} IN ({_placeholders(ids)})")
+    if conditions:
+        select += " WHERE " + " AND ".join(conditions)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {TABLE} ({key}, kind, object_id, trip_id, title, body) {select}",
+            list(ids or ()),
+        )
+
+
+def _unindex(keys_sql, params, using):
+    connection = connections[using]
+    key = _key_column(connection)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE} WHERE {key} IN ({keys_sql})", params)
+
+
+def _placeholders(ids):
+    return ", ".join(["%s"] * len(ids))
+
+
+def _keys(ids, offset):
+    """Placeholders and values of the document keys of trips (offset 1) or events (offset 0)"""
+    return _placeholders(ids), [int(pk) * 2 + offset for pk in ids]
+
+
+def index_trips(*trip_ids, using=DEFAULT_DB_ALIAS):
+    """Index new or edited trips"""
+    if trip_ids and index_backend(using):
+        _unindex(*_keys(trip_ids, 1), using)
+        _index("trip", trip_ids, using)
+
+
+def index_events(*event_ids, using=DEFAULT_DB_ALIAS):
+    """Index new or edited events, including events moved to another day"""
+    if event_ids and index_backend(using):
+        _unindex(*_keys(event_ids, 0), using)
+        _index("event", event_ids, using)
+
+
+def unindex_events(*event_ids, using=DEFAULT_DB_ALIAS):
+    """Remove events from the index"""
+    if event_ids and index_backend(using):
+        _unindex(*_keys(event_ids, 0), using)
+
+
+def unindex_days(*day_ids, using=DEFAULT_DB_ALIAS):
+    """Remove the events of days, before the days are deleted"""
+    if day_ids and index_backend(using):
+        _unindex(
+            f"SELECT id * 2 FROM {_table('Event')} WHERE day_id IN ({_placeholders(day_ids)})",
+            list(day_ids),
+            using,
+        )
+
+
+def unindex_trips(*trip_ids, using=DEFAULT_DB_ALIAS):
+    """Remove trips and their events from the index, before the trips are deleted"""
+    if trip_ids and index_backend(using):
+        _unindex(*_keys(trip_ids, 1), using)
+        _unindex(
+            f"SELECT e.id * 2 FROM {_table('Event')} e INNER JOIN {_table('Day')} d "
+            f"ON d.id = e.day_id WHERE d.trip_id IN ({_placeholders(trip_ids)})",
+            list(trip_ids),
+            using,
+        )
+
+
+def query_terms(text):
+    """Lowercase words of a search query"""
+    return re.findall(r"[^\W_]+", text.lower())[:MAX_TERMS]
+
+
+def search(terms, user_id, limit, offset=0, using=DEFAULT_DB_ALIAS):
+    """
+    Best matches of every term among the trips of a user and their events, as
+    dicts of kind, object_id, trip_id, title, body and rank (higher is better).
+    The last term also matches longer words, so partial input finds results.
+    """
+    if not terms:
+        return []
+    backend = index_backend(using)
+    if backend is None:
+        return _search_fallback(terms, user_id, limit, offset)
+
+    members = f"SELECT trip_id FROM {_table('UserTrip')} WHERE user_id = %s"
+    if backend == "fts5":
+        match = " ".join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+        # bm25() is lower for better matches and weighs each column: titles count double
+        sql = (
+            f"SELECT kind, object_id, trip_id, title, body, -bm25({TABLE}, 0, 0, 0, 2.0, 1.0) AS rank "
+            f"FROM {TABLE} WHERE {TABLE} MATCH %s AND trip_id IN ({members}) "
+            "ORDER BY rank DESC, rowid LIMIT %s OFFSET %s"
+        )
+    else:
+        match = " & ".join(terms[:-1] + [f"{terms[-1]}:*"])
+        sql = (
+            f"SELECT kind, object_id, trip_id, title, body, ts_rank(document, query) AS rank "
+            f"FROM {TABLE}, to_tsquery('simple', %s) query "
+            f"WHERE document @@ query AND trip_id IN ({members}) "
+            "ORDER BY rank DESC, doc_id LIMIT %s OFFSET %s"
+        )
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, [match, user_id, limit, offset])
+        columns = [column[0] for column in cursor.description]
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def _search_fallback(terms, user_id, limit, offset):
+    """Trips then events containing every term, without a ranking"""
+    Trip, Event = apps.get_model("driftnotesapi", "Trip"), apps.get_model("driftnotesapi", "Event")
+    trip_filter, event_filter = Q(), Q()
+    for term in terms:
+        trip_filter &= Q(title__icontains=term) | Q(city__icontains=term)
+        event_filter &= Q(title__icontains=term) | Q(location__icontains=term)
+
+    trips = Trip.objects.filter(trip_filter, usertrips__user=user_id).order_by("id")
+    rows = [
+        {"kind": "trip", "object_id": trip["id"], "trip_id": trip["id"],
+         "title": trip["title"], "body": trip["city"], "rank": 0.0}
+        for trip in trips.values("id", "title", "city")[offset:offset + limit]
+    ]
+    if len(rows) < limit:
+        events = Event.objects.filter(event_filter, day__trip__usertrips__user=user_id).order_by("id")
+        skipped = max(offset - trips.count(), 0)
+        rows += [
+            {"kind": "event", "object_id": event["id"], "trip_id": event["day__trip"],
+             "title": event["title"], "body": event["location"] or "", "rank": 0.0}
+            for event in events.values("id", "title", "location", "day__trip")[
+                skipped:skipped + limit - len(rows)
+            ]
+        ]
+    return rows
@@ -0,0 +1,71 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from driftnotesapi.models import Category, Event, Trip, UserTrip
+from .authentication import token_cache
+from .permissions import forget_trip_ids
+from .search import create_index
+
+
+@receiver(post_save, sender=Token)
+@receiver(post_delete, sender=Token)
+def forget_token(sender, instance, **kwargs):
+    """Drop a cached token when it is replaced or removed"""
+    token_cache.evict(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_user_tokens(sender, instance, **kwargs):
+    """Drop cached tokens of a user whose account was edited or removed"""
+    token_cache.evict_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def touch_created_trips(sender, instance, created, update_fields=None, **kwargs):
+    """Move a user's trips forward, since trip documents embed their creator"""
+    # Logging in only records last_login, which the documents leave out
+    if created or update_fields == frozenset(["last_login"]):
+        return
+    Trip.objects.filter(creator=instance).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def touch_category_events(sender, instance, created=False, **kwargs):
+    """Move a category's events and their trips forward, since event documents embed it"""
+    if created:
+        return
+    events = Event.objects.filter(category_id=instance.pk)
+    trip_ids = set(events.values_list("day__trip", flat=True))
+    if trip_ids:
+        events.update(updated_at=timezone.now())
+        Trip.bump_revision(*trip_ids)
+
+
+@receiver(post_save, sender=UserTrip)
+@receiver(post_delete, sender=UserTrip)
+def forget_memberships(sender, instance, **kwargs):
+    """Drop the cached trip ids of a user who joined or left a trip"""
+    forget_trip_ids(instance.user_id)
+
+
+@receiver(post_migrate)
+def create_search_index(sender, using, **kwargs):
+    """Create the full-text search table, which migrations know nothing about"""
+    if sender.name == "driftnotesapi":
+        create_index(using)
+
+
+@receiver(connection_created)
+def tune_sqlite(sender, connection, **kwargs):
+    """Apply settings.SQLITE_PRAGMAS to each new SQLite connection"""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for name, value in getattr(settings, "SQLITE_PRAGMAS", {}).items():
+            cursor.execute(f"PRAGMA {name} = {value}")
@@ -0,0 +1,70 @@
+"""
+Sparse fieldsets and expansion of nested objects.
+
+`?fields=id,title` limits an object to the listed top-level fields.
+`?expand=day,day.trip` lists the nested objects to render in full. Once `expand`
+is sent, every nested object that is not listed is returned as its id; without
+it, objects are nested exactly as before.
+"""
+
+
+def _split(value):
+    return [part.strip() for part in value.split(",") if part.strip()]
+
+
+def requested_fields(request):
+    """Top-level fields the client asked for, None for all of them"""
+    value = request.query_params.get("fields")
+    return None if value is None else tuple(_split(value))
+
+
+def requested_expansions(request):
+    """
+    Dotted paths of the nested objects to render in full, None to keep the default.
+    Expanding a path also expands its parents, so "day.trip" implies "day".
+    """
+    value = request.query_params.get("expand")
+    if value is None:
+        return None
+    expansions = set()
+    for path in _split(value):
+        parts = path.split(".")
+        expansions.update(".".join(parts[: i + 1]) for i in range(len(parts)))
+    return frozenset(expansions)
+
+
+def is_expanded(expansions, path):
+    return expansions is None or path in expansions
+
+
+def collapse(value, expansions, path=""):
+    """Replace nested objects that were not expanded by their ids"""
+    if isinstance(value, list):
+        return [collapse(item, expansions, path) for item in value]
+    if not isinstance(value, dict):
+        return value
+
+    collapsed = {}
+    for key, item in value.items():
+        item_path = f"{path}{key}"
+        nested = item if isinstance(item, dict) else None
+        if isinstance(item, list) and item and all(isinstance(x, dict) for x in item):
+            nested = item
+        if nested is None:
+            collapsed[key] = item
+        elif not is_expanded(expansions, item_path):
+            collapsed[key] = [x["id"] for x in item] if isinstance(item, list) else item["id"]
+        else:
+            collapsed[key] = collapse(item, expansions, f"{item_path}.")
+    return collapsed
+
+
+def sparse_data(request, data):
+    """Apply `fields` and `expand` to an already serialized object"""
+    fields = requested_fields(request)
+    expansions = requested_expansions(request)
+    if fields is not None:
+        data = {key: value for key, value in data.items() if key in fields}
+    if expansions is not None:
+        data = collapse(data, expansions)
+    return data
@@ -0,0 +1,56 @@
+import json
+from itertools import islice
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.utils import encoders
+
+# Rows fetched from the database cursor and serialized per step
+STREAM_CHUNK_SIZE = 500
+
+
+def stream_requested(request):
+    """
+    Whether the client asked for the list to be streamed.
+    Only JSON is streamed; other formats are rendered as a whole.
+    """
+    renderer = getattr(request, "accepted_renderer", None)
+    if renderer is not None and not isinstance(renderer, JSONRenderer):
+        return False
+    return request.query_params.get("stream", "").lower() in ("1", "true")
+
+
+def _encode(item):
+    # Same output as DRF's JSONRenderer with the default settings
+    return json.dumps(
+        item,
+        cls=encoders.JSONEncoder,
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=(",", ":") if api_settings.COMPACT_JSON else (", ", ": "),
+    )
+
+
+def stream_list(request, queryset, serializer_class, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    JSON array response that is serialized and sent a chunk of rows at a time.
+
+    Rows are read with .iterator() so neither the queryset cache nor the full
+    list of dicts is ever held in memory; the body is the same as a regular
+    list response.
+    """
+    context = {"request": request}
+
+    def chunks():
+        rows = queryset.iterator(chunk_size=chunk_size)
+        separator = "["
+        while True:
+            batch = list(islice(rows, chunk_size))
+            if not batch:
+                break
+            data = serializer_class(batch, many=True, context=context).data
+            yield (separator + ",".join(_encode(item) for item in data)).encode()
+            separator = ","
+        yield b"[]" if separator == "[" else b"]"
+
+    return StreamingHttpResponse(chunks(), content_type="application/json")
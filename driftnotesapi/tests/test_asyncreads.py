@@ -0,0 +1,63 @@
+from unittest import mock
+from django.test import override_settings
+from django.urls import include, path
+from driftnotesapi.models import Day, Event
+from driftnotesapi.views import asyncreads
+from driftnotesproject.urls import router
+from .utils import APITestCase, make_trip, make_user
+
+# The API with the async read views, as driftnotesproject.urls serves it when
+# settings.ASYNC_READ_VIEWS is set
+urlpatterns = [path("", include(asyncreads.async_read_urls(router.urls)))]
+
+
+class AsyncReadTests(APITestCase):
+    """The async read views answer as the viewsets do"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("reader")
+        self.trip = make_trip(self.user, days=2, events=2)
+        make_trip(make_user("stranger"), days=1, events=1)
+        self.day = Day.objects.filter(trip=self.trip).order_by("date").first()
+        self.event = Event.objects.filter(day=self.day).order_by("start_time").first()
+        self.client = self.client_for(self.user)
+        # Only tokens already in the token cache are served by the async views
+        self.client.get(f"/users/{self.user.id}")
+
+    def paths(self):
+        return [
+            "/trips",
+            f"/trips/{self.trip.id}",
+            f"/trips/{self.trip.id}/itinerary",
+            f"/trips/{self.trip.id}/itinerary?fields=id,days&expand=days",
+            "/days",
+            "/days?from=2024-05-02",
+            f"/days/{self.day.id}",
+            "/events",
+            f"/events?trip={self.trip.id}",
+            f"/events/{self.event.id}",
+            f"/events/{self.event.id}?fields=id,title",
+            "/events/999999",
+            "/days?from=nope",
+        ]
+
+    def test_same_responses(self):
+        for path in self.paths():
+            with self.subTest(path=path):
+                expected = self.client.get(path)
+                with override_settings(ROOT_URLCONF=__name__), mock.patch.object(
+                    asyncreads, "json_response", wraps=asyncreads.json_response
+                ) as json_response:
+                    response = self.client.get(path)
+                self.assertTrue(json_response.called, "Not answered by the async view")
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response.json(), expected.json())
+                self.assertEqual(response.get("ETag"), expected.get("ETag"))
+
+    def test_not_modified(self):
+        path = f"/trips/{self.trip.id}/itinerary"
+        etag = self.client.get(path)["ETag"]
+        with override_settings(ROOT_URLCONF=__name__):
+            response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,37 @@
+from rest_framework.authtoken.models import Token
+from driftnotesapi.authentication import token_cache
+from .utils import APITestCase, make_user
+
+
+class TokenCacheTests(APITestCase):
+    """Cached tokens stop working as soon as they are deleted or their user changes"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("holder")
+        self.client = self.client_for(self.user)
+        self.key = Token.objects.get(user=self.user).key
+        self.path = f"/users/{self.user.id}"
+
+    def assert_cached(self):
+        self.assertEqual(self.client.get(self.path).status_code, 200)
+        self.assertIsNotNone(token_cache.get(self.key))
+
+    def test_cached_lookup(self):
+        self.assert_cached()
+        # Token and user come from the cache
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.path).status_code, 200)
+
+    def test_deleted_token(self):
+        self.assert_cached()
+        Token.objects.get(key=self.key).delete()
+        self.assertIsNone(token_cache.get(self.key))
+        self.assertEqual(self.client.get(self.path).status_code, 401)
+
+    def test_deactivated_user(self):
+        self.assert_cached()
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(token_cache.get(self.key))
+        self.assertEqual(self.client.get(self.path).status_code, 401)
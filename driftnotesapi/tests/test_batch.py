@@ -0,0 +1,99 @@
+from driftnotesapi.models import Day, Event
+from .utils import APITestCase, make_trip, make_user
+
+
+class BatchTests(APITestCase):
+    """POST /events/batch checks each operation as the single event endpoints do"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("batcher")
+        self.trip = make_trip(self.user, days=1, events=2)
+        self.day = Day.objects.get(trip=self.trip)
+        # Event 0 runs 08:00-09:00 and event 1 10:00-11:00
+        self.first, self.second = Event.objects.filter(day=self.day).order_by("start_time")
+
+    def batch(self, operations, conflicts=None):
+        path = "/events/batch" + (f"?conflicts={conflicts}" if conflicts else "")
+        return self.client_for(self.user).post(path, {"operations": operations}, format="json")
+
+    def overlapping_create(self):
+        return {"op": "create", "day": self.day.id, "title": "Brunch", "start_time": "08:30", "end_time": "09:30"}
+
+    def test_reject_create(self):
+        response = self.batch([self.overlapping_create()], conflicts="reject")
+        self.assertEqual(response.status_code, 400)
+        result = response.json()["results"][0]
+        self.assertEqual(result["status"], 409)
+        self.assertEqual([event["id"] for event in result["conflicts"]], [self.first.id])
+        self.assertEqual(Event.objects.filter(day=self.day).count(), 2)
+
+    def test_reject_update(self):
+        response = self.batch(
+            [
+                {"op": "update", "id": self.second.id, "start_time": "08:30"},
+                self.overlapping_create() | {"start_time": "14:00", "end_time": "15:00"},
+            ],
+            conflicts="reject",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([result["status"] for result in response.json()["results"]], [409, 424])
+        self.assertEqual(Event.objects.get(pk=self.second.id).start_time.hour, 10)
+
+    def test_reject_within_batch(self):
+        second_create = dict(self.overlapping_create(), start_time="12:00", end_time="13:00")
+        response = self.batch(
+            [second_create, dict(second_create, title="Lunch", start_time="12:30")],
+            conflicts="reject",
+        )
+        self.assertEqual([result["status"] for result in response.json()["results"]], [409, 409])
+
+    def test_reject_allows_moved_and_deleted(self):
+        response = self.batch(
+            [
+                {"op": "delete", "id": self.first.id},
+                {"op": "update", "id": self.second.id, "start_time": "08:00", "end_time": "09:00"},
+                self.overlapping_create() | {"start_time": "10:00", "end_time": "11:00"},
+            ],
+            conflicts="reject",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Event.objects.filter(day=self.day).count(), 2)
+
+    def test_warn(self):
+        response = self.batch([self.overlapping_create()], conflicts="warn")
+        self.assertEqual(response.status_code, 200)
+        result = response.json()["results"][0]
+        self.assertEqual(result["status"], 201)
+        self.assertEqual([event["id"] for event in result["conflicts"]], [self.first.id])
+
+    def test_string_ids(self):
+        response = self.batch(
+            [{"op": "update", "id": str(self.first.id), "day": str(self.day.id), "title": "Coffee"}]
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Event.objects.get(pk=self.first.id).title, "Coffee")
+
+    def test_invalid_ids(self):
+        response = self.batch(
+            [
+                {"op": "update", "id": "first", "title": "Coffee"},
+                {"op": "delete", "id": self.second.id},
+                {"op": "create", "day": [self.day.id], "title": "Brunch"},
+                {"op": "create", "day": 0, "title": "Brunch"},
+                {"op": "create", "title": "Brunch"},
+                {"op": "create", "day": self.day.id, "title": None},
+                {"op": "create", "day": self.day.id, "title": ""},
+                {"op": "update", "id": self.first.id, "title": "  "},
+            ]
+        )
+        self.assertEqual(response.status_code, 400)
+        results = response.json()["results"]
+        self.assertEqual(
+            [result["status"] for result in results], [400, 424, 400, 400, 400, 400, 400, 400]
+        )
+        self.assertEqual(results[0]["message"], "Ids must be positive integers")
+        self.assertEqual(results[3]["message"], "Ids must be positive integers")
+        self.assertEqual(results[4]["message"], "Missing required field")
+        self.assertEqual(results[6]["message"], "Title must not be empty")
+        self.assertEqual(Event.objects.filter(day=self.day).count(), 2)
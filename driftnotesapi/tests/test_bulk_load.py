@@ -0,0 +1,60 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from django.core.management import call_command
+from driftnotesapi.models import Category, Event
+from .utils import APITestCase, make_trip, make_user
+
+
+class BulkLoadTests(APITestCase):
+    """bulk_load inserts every row, with or without primary keys"""
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8", newline="") as stream:
+            stream.write(content)
+        return path
+
+    def load(self, *paths, **options):
+        call_command("bulk_load", *paths, stdout=StringIO(), **options)
+
+    def test_csv_without_pks(self):
+        path = self.write("category.csv", "name\nBusiness\nPersonal\nBusiness\n")
+        for on_conflict in ("update", "ignore", "error"):
+            with self.subTest(on_conflict=on_conflict):
+                before = Category.objects.count()
+                self.load(path, on_conflict=on_conflict)
+                self.assertEqual(Category.objects.count(), before + 3)
+
+    def test_json_without_pks(self):
+        day = make_trip(make_user("loader"), days=1, events=0).day_set.get()
+        path = self.write(
+            "events.json",
+            json.dumps(
+                [
+                    {"model": "driftnotesapi.event", "fields": {"title": title, "day": day.id}}
+                    for title in ("Breakfast", "Lunch", "Dinner")
+                ]
+            ),
+        )
+        self.load(path)
+        self.assertEqual(
+            sorted(Event.objects.filter(day=day).values_list("title", flat=True)),
+            ["Breakfast", "Dinner", "Lunch"],
+        )
+
+    def test_later_rows_win(self):
+        path = self.write("category.csv", "id,name\n7,Business\n,Personal\n7,Leisure\n")
+        self.load(path)
+        self.assertEqual(Category.objects.get(pk=7).name, "Leisure")
+        self.assertEqual(Category.objects.filter(name="Personal").count(), 1)
+        # Later loads take new ids past the explicit ones
+        self.load(self.write("more.csv", "name\nErrands\n"), model="driftnotesapi.category")
+        self.assertGreater(Category.objects.get(name="Errands").pk, 7)
@@ -0,0 +1,58 @@
+from datetime import date
+from .utils import APITestCase, make_trip, make_user
+
+
+class CalendarTests(APITestCase):
+    """/calendar and the date window of /days and /events cover only the dates asked for"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("traveller")
+        # April 29 to May 2, with events at 08:00-09:00 and 10:00-11:00 each day
+        self.trip = make_trip(self.user, days=4, events=2, start=date(2024, 4, 29))
+        self.other = make_trip(self.user, days=1, events=1, start=date(2024, 5, 2))
+        make_trip(make_user("stranger"), days=1, events=1, start=date(2024, 5, 1))
+        self.client = self.client_for(self.user)
+
+    def test_month(self):
+        response = self.client.get("/calendar", {"month": "2024-05"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "month": "2024-05",
+                "dates": [
+                    {
+                        "date": "2024-05-01",
+                        "trips": [self.trip.id],
+                        "events": 2,
+                        "start_time": "08:00:00",
+                        "end_time": "11:00:00",
+                    },
+                    {
+                        "date": "2024-05-02",
+                        "trips": [self.trip.id, self.other.id],
+                        "events": 3,
+                        "start_time": "08:00:00",
+                        "end_time": "11:00:00",
+                    },
+                ],
+            },
+        )
+
+    def test_one_trip(self):
+        response = self.client.get("/calendar", {"month": "2024-04", "trip": self.other.id})
+        self.assertEqual(response.json()["dates"], [])
+
+    def test_invalid_month(self):
+        for month in (None, "2024-13", "May"):
+            with self.subTest(month=month):
+                params = {} if month is None else {"month": month}
+                self.assertEqual(self.client.get("/calendar", params).status_code, 400)
+
+    def test_window(self):
+        params = {"from": "2024-04-30", "to": "2024-05-01"}
+        days = self.client.get("/days", params).json()
+        self.assertEqual([day["date"] for day in days], ["2024-04-30", "2024-05-01"])
+        events = self.client.get("/events", params).json()
+        self.assertEqual(len(events), 4)
@@ -0,0 +1,61 @@
+from driftnotesapi.models import Category, Day, Event
+from .utils import APITestCase, make_trip, make_user
+
+
+class DetailETagTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.category = Category.objects.create(name="Business")
+        self.user = make_user("etags")
+        self.trip = make_trip(self.user, days=2, events=1, category=self.category)
+        self.day = Day.objects.filter(trip=self.trip).first()
+        self.event = Event.objects.filter(day=self.day).first()
+        self.client = self.client_for(self.user)
+        self.paths = [
+            f"/trips/{self.trip.id}",
+            f"/trips/{self.trip.id}/itinerary",
+            f"/days/{self.day.id}",
+            f"/events/{self.event.id}",
+        ]
+
+    def etag(self, path):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return response["ETag"]
+
+    def test_not_modified(self):
+        for path in self.paths:
+            with self.subTest(path=path):
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=self.etag(path))
+                self.assertEqual(response.status_code, 304)
+
+    def test_sparse_variants(self):
+        for path in self.paths:
+            with self.subTest(path=path):
+                full = self.etag(path)
+                sparse = f"{path}?fields=id"
+                self.assertNotEqual(self.etag(sparse), full)
+                response = self.client.get(sparse, HTTP_IF_NONE_MATCH=full)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json(), {"id": response.json()["id"]})
+
+    def test_creator_change(self):
+        before = {path: self.etag(path) for path in self.paths[:2]}
+        self.user.first_name = "Renamed"
+        self.user.save()
+        for path, etag in before.items():
+            with self.subTest(path=path):
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()["creator"]["first_name"], "Renamed")
+
+    def test_category_change(self):
+        paths = [f"/events/{self.event.id}", f"/trips/{self.trip.id}/itinerary", "/events"]
+        before = {path: self.etag(path) for path in paths}
+        self.category.name = "Leisure"
+        self.category.save()
+        for path, etag in before.items():
+            with self.subTest(path=path):
+                response = self.client.get(path, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(paths[0]).json()["category"]["name"], "Leisure")
@@ -0,0 +1,94 @@
+from unittest import mock
+from django.db import connection
+from driftnotesapi import conflicts
+from driftnotesapi.models import Day, Event
+from .utils import APITestCase, make_trip, make_user
+
+
+class ConflictCheckTests(APITestCase):
+    """?conflicts=reject is checked in the transaction that writes the event"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("planner")
+        self.trip = make_trip(self.user, days=1, events=2)
+        self.day = Day.objects.get(trip=self.trip)
+        # Event 0 runs 08:00-09:00 and event 1 10:00-11:00
+        self.first, self.second = Event.objects.filter(day=self.day).order_by("start_time")
+        self.client = self.client_for(self.user)
+
+    def assert_checked_in_transaction(self, check, send):
+        """`send` makes a request whose conflict check, `check`, runs in a nested atomic block"""
+        depth = len(connection.atomic_blocks)
+        depths = []
+
+        def checked(*args):
+            depths.append(len(connection.atomic_blocks))
+            return getattr(conflicts, check)(*args)
+
+        with mock.patch(f"driftnotesapi.views.event.{check}", side_effect=checked):
+            response = send()
+        self.assertEqual(len(depths), 1)
+        self.assertGreater(depths[0], depth)
+        return response
+
+    def test_create(self):
+        response = self.assert_checked_in_transaction(
+            "overlapping_events",
+            lambda: self.client.post(
+                "/events?conflicts=reject",
+                {"day": self.day.id, "title": "Brunch", "start_time": "08:30", "end_time": "09:30"},
+                format="json",
+            ),
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual([event["id"] for event in response.json()["conflicts"]], [self.first.id])
+        self.assertEqual(Event.objects.filter(day=self.day).count(), 2)
+
+    def test_update(self):
+        response = self.assert_checked_in_transaction(
+            "overlapping_events",
+            lambda: self.client.put(
+                f"/events/{self.second.id}?conflicts=reject", {"start_time": "08:30"}, format="json"
+            ),
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Event.objects.get(pk=self.second.id).start_time.hour, 10)
+
+    def test_batch(self):
+        response = self.assert_checked_in_transaction(
+            "batch_overlaps",
+            lambda: self.client.post(
+                "/events/batch?conflicts=reject",
+                {"operations": [{"op": "update", "id": self.second.id, "start_time": "08:30"}]},
+                format="json",
+            ),
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()["results"][0]["status"], 409)
+
+    def test_warn(self):
+        response = self.client.put(
+            f"/events/{self.second.id}?conflicts=warn", {"start_time": "08:30"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([event["id"] for event in response.json()["conflicts"]], [self.first.id])
+        self.assertEqual(Event.objects.get(pk=self.second.id).start_time.hour, 8)
+
+    def test_invalid_fields(self):
+        for method, path in (("post", "/events"), ("put", f"/events/{self.second.id}")):
+            for body, status_code in (
+                ({"start_time": "nope"}, 400),
+                ({"end_time": 9}, 400),
+                ({"category": 9999}, 404),
+                ({"category": "first"}, 400),
+            ):
+                with self.subTest(method=method, body=body):
+                    body = {"day": self.day.id, "title": "Brunch", **body}
+                    response = getattr(self.client, method)(
+                        f"{path}?conflicts=reject", body, format="json"
+                    )
+                    self.assertEqual(response.status_code, status_code)
+                    self.assertIn("message", response.json())
+        self.assertEqual(Event.objects.filter(day=self.day).count(), 2)
+        self.assertEqual(Event.objects.get(pk=self.second.id).title, "Event 1")
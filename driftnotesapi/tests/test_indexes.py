@@ -0,0 +1,69 @@
+import unittest
+from datetime import date
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from driftnotesapi.daterange import filter_dates
+from driftnotesapi.models import Day, Event, UserTrip
+from .utils import APITestCase, make_trip, make_user
+
+
+@unittest.skipUnless(connection.vendor == "sqlite", "Reads SQLite query plans")
+class IndexUsageTests(APITestCase):
+    """
+    The window queries of /days, /events and /calendar, and the membership lookup,
+    are served by indexes
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.trip = make_trip(make_user("planner"), days=5, events=2)
+        self.window = (date(2024, 5, 2), date(2024, 5, 3))
+
+    def test_day_window(self):
+        days = filter_dates(Day.objects.filter(trip__in=[self.trip.id]), *self.window)
+        self.assertIn("USING INDEX day_trip_date_idx", days.explain())
+        self.assertEqual(days.count(), 2)
+
+    def test_event_window(self):
+        events = filter_dates(
+            Event.objects.filter(day__trip__in=[self.trip.id]), *self.window, field="day__date"
+        ).order_by(F("day__date"), "start_time", "id")
+        plan = events.explain()
+        self.assertIn("day_trip_date_idx", plan)
+        self.assertIn("USING INDEX event_day_start_idx", plan)
+        self.assertEqual(events.count(), 4)
+
+    def test_day_events(self):
+        # The itinerary's prefetch of each day's events in start order
+        events = Event.objects.filter(day__in=Day.objects.filter(trip=self.trip)).order_by(
+            "start_time", "id"
+        )
+        self.assertIn("event_day_start_idx", events.explain())
+
+    def test_memberships(self):
+        # trip_ids_for(), behind every permission check
+        trip_ids = UserTrip.objects.filter(user=self.trip.creator).values_list("trip_id")
+        plan = trip_ids.explain()
+        self.assertIn(f"USING COVERING INDEX {self.unique_user_trip_index()}", plan)
+        self.assertNotIn("SCAN", plan)
+
+    def unique_user_trip_index(self):
+        """SQLite's name for the index behind the unique_user_trip constraint"""
+        table = UserTrip._meta.db_table
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA index_list("{table}")')
+            for _seq, name, unique, origin, _partial in cursor.fetchall():
+                cursor.execute(f'PRAGMA index_info("{name}")')
+                columns = [row[2] for row in cursor.fetchall()]
+                if unique and origin == "u" and columns == ["user_id", "trip_id"]:
+                    return name
+        self.fail("No index backs unique_user_trip")
+
+
+class UniqueUserTripTests(APITestCase):
+    def test_duplicate_membership(self):
+        user = make_user("member")
+        trip = make_trip(user)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            UserTrip.objects.create(user=user, trip=trip)
+        self.assertEqual(UserTrip.objects.filter(user=user, trip=trip).count(), 1)
@@ -0,0 +1,59 @@
+from django.test import RequestFactory, override_settings
+from rest_framework.authtoken.models import Token
+from driftnotesapi.live import Broker, LocalBroker
+from driftnotesapi.views.live import _authenticate
+from .utils import APITestCase, make_user
+
+
+class BrokerTests(APITestCase):
+    def test_abstract(self):
+        with self.assertRaises(TypeError):
+            Broker()
+        self.assertIsInstance(LocalBroker(), Broker)
+
+
+class StreamTokenTests(APITestCase):
+    """The live feed takes short-lived stream tokens in ?token=, never auth tokens"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("listener")
+        self.key = Token.objects.get_or_create(user=self.user)[0].key
+
+    def stream_token(self):
+        response = self.client_for(self.user).post("/live/token")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["token"]
+
+    def authenticate(self, **params):
+        return _authenticate(RequestFactory().get("/live", params))
+
+    def test_issue_requires_auth(self):
+        self.assertEqual(self.client.post("/live/token").status_code, 401)
+        self.assertEqual(self.client_for(self.user).get("/live/token").status_code, 405)
+
+    def test_stream_token(self):
+        self.assertEqual(self.authenticate(token=self.stream_token()), self.user)
+
+    def test_auth_token_refused(self):
+        self.assertIsNone(self.authenticate(token=self.key))
+        self.assertEqual(self.client.get("/live", {"token": self.key}).status_code, 401)
+
+    def test_tampered(self):
+        token = self.stream_token()
+        user_id, rest = token.split(":", 1)
+        self.assertIsNone(self.authenticate(token=f"{int(user_id) + 1}:{rest}"))
+
+    def test_expired(self):
+        token = self.stream_token()
+        with override_settings(LIVE_TOKEN_MAX_AGE=-1):
+            self.assertIsNone(self.authenticate(token=token))
+
+    def test_query_tokens_off(self):
+        token = self.stream_token()
+        with override_settings(LIVE_QUERY_TOKENS=False):
+            self.assertIsNone(self.authenticate(token=token))
+
+    def test_header(self):
+        request = RequestFactory().get("/live", HTTP_AUTHORIZATION=f"Token {self.key}")
+        self.assertEqual(_authenticate(request), self.user)
@@ -0,0 +1,25 @@
+from .utils import APITestCase, make_trip, make_user
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        user = make_user("pager")
+        for _ in range(3):
+            make_trip(user, days=2, events=1)
+        self.client = self.client_for(user)
+
+    def test_pages(self):
+        response = self.client.get("/events?page_size=4")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["results"]), 4)
+        response = self.client.get(response.json()["next"])
+        self.assertEqual(len(response.json()["results"]), 2)
+        self.assertIsNone(response.json()["next"])
+
+    def test_invalid_cursor(self):
+        for path in ("/trips", "/days", "/events", "/usertrips"):
+            with self.subTest(path=path):
+                response = self.client.get(f"{path}?cursor=not-a-cursor")
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json(), {"message": "Invalid cursor"})
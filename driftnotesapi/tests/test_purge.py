@@ -0,0 +1,48 @@
+from django.core.cache import cache
+from django.test import override_settings
+from driftnotesapi.models import Day, Event, Trip, UserTrip
+from driftnotesapi.permissions import _cache_key
+from .utils import APITestCase, make_trip, make_user
+
+
+@override_settings(MEMBERSHIP_CACHE_TIMEOUT=300)
+class PurgeTests(APITestCase):
+    """Deleting a trip takes its rows with it and drops its members' cached memberships"""
+
+    def setUp(self):
+        super().setUp()
+        self.owner = make_user("owner")
+        self.member = make_user("member")
+        self.trip = make_trip(self.owner, members=[self.member], days=3, events=2)
+        self.kept = make_trip(self.member, days=1, events=1)
+
+    def listed_trip_ids(self):
+        return [trip["id"] for trip in self.client_for(self.member).get("/trips").json()]
+
+    def assert_forgotten(self):
+        for user in (self.owner, self.member):
+            self.assertIsNone(cache.get(_cache_key(user.id)))
+
+    def test_purge(self):
+        self.assertIn(self.trip.id, self.listed_trip_ids())
+        self.client_for(self.owner).get("/trips")
+        member_ids = Trip.purge(self.trip.id)
+        self.assert_forgotten()
+        self.assertEqual(member_ids, {self.owner.id, self.member.id})
+        self.assertFalse(Trip.all_objects.filter(pk=self.trip.id).exists())
+        self.assertFalse(Day.objects.filter(trip=self.trip.id).exists())
+        self.assertFalse(Event.objects.filter(day__trip=self.trip.id).exists())
+        self.assertFalse(UserTrip.objects.filter(trip=self.trip.id).exists())
+        self.assertEqual(Event.objects.filter(day__trip=self.kept).count(), 1)
+        self.assertEqual(self.listed_trip_ids(), [self.kept.id])
+
+    def test_soft_delete(self):
+        self.assertIn(self.trip.id, self.listed_trip_ids())
+        self.client_for(self.owner).get("/trips")
+        self.assertEqual(self.trip.soft_delete(), {self.owner.id, self.member.id})
+        self.assert_forgotten()
+        self.assertFalse(Trip.objects.filter(pk=self.trip.id).exists())
+        self.assertEqual(Event.objects.filter(day__trip=self.trip.id).count(), 6)
+        self.assertEqual(self.listed_trip_ids(), [self.kept.id])
+        Trip.purge(self.trip.id)
+        self.assertFalse(Day.objects.filter(trip=self.trip.id).exists())
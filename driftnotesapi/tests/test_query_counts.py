@@ -0,0 +1,67 @@
+from driftnotesapi.models import Category, UserTrip
+from .utils import APITestCase, make_trip, make_user
+
+
+class ListQueryCountTests(APITestCase):
+    """
+    The list and itinerary endpoints load related rows up front, so their query
+    count does not grow with the number of trips, days, events or members
+    """
+
+    # (trips, days per trip, events per day, members besides the user)
+    DATASETS = [(1, 1, 1, 1), (4, 5, 3, 4)]
+
+    def seed(self, name, trips, days, events, members):
+        category = Category.objects.create(name=name)
+        user = make_user(name)
+        others = [make_user(f"{name}-{number}") for number in range(members)]
+        trip_list = [
+            make_trip(user, members=others, days=days, events=events, category=category)
+            for _ in range(trips)
+        ]
+        client = self.client_for(user)
+        # Puts the token in the token cache, as for every request after a user's first
+        client.get(f"/users/{user.id}")
+        return client, trip_list
+
+    def assert_queries(self, path, queries):
+        """
+        GET `path` as a user of each dataset and check it takes `queries` queries.
+        Yields each dataset with the response data.
+        """
+        for size, dataset in enumerate(self.DATASETS):
+            with self.subTest(path=path, dataset=dataset):
+                client, trips = self.seed(f"dataset-{size}", *dataset)
+                with self.assertNumQueries(queries):
+                    response = client.get(path.format(trip=trips[0].id))
+                self.assertEqual(response.status_code, 200)
+                yield dataset, response.json()
+
+    def test_trips(self):
+        # Memberships, trip versions for the ETag, trips with their creators
+        for (trips, _days, _events, _members), data in self.assert_queries("/trips", 3):
+            self.assertEqual(len(data), trips)
+            self.assertTrue(all(trip["creator"]["id"] for trip in data))
+
+    def test_days(self):
+        # Memberships, trip versions, days with their trips
+        for (trips, days, _events, _members), data in self.assert_queries("/days", 3):
+            self.assertEqual(len(data), trips * days)
+
+    def test_events(self):
+        # Memberships, trip versions, events with their days, trips and categories
+        for (trips, days, events, _members), data in self.assert_queries("/events", 3):
+            self.assertEqual(len(data), trips * days * events)
+
+    def test_usertrips(self):
+        # Usertrips with their users and trips
+        for _dataset, data in self.assert_queries("/usertrips", 1):
+            self.assertEqual(len(data), UserTrip.objects.count())
+
+    def test_itinerary(self):
+        # Trip with its creator, memberships, days, events with their categories
+        for (_trips, days, events, _members), data in self.assert_queries(
+            "/trips/{trip}/itinerary", 4
+        ):
+            self.assertEqual(len(data["days"]), days)
+            self.assertEqual(sum(len(day["events"]) for day in data["days"]), days * events)
@@ -0,0 +1,92 @@
+from django.db import connection
+from driftnotesapi import search
+from driftnotesapi.models import Day, Event, UserTrip
+from .utils import APITestCase, make_trip, make_user
+
+
+def documents():
+    """Indexed documents, keyed by kind and object id"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT kind, object_id, trip_id, title, body FROM {search.TABLE}")
+        return {(row[0], row[1]): row[2:] for row in cursor.fetchall()}
+
+
+class SearchTests(APITestCase):
+    """/search finds what the viewsets write, only among the caller's trips"""
+
+    def setUp(self):
+        super().setUp()
+        self.owner = make_user("owner")
+        self.member = make_user("member")
+        self.outsider = make_user("outsider")
+        self.trip = make_trip(self.owner, members=[self.member], days=2, events=1)
+        self.other_trip = make_trip(self.owner, days=1, events=0)
+        self.outsider_trip = make_trip(self.outsider, days=1, events=1)
+        # Rows made by make_trip() skip the viewsets, so they are indexed here
+        search.rebuild_index()
+        self.days = list(Day.objects.filter(trip=self.trip).order_by("date"))
+        self.event = Event.objects.get(day=self.days[0])
+        self.client = self.client_for(self.owner)
+
+    def found(self, user, query):
+        response = self.client_for(user).get("/search", {"q": query})
+        self.assertEqual(response.status_code, 200)
+        return {(result["type"], result["id"]) for result in response.json()["results"]}
+
+    def test_only_callers_trips(self):
+        own_events = Event.objects.filter(day__trip=self.trip)
+        self.assertEqual(self.found(self.owner, "event"), {("event", event.id) for event in own_events})
+        outsider_event = Event.objects.get(day__trip=self.outsider_trip)
+        self.assertEqual(self.found(self.outsider, "event"), {("event", outsider_event.id)})
+
+    def test_empty_query(self):
+        for query in ("", "  ", "!!"):
+            with self.subTest(query=query):
+                response = self.client.get("/search", {"q": query})
+                self.assertEqual(response.status_code, 400)
+
+    def test_member_removed(self):
+        self.assertIn(("event", self.event.id), self.found(self.member, "event"))
+        usertrip = UserTrip.objects.get(user=self.member, trip=self.trip)
+        self.assertEqual(self.client.delete(f"/usertrips/{usertrip.id}").status_code, 204)
+        self.assertEqual(self.found(self.member, "event"), set())
+
+    def require_index(self):
+        if search.index_backend() is None:
+            self.skipTest("The database has no search index")
+
+    def test_event_writes(self):
+        self.require_index()
+        response = self.client.post(
+            "/events",
+            {"day": self.days[0].id, "title": "Harbour cruise", "location": "Pier 4"},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        created = response.json()["id"]
+        self.assertEqual(documents()[("event", created)], (self.trip.id, "Harbour cruise", "Pier 4"))
+        self.assertEqual(self.found(self.owner, "harb"), {("event", created)})
+
+        self.client.put(f"/events/{created}", {"title": "Sunset cruise"}, format="json")
+        self.assertEqual(documents()[("event", created)][1], "Sunset cruise")
+
+        other_day = Day.objects.get(trip=self.other_trip)
+        self.client.put(f"/events/{created}", {"day": other_day.id}, format="json")
+        self.assertEqual(documents()[("event", created)][0], self.other_trip.id)
+
+        self.assertEqual(self.client.delete(f"/events/{created}").status_code, 204)
+        self.assertNotIn(("event", created), documents())
+
+    def test_trip_writes(self):
+        self.require_index()
+        self.client.put(f"/trips/{self.trip.id}", {"title": "Lisbon getaway"}, format="json")
+        self.assertEqual(documents()[("trip", self.trip.id)][1], "Lisbon getaway")
+        self.assertEqual(self.found(self.member, "lisbon"), {("trip", self.trip.id)})
+
+        # Shrinking the trip to its first day drops the second day's events
+        last_event = Event.objects.get(day=self.days[1])
+        self.client.put(
+            f"/trips/{self.trip.id}", {"end_date": str(self.trip.start_date)}, format="json"
+        )
+        self.assertNotIn(("event", last_event.id), documents())
+        self.assertIn(("event", self.event.id), documents())
@@ -0,0 +1,59 @@
+from driftnotesapi.models import Category, Day, Event
+from .utils import APITestCase, make_trip, make_user
+
+
+class SparseFieldsTests(APITestCase):
+    """?fields= picks top-level keys and ?expand= picks the nested objects rendered in full"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = make_user("reader")
+        self.category = Category.objects.create(name="Food")
+        self.trip = make_trip(self.user, days=2, events=1, category=self.category)
+        self.event = Event.objects.filter(day__trip=self.trip).order_by("id").first()
+        self.client = self.client_for(self.user)
+
+    def get(self, path, **params):
+        response = self.client.get(path, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_fields(self):
+        self.assertEqual(
+            self.get(f"/events/{self.event.id}", fields="id,title"),
+            {"id": self.event.id, "title": "Event 0"},
+        )
+        self.assertEqual(
+            self.get(f"/trips/{self.trip.id}", fields="id, city,unknown"),
+            {"id": self.trip.id, "city": "Nashville"},
+        )
+        for day in self.get("/days", fields="id,date"):
+            self.assertEqual(set(day), {"id", "date"})
+
+    def test_default_nesting(self):
+        event = self.get(f"/events/{self.event.id}")
+        self.assertEqual(event["day"]["trip"]["id"], self.trip.id)
+        self.assertEqual(event["category"]["name"], "Food")
+
+    def test_expand(self):
+        event = self.get(f"/events/{self.event.id}", expand="day")
+        self.assertEqual(event["day"]["id"], self.event.day_id)
+        # Once ?expand= is sent, objects not listed are returned as ids
+        self.assertEqual(event["day"]["trip"], self.trip.id)
+        self.assertEqual(event["category"], self.category.id)
+
+        event = self.get(f"/events/{self.event.id}", expand="day.trip", fields="id,day")
+        self.assertEqual(set(event), {"id", "day"})
+        self.assertEqual(event["day"]["trip"]["city"], "Nashville")
+
+    def test_expand_lists(self):
+        days = self.get("/days", expand="", fields="id,trip")
+        self.assertEqual(
+            days, [{"id": day.id, "trip": self.trip.id} for day in Day.objects.order_by("date")]
+        )
+        itinerary = self.get(f"/trips/{self.trip.id}/itinerary", expand="days", fields="days")
+        self.assertEqual(len(itinerary["days"]), 2)
+        self.assertEqual(
+            [day["events"] for day in itinerary["days"]],
+            [[event.id] for event in Event.objects.order_by("day__date")],
+        )
@@ -0,0 +1,51 @@
+from driftnotesapi.models import Day, Event, Trip
+from .utils import APITestCase, make_trip, make_user
+
+
+class MovedEventSyncTests(APITestCase):
+    """An event moved to another trip is deleted for those who only see the old trip"""
+
+    def setUp(self):
+        super().setUp()
+        self.owner = make_user("owner")
+        self.old_member = make_user("old-member")
+        self.both = make_user("both")
+        self.old_trip = make_trip(self.owner, members=[self.old_member, self.both], days=1, events=1)
+        self.new_trip = make_trip(self.owner, members=[self.both], days=1, events=0)
+        self.event = Event.objects.get(day__trip=self.old_trip)
+        self.new_day = Day.objects.get(trip=self.new_trip)
+        self.tokens = {
+            user: self.client_for(user).get("/sync").json()["token"]
+            for user in (self.owner, self.old_member, self.both)
+        }
+
+    def deleted_events(self, user):
+        response = self.client_for(user).get(f"/sync?since={self.tokens[user]}")
+        self.assertEqual(response.status_code, 200)
+        return response.json()["deleted"]["event"]
+
+    def assert_moved(self, revisions):
+        self.assertEqual(Event.objects.get(pk=self.event.id).day_id, self.new_day.id)
+        self.assertEqual(self.deleted_events(self.old_member), [self.event.id])
+        self.assertEqual(self.deleted_events(self.owner), [])
+        self.assertEqual(self.deleted_events(self.both), [])
+        for trip in (self.old_trip, self.new_trip):
+            self.assertGreater(Trip.objects.get(pk=trip.id).revision, revisions[trip.id])
+
+    def test_update(self):
+        revisions = {trip.id: trip.revision for trip in (self.old_trip, self.new_trip)}
+        response = self.client_for(self.owner).put(
+            f"/events/{self.event.id}", {"day": self.new_day.id}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_moved(revisions)
+
+    def test_batch(self):
+        revisions = {trip.id: trip.revision for trip in (self.old_trip, self.new_trip)}
+        response = self.client_for(self.owner).post(
+            "/events/batch",
+            {"operations": [{"op": "update", "id": self.event.id, "day": self.new_day.id}]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_moved(revisions)
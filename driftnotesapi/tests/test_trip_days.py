@@ -0,0 +1,41 @@
+from datetime import timedelta
+from driftnotesapi.models import Day, Event, Tombstone
+from .utils import APITestCase, make_trip, make_user
+
+
+class SyncDaysTests(APITestCase):
+    """Trip.sync_days() runs the same queries however long the trip is"""
+
+    def resize(self, trip, days):
+        trip.end_date = trip.start_date + timedelta(days=days - 1)
+        trip.sync_days()
+
+    def test_extend(self):
+        for days in (3, 60):
+            with self.subTest(days=days):
+                trip = make_trip(make_user(f"extend-{days}"), days=1)
+                # Savepoint, stale days, existing dates, insert of the new days, release
+                with self.assertNumQueries(5):
+                    self.resize(trip, days)
+                self.assertEqual(Day.objects.filter(trip=trip).count(), days)
+
+    def test_shrink(self):
+        for days in (3, 60):
+            with self.subTest(days=days):
+                member = make_user(f"member-{days}")
+                trip = make_trip(make_user(f"shrink-{days}"), members=[member], days=days, events=2)
+                # Savepoint, stale days, collaborators, tombstones, search index,
+                # days collected, their events, the days, existing dates, release
+                with self.assertNumQueries(10):
+                    self.resize(trip, 1)
+                self.assertEqual(Day.objects.filter(trip=trip).count(), 1)
+                self.assertEqual(Event.objects.filter(day__trip=trip).count(), 2)
+                self.assertEqual(
+                    Tombstone.objects.filter(user=member, model="day").count(), days - 1
+                )
+
+    def test_unchanged(self):
+        trip = make_trip(make_user("unchanged"), days=5)
+        days = set(Day.objects.filter(trip=trip).values_list("id", flat=True))
+        trip.sync_days()
+        self.assertEqual(set(Day.objects.filter(trip=trip).values_list("id", flat=True)), days)
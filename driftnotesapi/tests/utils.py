@@ -0,0 +1,60 @@
+from datetime import date, time, timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+from driftnotesapi.authentication import token_cache
+from driftnotesapi.models import Day, Event, Trip, UserTrip
+
+
+class APITestCase(TestCase):
+    """Test case starting from empty caches, with an API client per user"""
+
+    def setUp(self):
+        # Ids are handed out again once a test's transaction is rolled back,
+        # so nothing cached by an earlier test may survive into this one
+        cache.clear()
+        token_cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        token = Token.objects.get_or_create(user=user)[0]
+        client.credentials(HTTP_AUTHORIZATION=f"Token {token.key}")
+        return client
+
+
+def make_user(username):
+    return User.objects.create_user(username=username)
+
+
+def make_trip(creator, members=(), days=3, events=2, start=date(2024, 5, 1), category=None):
+    """
+    Trip of `days` days with `events` non-overlapping events each, shared by
+    its creator and `members`
+    """
+    trip = Trip.objects.create(
+        creator=creator,
+        title=f"{creator.username} trip",
+        city="Nashville",
+        start_date=start,
+        end_date=start + timedelta(days=days - 1),
+    )
+    UserTrip.objects.bulk_create([UserTrip(user=user, trip=trip) for user in (creator, *members)])
+    trip_days = Day.objects.bulk_create(
+        [Day(trip=trip, date=start + timedelta(days=offset)) for offset in range(days)]
+    )
+    Event.objects.bulk_create(
+        [
+            Event(
+                day=day,
+                title=f"Event {number}",
+                start_time=time(8 + 2 * number),
+                end_time=time(9 + 2 * number),
+                category=category,
+            )
+            for day in trip_days
+            for number in range(events)
+        ]
+    )
+    return trip
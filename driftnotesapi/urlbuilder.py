@@ -0,0 +1,65 @@
+"""
+Detail URLs formatted from route templates instead of resolved with reverse() per object.
+
+The detail route of every viewset registered on the router in driftnotesproject.urls
+is reversed once with a placeholder id, and each request computes the absolute
+prefix and suffix around that placeholder once. Building a URL is then plain
+string concatenation, with the same result HyperlinkedIdentityField gives.
+"""
+
+from functools import lru_cache
+from django.urls import NoReverseMatch, get_script_prefix, reverse
+from rest_framework import serializers
+
+PLACEHOLDER = "__pk__"
+
+
+@lru_cache(maxsize=None)
+def route_templates():
+    """Detail route of each registered basename with a placeholder id, relative to the script prefix"""
+    from driftnotesproject.urls import router
+
+    script_prefix = get_script_prefix()
+    templates = {}
+    for _prefix, _viewset, basename in router.registry:
+        try:
+            path = reverse(f"{basename}-detail", kwargs={"pk": PLACEHOLDER})
+        except NoReverseMatch:
+            # Viewsets without a detail route (e.g. sync)
+            continue
+        templates[basename] = path[len(script_prefix):]
+    return templates
+
+
+def _request_templates(request):
+    # The absolute templates depend on the host and script prefix, so they are built once per request
+    templates = getattr(request, "_detail_url_templates", None)
+    if templates is None:
+        script_prefix = get_script_prefix()
+        templates = {
+            basename: tuple(
+                request.build_absolute_uri(script_prefix + path).split(PLACEHOLDER, 1)
+            )
+            for basename, path in route_templates().items()
+        }
+        request._detail_url_templates = templates
+    return templates
+
+
+def detail_url(request, basename, pk):
+    """Absolute URL of an object's detail route, as HyperlinkedIdentityField renders it"""
+    prefix, suffix = _request_templates(request)[basename]
+    return f"{prefix}{pk}{suffix}"
+
+
+class DetailUrlField(serializers.Field):
+    """Read-only `url` field of a serializer, built with detail_url()"""
+
+    def __init__(self, basename, **kwargs):
+        self.basename = basename
+        kwargs["source"] = "pk"
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return detail_url(self.context["request"], self.basename, value)
@@ -6,3 +6,8 @@ from .trip import Trips
 from .usertrip import UserTrips
 from .day import Days
 from .event import Events
+from .sync import Sync
+from .metrics import Metrics
+from .search import Search
+from .calendar import Calendar
+from .live import live_token, live_updates
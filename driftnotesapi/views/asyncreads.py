@@ -0,0 +1,316 @@
+"""
+Async versions of the read endpoints, for deployments under an ASGI server.
+
+When settings.ASYNC_READ_VIEWS is set, driftnotesproject.urls swaps the routes
+below for async views that answer plain JSON GETs with Django's async ORM, so
+a request waiting on the database does not hold a worker thread. They give the
+same responses as the viewsets. Everything else (writes, HEAD, other formats,
+pages and streams, tokens not yet in the token cache, ...) is handed to the
+viewset, which runs in a thread as usual.
+"""
+
+from asgiref.sync import sync_to_async
+from django.db.models import F, Prefetch, prefetch_related_objects
+from django.http import HttpResponse, HttpResponseServerError
+from django.urls import URLPattern
+from django.utils.cache import patch_vary_headers
+from rest_framework import status
+from rest_framework.authentication import get_authorization_header
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from driftnotesapi.authentication import token_cache
+from driftnotesapi.conditional import (
+    acollection_validators,
+    aconditional_response,
+    make_etag,
+    timestamp,
+)
+from driftnotesapi.daterange import date_window, filter_dates, scoped_trip_ids
+from driftnotesapi.fastserializers import FlatDaySerializer, FlatEventSerializer, FlatTripSerializer
+from driftnotesapi.models import Day, Event, Trip
+from driftnotesapi.pagination import KeysetPagination
+from driftnotesapi.permissions import IsTripCollaborator, atrip_ids_for
+from driftnotesapi.sparse import sparse_data
+from driftnotesapi.streaming import stream_requested
+from .day import DaySerializer
+from .event import EventSerializer
+from .trip import ItinerarySerializer, TripSerializer
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    """Response rendered as the viewsets' JSONRenderer renders it"""
+    return HttpResponse(
+        JSONRenderer().render(data), status=status_code, content_type="application/json"
+    )
+
+
+def cached_user(request):
+    """User of the request's token when it is in the token cache, None otherwise"""
+    auth = get_authorization_header(request).split()
+    if len(auth) != 2 or auth[0].lower() != b"token":
+        return None
+    try:
+        credentials = token_cache.get(auth[1].decode())
+    except UnicodeError:
+        return None
+    return credentials[0] if credentials else None
+
+
+def drf_request(request):
+    """
+    DRF request for the helpers shared with the viewsets, or None when the
+    viewset has to answer: the async views only render JSON, whole lists,
+    and requests whose token is already cached.
+    """
+    if request.method != "GET":
+        return None
+    user = cached_user(request)
+    if user is None:
+        return None
+    wrapped = Request(request)
+    renderers = [renderer() for renderer in api_settings.DEFAULT_RENDERER_CLASSES]
+    try:
+        renderer, _media_type = DefaultContentNegotiation().select_renderer(
+            wrapped, renderers, format_suffix=None
+        )
+    except Exception:
+        return None
+    if type(renderer) is not JSONRenderer:
+        return None
+    wrapped.accepted_renderer = renderer
+    if KeysetPagination.requested(wrapped) or stream_requested(wrapped):
+        return None
+    wrapped.user = user
+    return wrapped
+
+
+async def list_rows(queryset, serializer_class, request, ordering=None):
+    """Rows of a list as list_response() serializes them when no page is asked for"""
+    queryset = serializer_class.prepare_queryset(
+        queryset, request, extra_columns=ordering or KeysetPagination.ordering
+    )
+    rows = [row async for row in queryset]
+    return serializer_class(rows, many=True, context={"request": request}).data
+
+
+async def trip_list(request):
+    trip_ids = await atrip_ids_for(request)
+    trips = Trip.objects.filter(id__in=trip_ids).select_related("creator")
+
+    async def build_response():
+        return json_response(await list_rows(trips, FlatTripSerializer, request))
+
+    return await aconditional_response(
+        request, await acollection_validators(request, trip_ids), build_response
+    )
+
+
+async def trip_detail(request, pk):
+    try:
+        trip = await Trip.objects.select_related("creator").aget(pk=pk)
+    except Trip.DoesNotExist:
+        return json_response(
+            {"message": "This trip does not exist. Kinda spooky..."},
+            status.HTTP_404_NOT_FOUND,
+        )
+    validators = (
+        make_etag("trip", trip.id, trip.updated_at, request.get_full_path()),
+        timestamp(trip.updated_at),
+    )
+
+    async def build_response():
+        data = TripSerializer(trip, context={"request": request}).data
+        return json_response(sparse_data(request, data))
+
+    return await aconditional_response(request, validators, build_response)
+
+
+async def trip_itinerary(request, pk):
+    try:
+        trip = await Trip.objects.select_related("creator").aget(pk=pk)
+    except Trip.DoesNotExist:
+        return json_response(
+            {"message": "This trip does not exist. Kinda spooky..."},
+            status.HTTP_404_NOT_FOUND,
+        )
+    if trip.id not in await atrip_ids_for(request):
+        return json_response({"detail": IsTripCollaborator.message}, status.HTTP_403_FORBIDDEN)
+
+    async def build_response():
+        # Django has no async prefetch_related_objects() yet
+        await sync_to_async(prefetch_related_objects)(
+            [trip],
+            Prefetch("day_set", queryset=Day.objects.order_by("date", "id")),
+            Prefetch(
+                "day_set__event_set",
+                queryset=Event.objects.select_related("category").order_by("start_time", "id"),
+            ),
+        )
+        data = ItinerarySerializer(trip, context={"request": request}).data
+        return json_response(sparse_data(request, data))
+
+    validators = (
+        make_etag(
+            "itinerary", trip.id, trip.revision, trip.updated_at, request.get_full_path()
+        ),
+        timestamp(trip.updated_at),
+    )
+    return await aconditional_response(request, validators, build_response)
+
+
+async def day_list(request):
+    await atrip_ids_for(request)
+    try:
+        first, last = date_window(request)
+        trip_ids = scoped_trip_ids(request)
+    except ValueError as ex:
+        return json_response({"message": str(ex)}, status.HTTP_400_BAD_REQUEST)
+    days = filter_dates(Day.objects.filter(trip__in=trip_ids).select_related("trip"), first, last)
+
+    async def build_response():
+        return json_response(
+            await list_rows(days, FlatDaySerializer, request, ordering=("date", "id"))
+        )
+
+    return await aconditional_response(
+        request, await acollection_validators(request, trip_ids), build_response
+    )
+
+
+async def day_detail(request, pk):
+    try:
+        day = await Day.objects.select_related("trip").aget(pk=pk)
+    except Day.DoesNotExist:
+        return json_response(
+            {"message": "This day does not exist. Kinda spooky..."},
+            status.HTTP_404_NOT_FOUND,
+        )
+    if day.trip_id not in await atrip_ids_for(request):
+        return json_response(
+            {"message": "You need to be part of a trip to view this resource."},
+            status.HTTP_403_FORBIDDEN,
+        )
+    validators = (
+        make_etag("day", day.id, day.updated_at, day.trip.updated_at, request.get_full_path()),
+        timestamp(day.updated_at, day.trip.updated_at),
+    )
+
+    async def build_response():
+        data = DaySerializer(day, context={"request": request}).data
+        return json_response(sparse_data(request, data))
+
+    return await aconditional_response(request, validators, build_response)
+
+
+async def event_list(request):
+    await atrip_ids_for(request)
+    try:
+        first, last = date_window(request)
+        trip_ids = scoped_trip_ids(request)
+    except ValueError as ex:
+        return json_response({"message": str(ex)}, status.HTTP_400_BAD_REQUEST)
+    events = Event.objects.filter(day__trip__in=trip_ids).select_related("day__trip", "category")
+    events = filter_dates(events, first, last, field="day__date").annotate(date=F("day__date"))
+
+    async def build_response():
+        return json_response(
+            await list_rows(
+                events, FlatEventSerializer, request, ordering=("date", "start_time", "id")
+            )
+        )
+
+    return await aconditional_response(
+        request, await acollection_validators(request, trip_ids), build_response
+    )
+
+
+async def event_detail(request, pk):
+    try:
+        event = await Event.objects.select_related("day__trip", "category").aget(pk=pk)
+    except Event.DoesNotExist:
+        return json_response(
+            {"message": "This event does not exist. Kinda spooky..."},
+            status.HTTP_404_NOT_FOUND,
+        )
+    if event.day.trip_id not in await atrip_ids_for(request):
+        return json_response(
+            {"message": "You need to be part of a trip to view this resource."},
+            status.HTTP_403_FORBIDDEN,
+        )
+    day = event.day
+    validators = (
+        make_etag(
+            "event",
+            event.id,
+            event.updated_at,
+            day.updated_at,
+            day.trip.updated_at,
+            event.category_id,
+            request.get_full_path(),
+        ),
+        timestamp(event.updated_at, day.updated_at, day.trip.updated_at),
+    )
+
+    async def build_response():
+        data = EventSerializer(event, context={"request": request}).data
+        return json_response(sparse_data(request, data))
+
+    return await aconditional_response(request, validators, build_response)
+
+
+# Router names of the routes with an async GET
+ASYNC_READS = {
+    "trip-list": trip_list,
+    "trip-detail": trip_detail,
+    "trip-itinerary": trip_itinerary,
+    "day-list": day_list,
+    "day-detail": day_detail,
+    "event-list": event_list,
+    "event-detail": event_detail,
+}
+
+
+def async_read_view(viewset_view, read):
+    """Async view answering with `read` when it can, and with the viewset otherwise"""
+    actions = viewset_view.actions
+    allow = ", ".join(
+        method.upper()
+        for method in viewset_view.cls.http_method_names
+        if method in actions or method == "options" or (method == "head" and "get" in actions)
+    )
+    fallback = sync_to_async(viewset_view)
+
+    async def view(request, *args, **kwargs):
+        # Format suffixes (/trips.json) are negotiated by the viewset
+        wrapped = None if "format" in kwargs else drf_request(request)
+        if wrapped is None:
+            return await fallback(request, *args, **kwargs)
+        try:
+            response = await read(wrapped, *args, **kwargs)
+        except Exception as ex:
+            return HttpResponseServerError(ex)
+        # Headers the viewsets add to every response
+        response["Allow"] = allow
+        patch_vary_headers(response, ("Accept",))
+        return response
+
+    # CSRF is left to the viewset, as for the view it replaces
+    view.csrf_exempt = True
+    return view
+
+
+def async_read_urls(patterns):
+    """The router's URL patterns, with the read routes served by the async views"""
+    return [
+        URLPattern(
+            pattern.pattern,
+            async_read_view(pattern.callback, ASYNC_READS[pattern.name]),
+            pattern.default_args,
+            pattern.name,
+        )
+        if isinstance(pattern, URLPattern) and pattern.name in ASYNC_READS
+        else pattern
+        for pattern in patterns
+    ]
@@ -0,0 +1,85 @@
+from django.db.models import Count, Max, Min
+from django.http import HttpResponseServerError
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+from driftnotesapi.conditional import collection_validators, conditional_response
+from driftnotesapi.daterange import month_window, scoped_trip_ids
+from driftnotesapi.models import Day
+
+
+class Calendar(ViewSet):
+    """
+    Purpose: Allow a calendar to load the days of one month of the user's trips at a time.
+    Methods: GET
+    """
+
+    def list(self, request):
+        """
+        @api {GET} /calendar?month=:month GET event counts and time spans per date of a month
+        @apiName GetCalendar
+        @apiGroup Calendar
+
+        @apiParam {String} month Month to show (YYYY-MM)
+        @apiParam {Number} [trip] Only days of this trip
+
+        @apiDescription Dates without any trip day are left out. start_time and
+        end_time are those of the earliest and latest events of the date.
+
+        @apiSuccessExample {json} Success
+            {
+                "month": "2024-05",
+                "dates": [
+                    {
+                        "date": "2024-05-01",
+                        "trips": [1],
+                        "events": 4,
+                        "start_time": "09:00:00",
+                        "end_time": "21:30:00"
+                    }
+                ]
+            }
+        """
+        try:
+            first, last = month_window(request.query_params.get("month"))
+            trip_ids = scoped_trip_ids(request)
+        except ValueError as ex:
+            return Response({"message": str(ex)}, status=status.HTTP_400_BAD_REQUEST)
+
+        def build_response():
+            days = Day.objects.filter(trip__in=trip_ids, date__range=(first, last))
+            # One row per date, aggregated in SQL over the days and their events
+            totals = (
+                days.order_by("date")
+                .values("date")
+                .annotate(
+                    events=Count("event"),
+                    start_time=Min("event__start_time"),
+                    end_time=Max("event__end_time"),
+                )
+            )
+            trips_by_date = {}
+            for day, trip_id in days.order_by("date", "trip").values_list("date", "trip").distinct():
+                trips_by_date.setdefault(day, []).append(trip_id)
+            return Response(
+                {
+                    "month": first.strftime("%Y-%m"),
+                    "dates": [
+                        {
+                            "date": row["date"],
+                            "trips": trips_by_date.get(row["date"], []),
+                            "events": row["events"],
+                            "start_time": row["start_time"],
+                            "end_time": row["end_time"],
+                        }
+                        for row in totals
+                    ],
+                }
+            )
+
+        try:
+            return conditional_response(
+                request, collection_validators(request, trip_ids), build_response
+            )
+        except Exception as ex:
+            return HttpResponseServerError(ex)
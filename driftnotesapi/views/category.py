@@ -5,16 +5,19 @@ from rest_framework import serializers
 from rest_framework import status
 from driftnotesapi.models import Category
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from driftnotesapi.fastserializers import FlatCategorySerializer
+from driftnotesapi.pagination import list_response
+from driftnotesapi.sparse import sparse_data
+from driftnotesapi.urlbuilder import DetailUrlField
 
 
 class CategorySerializer(serializers.HyperlinkedModelSerializer):
     """JSON serializer for category"""
 
+    url = DetailUrlField("category")
+
     class Meta:
         model = Category
-        url = serializers.HyperlinkedIdentityField(
-            view_name="category", lookup_field="id"
-        )
         fields = ("id", "url", "name")
 
 
@@ -62,7 +65,7 @@ class Categories(ViewSet):
         try:
             category = Category.objects.get(pk=pk)
             serializer = CategorySerializer(category, context={"request": request})
-            return Response(serializer.data)
+            return Response(sparse_data(request, serializer.data))
         except Category.DoesNotExist:
             return Response(
                 {"message": "This category does not exist"},
@@ -79,10 +82,7 @@ class Categories(ViewSet):
         """
         try:
             categories = Category.objects.all()
-            serializer = CategorySerializer(
-                categories, many=True, context={"request": request}
-            )
-            return Response(serializer.data)
+            return list_response(self, request, categories, FlatCategorySerializer)
         except Exception as ex:
             return HttpResponseServerError(ex)
 
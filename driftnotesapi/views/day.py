@@ -3,16 +3,40 @@ from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
+from django.db import transaction
 from django.http import HttpResponseServerError
-from driftnotesapi.models import Day, UserTrip, Trip
+from driftnotesapi import live, search
+from driftnotesapi.conditional import (
+    collection_validators,
+    conditional_response,
+    make_etag,
+    timestamp,
+)
+from driftnotesapi.daterange import date_window, filter_dates, scoped_trip_ids
+from driftnotesapi.fastserializers import FlatDaySerializer
+from driftnotesapi.models import Day, Trip, Tombstone
+from driftnotesapi.pagination import list_response
+from driftnotesapi.sparse import sparse_data
+from driftnotesapi.urlbuilder import DetailUrlField
+from driftnotesapi.permissions import is_collaborator
+
+
+class DayTripSerializer(serializers.ModelSerializer):
+    """JSON serializer for the trip a day belongs to"""
+
+    class Meta:
+        model = Trip
+        fields = ("id", "title", "city", "start_date", "end_date", "creator")
 
 
 class DaySerializer(serializers.ModelSerializer):
     """JSON serializer for Days"""
 
+    url = DetailUrlField("day")
+    trip = DayTripSerializer(many=False)
+
     class Meta:
         model = Day
-        url = serializers.HyperlinkedIdentityField(view_name="day", lookup_field="id")
         fields = ("id", "url", "trip", "date")
         depth = 1
 
@@ -34,13 +58,14 @@ class Days(ViewSet):
         try:
             trip_id = request.data.get("trip")
             trip = Trip.objects.get(pk=trip_id)
-            user = request.user
-            if not UserTrip.objects.filter(user=user, trip=trip).exists():
+            if not is_collaborator(request, trip.id):
                 raise PermissionDenied("Only a collaborator of the trip can add days!")
             new_day = Day()
             new_day.trip = trip
             new_day.date = request.data["date"]
             new_day.save()
+            Trip.bump_revision(trip.id)
+            live.notify_trip(trip.id, "day", "created", [new_day.id])
 
             serializer = DaySerializer(new_day, context={"request": request})
 
@@ -59,18 +84,29 @@ class Days(ViewSet):
         @apiName GetDay
         @apiGroup Day
         """
-        user = request.user
         try:
-            UserTrip.objects.get(user=user, trip__day__pk=pk)
-            day = Day.objects.get(pk=pk)
-            serializer = DaySerializer(day, context={"request": request})
-            return Response(serializer.data)
-
-        except UserTrip.DoesNotExist:
-            return Response(
-                {"message": "You need to be part of a trip to view this resource."},
-                status=status.HTTP_403_FORBIDDEN,
+            day = Day.objects.select_related("trip").get(pk=pk)
+            if not is_collaborator(request, day.trip_id):
+                return Response(
+                    {"message": "You need to be part of a trip to view this resource."},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
+            validators = (
+                make_etag(
+                    "day", day.id, day.updated_at, day.trip.updated_at, request.get_full_path()
+                ),
+                timestamp(day.updated_at, day.trip.updated_at),
+            )
+            return conditional_response(
+                request,
+                validators,
+                lambda: Response(
+                    sparse_data(
+                        request, DaySerializer(day, context={"request": request}).data
+                    )
+                ),
             )
+
         except Day.DoesNotExist:
             return Response(
                 {"message": "This day does not exist. Kinda spooky..."},
@@ -84,22 +120,27 @@ class Days(ViewSet):
         @api {GET} /days GET all days for all of a user's trips
         @apiName GetDays
         @apiGroup Day
+
+        @apiParam {Date} [from] Only days on or after this date (YYYY-MM-DD)
+        @apiParam {Date} [to] Only days on or before this date (YYYY-MM-DD)
+        @apiParam {Number} [trip] Only days of this trip
         """
-        user = request.user
+        try:
+            first, last = date_window(request)
+            trip_ids = scoped_trip_ids(request)
+        except ValueError as ex:
+            return Response({"message": str(ex)}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            user_trips = UserTrip.objects.filter(user=user)
-            trip_ids = user_trips.values_list(
-                "trip", flat=True
-            )  # shows flat list of trip ids instead of tuples
             # using select_related() method retrieves data in a single query by performing a sql join operation
             days = Day.objects.filter(trip__in=trip_ids).select_related("trip")
-            serializer = DaySerializer(days, many=True, context={"request": request})
-            return Response(serializer.data)
-        except UserTrip.DoesNotExist:
-            return Response(
-                {"message": "You need to be part of a trip to view this resource."},
-                status=status.HTTP_403_FORBIDDEN,
+            days = filter_dates(days, first, last)
+            return conditional_response(
+                request,
+                collection_validators(request, trip_ids),
+                lambda: list_response(
+                    self, request, days, FlatDaySerializer, ordering=("date", "id")
+                ),
             )
         except Exception as ex:
             return HttpResponseServerError(ex)
@@ -116,13 +157,16 @@ class Days(ViewSet):
         """
         try:
             day = Day.objects.get(pk=pk)
-            trip = Trip.objects.get(pk=day.trip.id)
-            user = request.user
-            if not UserTrip.objects.filter(user=user, trip=trip).exists():
+            if not is_collaborator(request, day.trip_id):
                 raise PermissionDenied(
                     "Only a collaborator of the trip can delete days!"
                 )
-            day.delete()
+            with transaction.atomic():
+                Tombstone.record("day", [day.id], trip_id=day.trip_id)
+                search.unindex_days(day.id)
+                live.notify_trip(day.trip_id, "day", "deleted", [day.id])
+                day.delete()
+                Trip.bump_revision(day.trip_id)
 
             return Response({}, status=status.HTTP_204_NO_CONTENT)
 
@@ -1,10 +1,39 @@
 from rest_framework import serializers, status
+from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.viewsets import ViewSet
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
 from django.http import HttpResponseServerError
-from driftnotesapi.models import Event, UserTrip, Day, Category, event_start, event_end
+from django.utils import timezone
+from django.utils.dateparse import parse_time
+from driftnotesapi import live, search
+from driftnotesapi.conditional import (
+    collection_validators,
+    conditional_response,
+    make_etag,
+    timestamp,
+)
+from driftnotesapi.conflicts import batch_overlaps, conflict_mode, overlapping_events
+from driftnotesapi.daterange import date_window, filter_dates, scoped_trip_ids
+from driftnotesapi.fastserializers import FlatEventSerializer
+from driftnotesapi.models import (
+    Event,
+    Day,
+    Trip,
+    Category,
+    Tombstone,
+    UserTrip,
+    event_start,
+    event_end,
+)
+from driftnotesapi.pagination import list_response
+from driftnotesapi.sparse import sparse_data
+from driftnotesapi.urlbuilder import DetailUrlField
+from driftnotesapi.permissions import is_collaborator, trip_ids_for
 from .day import DaySerializer
 from .category import CategorySerializer
 
@@ -12,12 +41,12 @@ from .category import CategorySerializer
 class EventSerializer(serializers.ModelSerializer):
     """JSON serializer for Events"""
 
+    url = DetailUrlField("event")
     day = DaySerializer(many=False)
     category = CategorySerializer(many=False)
 
     class Meta:
         model = Event
-        url = serializers.HyperlinkedIdentityField(view_name="event", lookup_field="id")
         fields = (
             "id",
             "url",
@@ -31,6 +60,83 @@ class EventSerializer(serializers.ModelSerializer):
         depth = 1
 
 
+BATCH_FIELDS = ("day", "title", "location", "start_time", "end_time", "category")
+
+
+def parse_batch_time(value):
+    """Time of day sent in a request or batch operation, raises ValueError when malformed"""
+    try:
+        parsed = parse_time(value) if isinstance(value, str) else None
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValueError(f"Invalid time: {value}")
+    return parsed
+
+
+def parse_batch_id(value):
+    """Primary key sent in a batch operation, raises ValueError unless it is a positive integer"""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        raise ValueError(f"Invalid id: {value}")
+    parsed = int(value)
+    if parsed < 1:
+        raise ValueError(f"Invalid id: {value}")
+    return parsed
+
+
+def lock_days(day_ids):
+    """
+    Lock days until the end of the transaction. SQLite has no row locks, but there a
+    writer whose reads went stale fails instead of committing.
+    """
+    list(Day.objects.select_for_update().filter(pk__in=day_ids).values_list("pk"))
+
+
+def check_conflicts(request, event):
+    """
+    Events of the same day the event would overlap, as asked by ?conflicts=, and
+    the 409 response to send instead of writing it when conflicts are rejected.
+
+    Called in the transaction that writes the event: its day stays locked until
+    the commit, so concurrent writes to the day are checked one after the other.
+    """
+    mode = conflict_mode(request)
+    if mode == "allow":
+        return [], None
+    lock_days([event.day_id])
+    conflicts = overlapping_events(event)
+    if conflicts and mode == "reject":
+        return conflicts, Response(
+            {"message": "This event overlaps other events of the day", "conflicts": conflicts},
+            status=status.HTTP_409_CONFLICT,
+        )
+    return conflicts, None
+
+
+def record_moves(moves):
+    """
+    Tombstone events that moved to a day of another trip for the collaborators
+    of their old trip who are not on the new one, so /sync drops them there.
+
+    Method arguments:
+      moves -- (event id, old trip id, new trip id) of each moved event
+    """
+    if not moves:
+        return
+    members = {}
+    for trip_id, user_id in UserTrip.objects.filter(
+        trip__in={trip_id for _, old, new in moves for trip_id in (old, new)}
+    ).values_list("trip", "user"):
+        members.setdefault(trip_id, set()).add(user_id)
+    moved_ids = {}
+    for event_id, old_trip_id, new_trip_id in moves:
+        moved_ids.setdefault((old_trip_id, new_trip_id), []).append(event_id)
+    for (old_trip_id, new_trip_id), event_ids in moved_ids.items():
+        user_ids = members.get(old_trip_id, set()) - members.get(new_trip_id, set())
+        Tombstone.record("event", event_ids, user_ids=user_ids)
+        live.notify_trip(old_trip_id, "event", "deleted", event_ids)
+
+
 class Events(ViewSet):
     """
     Purpose: Allow a user to communicate with the Drift Notes database to handle Events.
@@ -44,13 +150,13 @@ class Events(ViewSet):
         @api {POST} /events POST new event
         @apiName CreateEvent
         @apiGroup Event
+
+        @apiParam {String} [conflicts] allow, warn or reject events overlapping others of the day
         """
         try:
             day_id = request.data.get("day")
             day = Day.objects.get(pk=day_id)
-            trip = day.trip
-            user = request.user
-            if not UserTrip.objects.filter(user=user, trip=trip).exists():
+            if not is_collaborator(request, day.trip_id):
                 raise PermissionDenied(
                     "Only a collaborator of the trip can add events!"
                 )
@@ -58,16 +164,29 @@ class Events(ViewSet):
             new_event.day = day
             new_event.title = request.data["title"]
             new_event.location = request.data.get("location", "")
-            new_event.start_time = request.data.get("start_time", event_start())
-            new_event.end_time = request.data.get("end_time", event_end())
+            new_event.start_time = event_start()
+            new_event.end_time = event_end()
+            for field in ("start_time", "end_time"):
+                if field in request.data:
+                    setattr(new_event, field, parse_batch_time(request.data[field]))
             category_id = request.data.get("category")
             if category_id:
                 new_event.category = Category.objects.get(pk=category_id)
-            new_event.save()
+            with transaction.atomic():
+                conflicts, rejection = check_conflicts(request, new_event)
+                if rejection is not None:
+                    return rejection
+                new_event.save()
+                search.index_events(new_event.id)
+                Trip.bump_revision(day.trip_id)
+                live.notify_trip(day.trip_id, "event", "created", [new_event.id])
 
             serializer = EventSerializer(new_event, context={"request": request})
+            data = serializer.data
+            if conflicts:
+                data["conflicts"] = conflicts
 
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            return Response(data, status=status.HTTP_201_CREATED)
         except KeyError:
             return Response(
                 {"message": "Missing required field"},
@@ -78,6 +197,15 @@ class Events(ViewSet):
                 {"message": "This day does not exist. Kinda spooky..."},
                 status=status.HTTP_404_NOT_FOUND,
             )
+        except Category.DoesNotExist:
+            return Response(
+                {"message": "This category does not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        except ValidationError as ex:
+            return Response({"message": " ".join(ex.messages)}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError as ex:
+            return Response({"message": str(ex)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as ex:
             return HttpResponseServerError(ex)
 
@@ -87,18 +215,37 @@ class Events(ViewSet):
         @apiName GetEvent
         @apiGroup Event
         """
-        user = request.user
         try:
-            user_trip = UserTrip.objects.get(user=user, trip__day__event__pk=pk)
-            event = Event.objects.get(pk=pk, day__trip=user_trip.trip)
-            serializer = EventSerializer(event, context={"request": request})
-            return Response(serializer.data)
-
-        except UserTrip.DoesNotExist:
-            return Response(
-                {"message": "You need to be part of a trip to view this resource."},
-                status=status.HTTP_403_FORBIDDEN,
+            event = Event.objects.select_related("day__trip", "category").get(pk=pk)
+            if not is_collaborator(request, event.day.trip_id):
+                return Response(
+                    {"message": "You need to be part of a trip to view this resource."},
+                    status=status.HTTP_403_FORBIDDEN,
+                )
+            day = event.day
+            validators = (
+                make_etag(
+                    "event",
+                    event.id,
+                    event.updated_at,
+                    day.updated_at,
+                    day.trip.updated_at,
+                    event.category_id,
+                    request.get_full_path(),
+                ),
+                timestamp(event.updated_at, day.updated_at, day.trip.updated_at),
             )
+            return conditional_response(
+                request,
+                validators,
+                lambda: Response(
+                    sparse_data(
+                        request,
+                        EventSerializer(event, context={"request": request}).data,
+                    )
+                ),
+            )
+
         except Event.DoesNotExist:
             return Response(
                 {"message": "This event does not exist. Kinda spooky..."},
@@ -112,27 +259,35 @@ class Events(ViewSet):
         @api {GET} /events GET all events of a user's trips
         @apiName GetEvents
         @apiGroup Event
+
+        @apiParam {Date} [from] Only events of days on or after this date (YYYY-MM-DD)
+        @apiParam {Date} [to] Only events of days on or before this date (YYYY-MM-DD)
+        @apiParam {Number} [trip] Only events of this trip
         """
-        user = request.user
         try:
-            user_trips = UserTrip.objects.filter(
-                user=user
-            )  # gets all UserTrip instances associated with the user
-            trip_ids = user_trips.values_list(
-                "trip", flat=True
-            )  # shows flat list of all trip ids (instead of tuples) associated with the user
+            first, last = date_window(request)
+            trip_ids = scoped_trip_ids(request)  # ids of all trips the user collaborates on
+        except ValueError as ex:
+            return Response({"message": str(ex)}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
             # using select_related() method retrieves data in a single query by performing a sql join operation
             events = Event.objects.filter(day__trip__in=trip_ids).select_related(
-                "day__trip"
+                "day__trip", "category"
             )  # fetches all events where it's day belongs to any of the user's trips
-            serializer = EventSerializer(
-                events, many=True, context={"request": request}
-            )
-            return Response(serializer.data)
-        except UserTrip.DoesNotExist:
-            return Response(
-                {"message": "You need to be part of a trip to view this resource."},
-                status=status.HTTP_403_FORBIDDEN,
+            events = filter_dates(events, first, last, field="day__date")
+            # Pages are ordered by the day's date, so it is annotated onto each event for the cursor
+            events = events.annotate(date=F("day__date"))
+            return conditional_response(
+                request,
+                collection_validators(request, trip_ids),
+                lambda: list_response(
+                    self,
+                    request,
+                    events,
+                    FlatEventSerializer,
+                    ordering=("date", "start_time", "id"),
+                ),
             )
         except Exception as ex:
             return HttpResponseServerError(ex)
@@ -148,14 +303,18 @@ class Events(ViewSet):
             HTTP/1.1 204 No Content
         """
         try:
-            event = Event.objects.get(pk=pk)
-            user = request.user
+            event = Event.objects.select_related("day").get(pk=pk)
 
-            if not UserTrip.objects.filter(user=user, trip=event.day.trip).exists():
+            if not is_collaborator(request, event.day.trip_id):
                 raise PermissionDenied(
                     "Only a collaborator of the trip can delete events!"
                 )
-            event.delete()
+            with transaction.atomic():
+                Tombstone.record("event", [event.id], trip_id=event.day.trip_id)
+                search.unindex_events(event.id)
+                live.notify_trip(event.day.trip_id, "event", "deleted", [event.id])
+                event.delete()
+                Trip.bump_revision(event.day.trip_id)
 
             return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -175,37 +334,50 @@ class Events(ViewSet):
         @apiGroup Event
 
         @apiParam {id} id Event Id to update
+        @apiParam {String} [conflicts] allow, warn or reject events overlapping others of the day
         """
         try:
-            event = Event.objects.get(pk=pk)
-            user = request.user
+            event = Event.objects.select_related("day").get(pk=pk)
 
-            if not UserTrip.objects.filter(user=user, trip=event.day.trip).exists():
+            if not is_collaborator(request, event.day.trip_id):
                 raise PermissionDenied(
                     "Only a collaborator of the trip can update events!"
                 )
 
+            old_trip_id = event.day.trip_id
             day_id = request.data.get("day")
             if day_id:
                 # Check if the day belongs to a trip that the user is a part of
-                if not UserTrip.objects.filter(
-                    user=user, trip__day__pk=day_id
-                ).exists():
+                day = Day.objects.get(pk=day_id)
+                if not is_collaborator(request, day.trip_id):
                     raise PermissionDenied(
                         "You can only add events to days of your trip!"
                     )
-                event.day = Day.objects.get(pk=day_id)
+                event.day = day
             event.title = request.data.get("title", event.title)
             event.location = request.data.get("location", event.location)
-            event.start_time = request.data.get("start_time", event.start_time)
-            event.end_time = request.data.get("end_time", event.end_time)
+            for field in ("start_time", "end_time"):
+                if field in request.data:
+                    setattr(event, field, parse_batch_time(request.data[field]))
             category_id = request.data.get("category")
             if category_id:
                 event.category = Category.objects.get(pk=category_id)
 
-            event.save()
+            with transaction.atomic():
+                conflicts, rejection = check_conflicts(request, event)
+                if rejection is not None:
+                    return rejection
+                event.save()
+                search.index_events(event.id)
+                Trip.bump_revision(old_trip_id, event.day.trip_id)
+                if event.day.trip_id != old_trip_id:
+                    record_moves([(event.id, old_trip_id, event.day.trip_id)])
+                live.notify_trip(event.day.trip_id, "event", "updated", [event.id])
             serializer = EventSerializer(event, context={"request": request})
-            return Response(serializer.data)
+            data = serializer.data
+            if conflicts:
+                data["conflicts"] = conflicts
+            return Response(data)
 
         except Event.DoesNotExist:
             return Response(
@@ -219,5 +391,233 @@ class Events(ViewSet):
                 status=status.HTTP_404_NOT_FOUND,
             )
 
+        except Category.DoesNotExist:
+            return Response(
+                {"message": "This category does not exist"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        except ValidationError as ex:
+            return Response({"message": " ".join(ex.messages)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except ValueError as ex:
+            return Response({"message": str(ex)}, status=status.HTTP_400_BAD_REQUEST)
+
+        except Exception as ex:
+            return HttpResponseServerError(ex)
+
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """
+        @api {POST} /events/batch POST create, update and delete events in one request
+        @apiName BatchEvents
+        @apiGroup Event
+
+        @apiParam {String} [conflicts] allow, warn or reject events overlapping others of the day
+
+        @apiDescription Every operation is validated before anything is written.
+        If any operation fails validation nothing is applied and the response is a 400
+        listing the result of each operation (424 for the ones that were valid);
+        otherwise all of them are applied in one transaction.
+
+        @apiParamExample {json} Input
+            {
+                "operations": [
+                    {"op": "create", "day": 1, "title": "Breakfast", "start_time": "08:00"},
+                    {"op": "update", "id": 3, "title": "Late lunch", "category": 2},
+                    {"op": "delete", "id": 4}
+                ]
+            }
+
+        @apiSuccessExample {json} Success
+            {
+                "results": [
+                    {"op": "create", "status": 201, "event": {"id": 8, ...}},
+                    {"op": "update", "status": 200, "event": {"id": 3, ...}},
+                    {"op": "delete", "status": 204, "id": 4}
+                ]
+            }
+        """
+        operations = request.data.get("operations")
+        if not isinstance(operations, list) or not all(
+            isinstance(operation, dict) for operation in operations
+        ):
+            return Response(
+                {"message": "Expected a list of operations"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        # Ids may be sent as numbers or as strings of digits
+        operations = [dict(operation) for operation in operations]
+        malformed = set()
+        for index, operation in enumerate(operations):
+            for field in ("id", "day", "category"):
+                if operation.get(field) is not None:
+                    try:
+                        operation[field] = parse_batch_id(operation[field])
+                    except ValueError:
+                        malformed.add(index)
+
+        # Everything the batch refers to is loaded up front, one query per model
+        valid = [op for index, op in enumerate(operations) if index not in malformed]
+        event_ids = {op.get("id") for op in valid if op.get("op") in ("update", "delete")}
+        day_ids = {op.get("day") for op in valid if op.get("day") is not None}
+        category_ids = {op.get("category") for op in valid if op.get("category") is not None}
+        events = Event.objects.select_related("day__trip", "category").in_bulk(
+            [pk for pk in event_ids if pk is not None]
+        )
+        days = Day.objects.select_related("trip").in_bulk(day_ids)
+        categories = Category.objects.in_bulk(category_ids)
+        trip_ids = trip_ids_for(request)
+
+        now = timezone.now()
+        results = []
+        to_create, to_update, to_delete = [], [], []
+        moves = []
+        touched_trip_ids = set()
+
+        def error(op, status_code, message):
+            results.append({"op": op, "status": status_code, "message": message})
+
+        for index, operation in enumerate(operations):
+            op = operation.get("op")
+            if op not in ("create", "update", "delete"):
+                error(op, status.HTTP_400_BAD_REQUEST, "Unknown operation")
+                continue
+            if index in malformed:
+                error(op, status.HTTP_400_BAD_REQUEST, "Ids must be positive integers")
+                continue
+            if op != "delete" and "title" in operation and (
+                not isinstance(operation["title"], str) or not operation["title"].strip()
+            ):
+                error(op, status.HTTP_400_BAD_REQUEST, "Title must not be empty")
+                continue
+
+            if op == "create":
+                if operation.get("title") is None or operation.get("day") is None:
+                    error(op, status.HTTP_400_BAD_REQUEST, "Missing required field")
+                    continue
+                event = Event(
+                    location=operation.get("location", ""),
+                    start_time=event_start(),
+                    end_time=event_end(),
+                )
+            else:
+                event = events.get(operation.get("id"))
+                if event is None:
+                    error(op, status.HTTP_404_NOT_FOUND, "This event does not exist. Kinda spooky...")
+                    continue
+                if event.day.trip_id not in trip_ids:
+                    error(op, status.HTTP_403_FORBIDDEN, f"Only a collaborator of the trip can {op} events!")
+                    continue
+                touched_trip_ids.add(event.day.trip_id)
+                if op == "delete":
+                    to_delete.append(event)
+                    results.append({"op": op, "status": status.HTTP_204_NO_CONTENT, "id": event.id})
+                    continue
+
+            day_id = operation.get("day")
+            if day_id is not None:
+                day = days.get(day_id)
+                if day is None:
+                    error(op, status.HTTP_404_NOT_FOUND, "This day does not exist. Kinda spooky...")
+                    continue
+                if day.trip_id not in trip_ids:
+                    error(op, status.HTTP_403_FORBIDDEN, "You can only add events to days of your trip!")
+                    continue
+                if op == "update" and day.trip_id != event.day.trip_id:
+                    moves.append((event.id, event.day.trip_id, day.trip_id))
+                event.day = day
+                touched_trip_ids.add(day.trip_id)
+
+            category_id = operation.get("category")
+            if category_id is not None:
+                if category_id not in categories:
+                    error(op, status.HTTP_404_NOT_FOUND, "This category does not exist")
+                    continue
+                event.category = categories[category_id]
+
+            try:
+                for field in ("start_time", "end_time"):
+                    if field in operation:
+                        setattr(event, field, parse_batch_time(operation[field]))
+            except ValueError as ex:
+                error(op, status.HTTP_400_BAD_REQUEST, str(ex))
+                continue
+
+            event.title = operation.get("title", event.title)
+            event.location = operation.get("location", event.location)
+            event.updated_at = now
+            (to_create if op == "create" else to_update).append(event)
+            results.append(
+                {
+                    "op": op,
+                    "status": status.HTTP_201_CREATED if op == "create" else status.HTTP_200_OK,
+                    "event": event,
+                }
+            )
+
+        def failed():
+            for result in results:
+                if result["status"] < 400:
+                    result.pop("event", None)
+                    result["status"] = status.HTTP_424_FAILED_DEPENDENCY
+                    result["message"] = "Not applied because another operation failed"
+            return Response({"results": results}, status=status.HTTP_400_BAD_REQUEST)
+
+        if any(result["status"] >= 400 for result in results):
+            return failed()
+
+        try:
+            with transaction.atomic():
+                # Written events are checked together, against each other as well as the
+                # rest of their days, as check_conflicts() checks a single event
+                mode = conflict_mode(request)
+                written = [result for result in results if "event" in result]
+                if mode != "allow" and written:
+                    lock_days({result["event"].day_id for result in written})
+                    overlaps = batch_overlaps(
+                        [result["event"] for result in written], [event.id for event in to_delete]
+                    )
+                    for result, conflicts in zip(written, overlaps):
+                        if not conflicts:
+                            continue
+                        if mode == "reject":
+                            del result["event"]
+                            result["status"] = status.HTTP_409_CONFLICT
+                            result["message"] = "This event overlaps other events of the day"
+                        result["conflicts"] = conflicts
+                    if any(result["status"] >= 400 for result in results):
+                        return failed()
+
+                Event.objects.bulk_create(to_create)
+                Event.objects.bulk_update(to_update, BATCH_FIELDS + ("updated_at",))
+                deleted_ids_by_trip = {}
+                for event in to_delete:
+                    deleted_ids_by_trip.setdefault(event.day.trip_id, []).append(event.id)
+                for trip_id, deleted_ids in deleted_ids_by_trip.items():
+                    Tombstone.record("event", deleted_ids, trip_id=trip_id)
+                record_moves(moves)
+                search.unindex_events(*[event.id for event in to_delete])
+                Event.objects.filter(id__in=[event.id for event in to_delete]).delete()
+                search.index_events(*[event.id for event in to_create + to_update])
+                if touched_trip_ids:
+                    Trip.bump_revision(*touched_trip_ids)
+                for kind, changed in (
+                    ("created", to_create),
+                    ("updated", to_update),
+                    ("deleted", to_delete),
+                ):
+                    ids_by_trip = {}
+                    for event in changed:
+                        ids_by_trip.setdefault(event.day.trip_id, []).append(event.id)
+                    for trip_id, ids in ids_by_trip.items():
+                        live.notify_trip(trip_id, "event", kind, ids)
         except Exception as ex:
             return HttpResponseServerError(ex)
+
+        context = {"request": request}
+        for result in results:
+            if "event" in result:
+                result["event"] = EventSerializer(result["event"], context=context).data
+        return Response({"results": results})
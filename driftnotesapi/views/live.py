@@ -0,0 +1,151 @@
+"""Server-sent events feed of the changes to a user's trips"""
+
+import json
+import time
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.signing import BadSignature, TimestampSigner
+from django.http import HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from driftnotesapi.authentication import CachedTokenAuthentication
+from driftnotesapi.live import OVERFLOW, get_broker, trip_channel, user_channel
+from driftnotesapi.models import UserTrip
+
+# Milliseconds an EventSource waits before reconnecting
+RECONNECT_DELAY = 3000
+
+# Keeps stream tokens from being accepted by anything else signed with SECRET_KEY
+STREAM_TOKEN_SALT = "driftnotesapi.live.stream"
+
+
+def _stream_token_user(value):
+    """Active user a stream token was issued to, or None when it is invalid or expired"""
+    signer = TimestampSigner(salt=STREAM_TOKEN_SALT)
+    try:
+        user_id = signer.unsign(value, max_age=getattr(settings, "LIVE_TOKEN_MAX_AGE", 60))
+    except BadSignature:
+        return None
+    return User.objects.filter(pk=user_id, is_active=True).first()
+
+
+def _authenticate(request):
+    """
+    User of the token in the Authorization header, or of the stream token in
+    ?token= for EventSource clients. Auth tokens are never taken from the query
+    string, where proxies and servers would log them.
+    """
+    key = request.GET.get("token")
+    if key:
+        if not getattr(settings, "LIVE_QUERY_TOKENS", True):
+            return None
+        return _stream_token_user(key)
+    try:
+        credentials = CachedTokenAuthentication().authenticate(request)
+    except exceptions.AuthenticationFailed:
+        return None
+    return credentials[0] if credentials else None
+
+
+def _unauthorized():
+    return JsonResponse({"detail": "Authentication credentials were not provided."}, status=401)
+
+
+def _trip_ids(user):
+    return list(UserTrip.objects.filter(user=user).values_list("trip", flat=True))
+
+
+def _event(name, data):
+    return f"event: {name}\ndata: {json.dumps(data, cls=DjangoJSONEncoder)}\n\n"
+
+
+async def live_updates(request):
+    """
+    @api {GET} /live GET a stream of the changes to the user's trips
+    @apiName LiveUpdates
+    @apiGroup Live
+
+    @apiHeader {String} Authorization Auth token
+    @apiParam {String} [token] Stream token from POST /live/token, for EventSource clients
+    that cannot send headers. It expires after LIVE_TOKEN_MAX_AGE seconds, so fetch a new
+    one before opening the stream again.
+
+    @apiDescription A text/event-stream (server-sent events) sending a `change`
+    event for each trip, day, event or usertrip another collaborator creates,
+    updates or deletes, and comments to keep the connection open. The stream
+    ends after a `membership` change (the user joined or left a trip), when
+    `resync` says changes were missed, or after LIVE_MAX_SECONDS; EventSource
+    then reconnects on its own. Needs an ASGI server, see driftnotesproject.asgi.
+
+    @apiSuccessExample {text} Success
+        retry: 3000
+
+        event: change
+        data: {"trip": 1, "model": "event", "action": "updated", "ids": [3]}
+    """
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+
+    user = await sync_to_async(_authenticate)(request)
+    if user is None:
+        return _unauthorized()
+    trip_ids = await sync_to_async(_trip_ids)(user)
+    channels = [user_channel(user.id)] + [trip_channel(trip_id) for trip_id in trip_ids]
+    keepalive = getattr(settings, "LIVE_KEEPALIVE_SECONDS", 15)
+    max_seconds = getattr(settings, "LIVE_MAX_SECONDS", 600)
+
+    async def stream():
+        ends = time.monotonic() + max_seconds
+        async with get_broker().subscribe(channels) as subscription:
+            # Sent once subscribed, so changes made after the client sees it are delivered
+            yield f"retry: {RECONNECT_DELAY}\n\n"
+            while time.monotonic() < ends:
+                message = await subscription.get(min(keepalive, ends - time.monotonic()))
+                if message is None:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is OVERFLOW or message.get("action") == "resync":
+                    yield _event("resync", {})
+                    return
+                yield _event("change", message)
+                # The feed listens to the trips the user had when it opened
+                if message["model"] == "membership":
+                    return
+
+    response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    # Keeps nginx from buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@csrf_exempt
+def live_token(request):
+    """
+    @api {POST} /live/token POST a short-lived token to open the live feed with
+    @apiName LiveToken
+    @apiGroup Live
+
+    @apiHeader {String} Authorization Auth token
+
+    @apiDescription EventSource cannot send an Authorization header, and a token
+    in the URL ends up in access logs. This token is signed, names the user, and
+    expires after LIVE_TOKEN_MAX_AGE seconds, so a logged one is soon useless.
+
+    @apiSuccessExample {json} Success
+        {"token": "1:1rTq2x:...", "expires_in": 60}
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    try:
+        credentials = CachedTokenAuthentication().authenticate(request)
+    except exceptions.AuthenticationFailed:
+        credentials = None
+    if not credentials:
+        return _unauthorized()
+    token = TimestampSigner(salt=STREAM_TOKEN_SALT).sign(str(credentials[0].pk))
+    return JsonResponse(
+        {"token": token, "expires_in": getattr(settings, "LIVE_TOKEN_MAX_AGE", 60)}
+    )
@@ -0,0 +1,57 @@
+from django.conf import settings
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+from driftnotesapi.instrumentation import DURATION_BUCKETS, QUERY_BUCKETS, route_metrics
+
+
+class Metrics(ViewSet):
+    """
+    Purpose: Allow an admin to see the query counts and latencies of each route.
+    Methods: GET POST
+    """
+
+    permission_classes = [IsAdminUser]
+
+    def list(self, request):
+        """
+        @api {GET} /metrics GET per-route query count and timing histograms
+        @apiName GetMetrics
+        @apiGroup Metrics
+
+        @apiSuccessExample {json} Success
+            {
+                "enabled": true,
+                "duration_buckets_ms": [1, 2, 5, ...],
+                "query_buckets": [0, 1, 2, ...],
+                "routes": {
+                    "trip-list": {
+                        "queries": {"count": 12, "mean": 3.0, "max": 3, "p50": 3, ...},
+                        "db": {"count": 12, "mean": 0.412, "max": 1.3, "p50": 1, ...},
+                        "serialize": {...},
+                        "render": {...},
+                        "total": {...}
+                    }
+                }
+            }
+        """
+        return Response(
+            {
+                "enabled": getattr(settings, "INSTRUMENTATION_ENABLED", False),
+                "duration_buckets_ms": DURATION_BUCKETS,
+                "query_buckets": QUERY_BUCKETS,
+                "routes": route_metrics.snapshot(),
+            }
+        )
+
+    @action(detail=False, methods=["post"])
+    def reset(self, request):
+        """
+        @api {POST} /metrics/reset Clear the collected metrics
+        @apiName ResetMetrics
+        @apiGroup Metrics
+        """
+        route_metrics.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,124 @@
+from django.http import HttpResponseServerError
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+from rest_framework.viewsets import ViewSet
+from driftnotesapi import search
+from driftnotesapi.conditional import collection_validators, conditional_response
+from driftnotesapi.permissions import trip_ids_for
+from driftnotesapi.urlbuilder import detail_url
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def positive_int(value, default):
+    """Query parameter as an integer of at least 1, raises ValueError otherwise"""
+    if value is None:
+        return default
+    number = int(value)
+    if number < 1:
+        raise ValueError(value)
+    return number
+
+
+class Search(ViewSet):
+    """
+    Purpose: Allow a user to search the events and trips they collaborate on.
+    Methods: GET
+    """
+
+    def list(self, request):
+        """
+        @api {GET} /search?q=:query GET events and trips matching a query, best first
+        @apiName Search
+        @apiGroup Search
+
+        @apiParam {String} q Words to find in event titles and locations, and trip titles and cities
+        @apiParam {Number} [page] Page of results, from 1
+        @apiParam {Number} [page_size] Results per page (default 20, at most 100)
+
+        @apiSuccessExample {json} Success
+            {
+                "next": "http://localhost:8000/search?q=lunch&page=2",
+                "previous": null,
+                "results": [
+                    {
+                        "type": "event",
+                        "id": 2,
+                        "url": "http://localhost:8000/events/2",
+                        "trip": 1,
+                        "title": "Team Lunch",
+                        "location": "Bistro",
+                        "rank": 1.42
+                    },
+                    {
+                        "type": "trip",
+                        "id": 1,
+                        "url": "http://localhost:8000/trips/1",
+                        "trip": 1,
+                        "title": "Business Trip",
+                        "city": "New York",
+                        "rank": 0.87
+                    }
+                ]
+            }
+        """
+        terms = search.query_terms(request.query_params.get("q", ""))
+        if not terms:
+            return Response(
+                {"message": "Missing search query"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            page = positive_int(request.query_params.get("page"), 1)
+            page_size = min(
+                positive_int(request.query_params.get("page_size"), DEFAULT_PAGE_SIZE),
+                MAX_PAGE_SIZE,
+            )
+        except ValueError:
+            return Response(
+                {"message": "page and page_size must be positive integers"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        def build_response():
+            # One extra row tells whether there is a next page
+            rows = search.search(
+                terms, request.user.id, page_size + 1, offset=(page - 1) * page_size
+            )
+            url = request.build_absolute_uri()
+            next_url = replace_query_param(url, "page", page + 1) if len(rows) > page_size else None
+            previous_url = None
+            if page > 2:
+                previous_url = replace_query_param(url, "page", page - 1)
+            elif page == 2:
+                previous_url = remove_query_param(url, "page")
+            return Response(
+                {
+                    "next": next_url,
+                    "previous": previous_url,
+                    "results": [
+                        {
+                            "type": row["kind"],
+                            "id": row["object_id"],
+                            "url": detail_url(request, row["kind"], row["object_id"]),
+                            "trip": row["trip_id"],
+                            "title": row["title"],
+                            "location" if row["kind"] == "event" else "city": row["body"],
+                            "rank": round(row["rank"], 4),
+                        }
+                        for row in rows[:page_size]
+                    ],
+                }
+            )
+
+        try:
+            # Results change only when one of the user's trips, days or events does
+            return conditional_response(
+                request,
+                collection_validators(request, trip_ids_for(request)),
+                build_response,
+            )
+        except Exception as ex:
+            return HttpResponseServerError(ex)
@@ -0,0 +1,129 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db.models import Q
+from django.http import HttpResponseServerError
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+from driftnotesapi.models import Trip, Day, Event, UserTrip, Tombstone
+from driftnotesapi.permissions import trip_ids_for
+from .day import DaySerializer
+from .event import EventSerializer
+from .trip import TripSerializer
+from .usertrip import UserTripSerializer
+
+
+def encode_token(moment):
+    """Opaque sync token for a point in time"""
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_token(token):
+    """Point in time of a sync token, raises ValueError for malformed tokens"""
+    return datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+
+
+class Sync(ViewSet):
+    """
+    Purpose: Allow a client to fetch only what changed in the user's trips since its last sync.
+    Methods: GET
+    """
+
+    def list(self, request):
+        """
+        @api {GET} /sync?since=:token GET changes since a sync token
+        @apiName Sync
+        @apiGroup Sync
+
+        @apiParam {String} [since] Token returned by the previous sync, omit for a full sync
+
+        @apiSuccessExample {json} Success
+            {
+                "token": "1714564800000000",
+                "full": false,
+                "trips": [],
+                "days": [],
+                "events": [
+                    {
+                        "id": 1,
+                        "title": "Client Meeting",
+                        ...
+                    }
+                ],
+                "usertrips": [],
+                "deleted": {
+                    "trip": [],
+                    "day": [4],
+                    "event": [],
+                    "usertrip": []
+                }
+            }
+        """
+        # Taken before reading so that changes made during this request are sent again next time
+        now = timezone.now()
+        since = None
+        token = request.query_params.get("since")
+        if token:
+            try:
+                since = decode_token(token)
+            except (ValueError, OverflowError):
+                return Response(
+                    {"message": "Invalid sync token"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            # Tombstones older than the retention period may have been purged
+            retention = timedelta(days=getattr(settings, "SYNC_RETENTION_DAYS", 30))
+            if since < now - retention:
+                since = None
+
+        try:
+            context = {"request": request}
+            trip_ids = trip_ids_for(request)
+            trips = Trip.objects.filter(id__in=trip_ids).select_related("creator")
+            days = Day.objects.filter(trip__in=trip_ids).select_related("trip")
+            events = Event.objects.filter(day__trip__in=trip_ids).select_related(
+                "day__trip", "category"
+            )
+            usertrips = UserTrip.objects.filter(trip__in=trip_ids).select_related(
+                "user", "trip__creator"
+            )
+            deleted = {"trip": [], "day": [], "event": [], "usertrip": []}
+
+            if since is not None:
+                # Rows committed while the previous sync was running may carry an
+                # earlier timestamp, so every sync overlaps the previous one a little
+                since -= timedelta(seconds=getattr(settings, "SYNC_OVERLAP_SECONDS", 5))
+                # Trips the user joined since the last sync are sent in full
+                joined = UserTrip.objects.filter(
+                    user=request.user, updated_at__gte=since
+                ).values_list("trip", flat=True)
+                trips = trips.filter(Q(updated_at__gte=since) | Q(id__in=joined))
+                days = days.filter(Q(updated_at__gte=since) | Q(trip__in=joined))
+                events = events.filter(
+                    Q(updated_at__gte=since) | Q(day__trip__in=joined)
+                )
+                usertrips = usertrips.filter(
+                    Q(updated_at__gte=since) | Q(trip__in=joined)
+                )
+                tombstones = Tombstone.objects.filter(
+                    user=request.user, deleted_at__gte=since
+                ).values_list("model", "object_id")
+                for model, object_id in tombstones:
+                    deleted.setdefault(model, []).append(object_id)
+
+            return Response(
+                {
+                    "token": encode_token(now),
+                    "full": since is None,
+                    "trips": TripSerializer(trips, many=True, context=context).data,
+                    "days": DaySerializer(days, many=True, context=context).data,
+                    "events": EventSerializer(events, many=True, context=context).data,
+                    "usertrips": UserTripSerializer(
+                        usertrips, many=True, context=context
+                    ).data,
+                    "deleted": deleted,
+                }
+            )
+        except Exception as ex:
+            return HttpResponseServerError(ex)
@@ -1,22 +1,46 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from django.http import HttpResponseServerError, HttpResponse
+from rest_framework.decorators import action
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import serializers, status
-from driftnotesapi.models import Trip, UserTrip, Day
+from driftnotesapi.conditional import (
+    collection_validators,
+    conditional_response,
+    make_etag,
+    timestamp,
+)
+from driftnotesapi import live, search
+from driftnotesapi.background import purge_in_background
+from driftnotesapi.conflicts import trip_conflicts
+from driftnotesapi.models import Trip, UserTrip, Day, Event, Tombstone
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
 from rest_framework.exceptions import PermissionDenied
+from driftnotesapi.fastserializers import FlatTripSerializer
+from driftnotesapi.pagination import list_response
+from driftnotesapi.sparse import sparse_data
+from driftnotesapi.urlbuilder import DetailUrlField
+from driftnotesapi.permissions import (
+    IsTripCollaborator,
+    forget_trip_ids,
+    is_collaborator,
+    trip_ids_for,
+)
 from .user import UserSerializer
-from datetime import timedelta, datetime
+from .category import CategorySerializer
+from datetime import datetime
 
 
 class TripSerializer(serializers.ModelSerializer):
     """JSON serializer for trips"""
 
+    url = DetailUrlField("trip")
     creator = UserSerializer(many=False)
 
     class Meta:
         model = Trip
-        url = serializers.HyperlinkedIdentityField(view_name="trip", lookup_field="id")
         fields = (
             "id",
             "url",
@@ -29,6 +53,45 @@ class TripSerializer(serializers.ModelSerializer):
         depth = 1
 
 
+class ItineraryEventSerializer(serializers.ModelSerializer):
+    """JSON serializer for the events of an itinerary day"""
+
+    url = DetailUrlField("event")
+    category = CategorySerializer(many=False)
+
+    class Meta:
+        model = Event
+        fields = (
+            "id",
+            "url",
+            "title",
+            "location",
+            "start_time",
+            "end_time",
+            "category",
+        )
+
+
+class ItineraryDaySerializer(serializers.ModelSerializer):
+    """JSON serializer for the days of an itinerary"""
+
+    url = DetailUrlField("day")
+    events = ItineraryEventSerializer(many=True, source="event_set")
+
+    class Meta:
+        model = Day
+        fields = ("id", "url", "date", "events")
+
+
+class ItinerarySerializer(TripSerializer):
+    """JSON serializer for a trip with its days and their events"""
+
+    days = ItineraryDaySerializer(many=True, source="day_set")
+
+    class Meta(TripSerializer.Meta):
+        fields = TripSerializer.Meta.fields + ("days",)
+
+
 class Trips(ViewSet):
     """
     Purpose: Allow a user to communicate with the Drift Notes database to handle Trips.
@@ -68,17 +131,15 @@ class Trips(ViewSet):
             new_trip.city = request.data["city"]
             new_trip.start_date = datetime.strptime(request.data["start_date"], "%m/%d/%Y").date()
             new_trip.end_date = datetime.strptime(request.data["end_date"], "%m/%d/%Y").date()
-            new_trip.save()
-
-            UserTrip.objects.create(user=new_trip.creator, trip=new_trip)
 
-            # Automatically create days for the trip
-            # Creates a day instance for each day of the trip starting from the start date
-            start_date = new_trip.start_date
-            end_date = new_trip.end_date
-            while start_date <= end_date:
-                Day.objects.create(trip=new_trip, date=start_date)
-                start_date += timedelta(days=1)
+            with transaction.atomic():
+                new_trip.save()
+                UserTrip.objects.create(user=new_trip.creator, trip=new_trip)
+                # Automatically create a day instance for each day of the trip
+                new_trip.sync_days()
+                search.index_trips(new_trip.id)
+                # The creator's open feeds subscribe to the new trip
+                live.notify_members([new_trip.creator_id], new_trip.id, "joined")
 
             serializer = TripSerializer(new_trip, context={"request": request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -99,11 +160,14 @@ class Trips(ViewSet):
         user = request.user
         if user.is_authenticated:
             try:
-                user_trips = UserTrip.objects.filter(user=user)
-                trip_ids = [user_trip.trip.id for user_trip in user_trips]
-                trips = Trip.objects.filter(id__in=trip_ids)
-                serializer = TripSerializer(trips, context={"request": request}, many=True)
-                return Response(serializer.data)
+                trip_ids = trip_ids_for(request)
+                # select_related() loads each trip's creator in the same query
+                trips = Trip.objects.filter(id__in=trip_ids).select_related("creator")
+                return conditional_response(
+                    request,
+                    collection_validators(request, trip_ids),
+                    lambda: list_response(self, request, trips, FlatTripSerializer),
+                )
             except Exception as ex:
                 return HttpResponseServerError(ex)
         else:
@@ -118,9 +182,21 @@ class Trips(ViewSet):
         user = request.user
         if user.is_authenticated:
             try:
-                trip = Trip.objects.get(pk=pk)
-                serializer = TripSerializer(trip, context={"request": request})
-                return Response(serializer.data)
+                trip = Trip.objects.select_related("creator").get(pk=pk)
+                validators = (
+                    make_etag("trip", trip.id, trip.updated_at, request.get_full_path()),
+                    timestamp(trip.updated_at),
+                )
+                return conditional_response(
+                    request,
+                    validators,
+                    lambda: Response(
+                        sparse_data(
+                            request,
+                            TripSerializer(trip, context={"request": request}).data,
+                        )
+                    ),
+                )
             except Trip.DoesNotExist:
                 return Response(
                     {"message": "This trip does not exist. Kinda spooky..."},
@@ -155,8 +231,7 @@ class Trips(ViewSet):
             )
 
         # Check if the user is a collaborator on the trip
-        user = request.user
-        if not UserTrip.objects.filter(user=user, trip=trip).exists():
+        if not is_collaborator(request, trip.id):
             raise PermissionDenied("Only a collaborator of the trip can edit it!")
 
         # Update trip data based on request data
@@ -166,30 +241,15 @@ class Trips(ViewSet):
         trip.city = request.data.get("city", trip.city)
         trip.start_date = parse_date(request.data.get("start_date", str(trip.start_date)))
         trip.end_date = parse_date(request.data.get("end_date", str(trip.end_date)))
-        trip.save()
-        # Update days for the trip
-        if "start_date" in request.data or "end_date" in request.data:
-            # Delete days "less than" or before the new start date
-            # Delete days "greater than" or after the new end date
-            Day.objects.filter(trip=trip, date__lt=trip.start_date).delete()
-            Day.objects.filter(trip=trip, date__gt=trip.end_date).delete()
-
-            # Retrieve the existing days of the trip
-            existing_dates = Day.objects.filter(trip=trip).values_list(
-                "date", flat=True
-            )
-            # Calculate the number of days in the trip
-            trip_length = (trip.end_date - trip.start_date).days + 1
-            # Create a list of dates by incrementally adding the length of the trip to start date
-            trip_dates = [
-                trip.start_date + timedelta(days=x) for x in range(trip_length)
-            ]
-            # Turn both lists into sets so we can subtract them
-            # Create set of missing dates by subtracting existing_dates from trip_dates
-            missing_dates = set(trip_dates) - set(existing_dates)
-            # Create instances of Day for each missing date
-            for date in missing_dates:
-                Day.objects.create(trip=trip, date=date)
+
+        with transaction.atomic():
+            trip.save()
+            # Update days for the trip
+            # Days outside of the new date range are removed and missing dates are added
+            if "start_date" in request.data or "end_date" in request.data:
+                trip.sync_days()
+            search.index_trips(trip.id)
+            live.notify_trip(trip.id, "trip", "updated", [trip.id])
 
         serializer = TripSerializer(trip, context={"request": request})    
         return Response(serializer.data, status=status.HTTP_204_NO_CONTENT)
@@ -206,7 +266,21 @@ class Trips(ViewSet):
             trip = Trip.objects.get(pk=pk)
             if trip.creator != request.auth.user:
                 raise PermissionDenied("Only the creator of the trip can delete it!")
-            trip.delete()
+            with transaction.atomic():
+                # Before the memberships go, since they tell whom to notify
+                Tombstone.record("trip", [trip.id], trip_id=trip.id)
+                if getattr(settings, "TRIP_SOFT_DELETE", False):
+                    member_ids = trip.soft_delete()
+                    if getattr(settings, "TRIP_PURGE_IN_BACKGROUND", True):
+                        transaction.on_commit(lambda: purge_in_background([trip.id]))
+                else:
+                    member_ids = Trip.purge(trip.id)
+                live.notify_trip(trip.id, "trip", "deleted", [trip.id])
+
+            # Dropped again after the commit, in case a request cached the
+            # memberships while the transaction was still open
+            for user_id in member_ids:
+                forget_trip_ids(user_id)
 
             return Response(
                 "Your trip was successfully destroyed!",
@@ -221,3 +295,134 @@ class Trips(ViewSet):
 
         except Exception as ex:
             return HttpResponseServerError(ex)
+
+    @action(
+        detail=True,
+        methods=["get"],
+        permission_classes=[IsAuthenticatedOrReadOnly, IsTripCollaborator],
+    )
+    def itinerary(self, request, pk=None):
+        """
+        @api {GET} /trips/:id/itinerary GET trip with its days and events
+        @apiName GetTripItinerary
+        @apiGroup Trip
+
+        @apiSuccessExample {json} Success
+            {
+                "id": 1,
+                "title": "Business Trip",
+                ...
+                "days": [
+                    {
+                        "id": 1,
+                        "date": "2024-05-01",
+                        "events": [
+                            {
+                                "id": 1,
+                                "title": "Client Meeting",
+                                "category": {"id": 1, "name": "Business", ...},
+                                ...
+                            }
+                        ]
+                    }
+                ]
+            }
+        """
+        try:
+            trip = Trip.objects.select_related("creator").get(pk=pk)
+        except Trip.DoesNotExist:
+            return Response(
+                {"message": "This trip does not exist. Kinda spooky..."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        self.check_object_permissions(request, trip)
+
+        def build_response():
+            # The rest of the itinerary is loaded in a fixed number of queries:
+            # the trip's days, and the events of those days with their categories
+            prefetch_related_objects(
+                [trip],
+                Prefetch("day_set", queryset=Day.objects.order_by("date", "id")),
+                Prefetch(
+                    "day_set__event_set",
+                    queryset=Event.objects.select_related("category").order_by(
+                        "start_time", "id"
+                    ),
+                ),
+            )
+            serializer = ItinerarySerializer(trip, context={"request": request})
+            return Response(sparse_data(request, serializer.data))
+
+        # Every change to a day or event of the trip bumps its revision
+        validators = (
+            make_etag(
+                "itinerary", trip.id, trip.revision, trip.updated_at, request.get_full_path()
+            ),
+            timestamp(trip.updated_at),
+        )
+        return conditional_response(request, validators, build_response)
+
+    @action(
+        detail=True,
+        methods=["get"],
+        permission_classes=[IsAuthenticatedOrReadOnly, IsTripCollaborator],
+    )
+    def conflicts(self, request, pk=None):
+        """
+        @api {GET} /trips/:id/conflicts GET overlapping events of a trip
+        @apiName GetTripConflicts
+        @apiGroup Trip
+
+        @apiParam {Number} [day] Only check this day of the trip
+        @apiDescription Each conflict is a run of events of one day that overlap
+        one another, directly or through a chain.
+
+        @apiSuccessExample {json} Success
+            {
+                "trip": 1,
+                "conflicts": [
+                    {
+                        "day": 1,
+                        "date": "2024-05-01",
+                        "start_time": "09:00:00",
+                        "end_time": "11:30:00",
+                        "events": [
+                            {"id": 1, "title": "Client Meeting", "start_time": "09:00:00", "end_time": "10:00:00"},
+                            {"id": 2, "title": "Coffee", "start_time": "09:30:00", "end_time": "11:30:00"}
+                        ]
+                    }
+                ]
+            }
+        """
+        try:
+            trip = Trip.objects.get(pk=pk)
+        except Trip.DoesNotExist:
+            return Response(
+                {"message": "This trip does not exist. Kinda spooky..."},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        self.check_object_permissions(request, trip)
+
+        day_id = request.query_params.get("day")
+        if day_id is not None and not day_id.isdigit():
+            return Response(
+                {"message": "day must be an id"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        def build_response():
+            return Response(
+                {
+                    "trip": trip.id,
+                    "conflicts": trip_conflicts(trip.id, int(day_id) if day_id else None),
+                }
+            )
+
+        # Every change to a day or event of the trip bumps its revision
+        validators = (
+            make_etag("conflicts", trip.id, trip.revision, trip.updated_at, day_id),
+            timestamp(trip.updated_at),
+        )
+        return conditional_response(request, validators, build_response)
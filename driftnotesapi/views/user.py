@@ -4,14 +4,19 @@ from rest_framework.response import Response
 from rest_framework import serializers, status
 from django.contrib.auth.models import User
 from rest_framework.exceptions import PermissionDenied
+from driftnotesapi.fastserializers import FlatUserSerializer
+from driftnotesapi.pagination import list_response
+from driftnotesapi.sparse import sparse_data
+from driftnotesapi.urlbuilder import DetailUrlField
 
 
 class UserSerializer(serializers.HyperlinkedModelSerializer):
     """JSON serializer for Users"""
 
+    url = DetailUrlField("user")
+
     class Meta:
         model = User
-        url = serializers.HyperlinkedIdentityField(view_name="user", lookup_field="id")
         fields = (
             "id",
             "url",
@@ -37,7 +42,7 @@ class Users(ViewSet):
         try:
             user = User.objects.get(pk=pk)
             serializer = UserSerializer(user, context={"request": request})
-            return Response(serializer.data)
+            return Response(sparse_data(request, serializer.data))
         except User.DoesNotExist:
             return Response(
                 {"message": "User not found"}, status=status.HTTP_404_NOT_FOUND
@@ -53,8 +58,7 @@ class Users(ViewSet):
         """
         try:
             users = User.objects.all()
-            serializer = UserSerializer(users, many=True, context={"request": request})
-            return Response(serializer.data)
+            return list_response(self, request, users, FlatUserSerializer)
         except Exception as ex:
             return HttpResponseServerError(ex)
 
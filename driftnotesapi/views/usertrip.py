@@ -1,10 +1,16 @@
+from django.db import IntegrityError, transaction
 from django.http import HttpResponseServerError
 from rest_framework.viewsets import ViewSet
 from rest_framework.response import Response
 from rest_framework import serializers
 from rest_framework import status
-from driftnotesapi.models import UserTrip
+from driftnotesapi import live
+from driftnotesapi.models import UserTrip, Tombstone
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from driftnotesapi.fastserializers import FlatUserTripSerializer
+from driftnotesapi.pagination import list_response
+from driftnotesapi.sparse import sparse_data
+from driftnotesapi.urlbuilder import DetailUrlField
 from .user import UserSerializer
 from .trip import TripSerializer
 
@@ -13,14 +19,12 @@ class UserTripSerializer(serializers.HyperlinkedModelSerializer):
     """JSON serializer for UserTrips"""
 
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    url = DetailUrlField("usertrip")
     user = UserSerializer(many=False)
     trip = TripSerializer(many=False)
 
     class Meta:
         model = UserTrip
-        url = serializers.HyperlinkedIdentityField(
-            view_name="usertrip", lookup_field="id"
-        )
         fields = (
             "id",
             "url",
@@ -47,6 +51,8 @@ class UserTrips(ViewSet):
             new_usertrip.user_id = request.data["user"]
             new_usertrip.trip_id = request.data["trip"]
             new_usertrip.save()
+            live.notify_trip(new_usertrip.trip_id, "usertrip", "created", [new_usertrip.id])
+            live.notify_members([new_usertrip.user_id], new_usertrip.trip_id, "joined")
 
             serializer = UserTripSerializer(new_usertrip, context={"request": request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
@@ -57,6 +63,12 @@ class UserTrips(ViewSet):
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
+        except IntegrityError:
+            return Response(
+                {"message": "This user is already a collaborator on this trip"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
         except Exception as ex:
             return HttpResponseServerError(ex)
 
@@ -67,9 +79,11 @@ class UserTrips(ViewSet):
         @apiGroup UserTrip
         """
         try:
-            user_trip = UserTrip.objects.get(pk=pk)
+            user_trip = UserTrip.objects.select_related("user", "trip__creator").get(
+                pk=pk
+            )
             serializer = UserTripSerializer(user_trip, context={"request": request})
-            return Response(serializer.data)
+            return Response(sparse_data(request, serializer.data))
 
         except UserTrip.DoesNotExist:
             return Response(
@@ -101,16 +115,14 @@ class UserTrips(ViewSet):
             ]
         """
         try:
-            usertrips = UserTrip.objects.all()
+            # select_related() loads the user, trip and trip creator in the same query
+            usertrips = UserTrip.objects.select_related("user", "trip__creator")
             # if user.is_authenticated:
             #     usertrips = UserTrip.objects.filter(user=user)
             # else:
             #     usertrips = UserTrip.objects.none()
 
-            serializer = UserTripSerializer(
-                usertrips, many=True, context={"request": request}
-            )
-            return Response(serializer.data)
+            return list_response(self, request, usertrips, FlatUserTripSerializer)
 
         except Exception as ex:
             return HttpResponseServerError(ex)
@@ -123,7 +135,13 @@ class UserTrips(ViewSet):
         """
         try:
             usertrip = UserTrip.objects.get(pk=pk)
-            usertrip.delete()
+            with transaction.atomic():
+                Tombstone.record("usertrip", [usertrip.id], trip_id=usertrip.trip_id)
+                # The removed user can no longer see the trip at all
+                Tombstone.record("trip", [usertrip.trip_id], user_ids=[usertrip.user_id])
+                live.notify_trip(usertrip.trip_id, "usertrip", "deleted", [usertrip.id])
+                live.notify_members([usertrip.user_id], usertrip.trip_id, "left")
+                usertrip.delete()
 
             return Response({}, status=status.HTTP_204_NO_CONTENT)
 
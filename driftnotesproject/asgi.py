@@ -2,6 +2,12 @@
 ASGI config for driftnotesproject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+The live feed at /live streams server-sent events, so it needs an ASGI server
+(e.g. ``uvicorn driftnotesproject.asgi:application``); under WSGI every open
+feed would hold a worker. With ASYNC_READ_VIEWS=True the trip, day and event
+reads also run on the event loop, so requests waiting on the database do not
+hold a thread each: ``uvicorn driftnotesproject.asgi:application --workers 4``.
+Compare against gunicorn at the same worker count with ``manage.py bench_servers``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
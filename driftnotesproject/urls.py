@@ -5,6 +5,7 @@ from rest_framework import routers
 from rest_framework.authtoken.views import obtain_auth_token
 from driftnotesapi.models import *
 from driftnotesapi.views import *
+from driftnotesapi.views.asyncreads import async_read_urls
 
 router = routers.DefaultRouter(trailing_slash=False)
 router.register(r"users", Users, "user")
@@ -13,14 +14,24 @@ router.register(r"trips", Trips, "trip")
 router.register(r"usertrips", UserTrips, "usertrip")
 router.register(r"days", Days, "day")
 router.register(r"events", Events, "event")
+router.register(r"sync", Sync, "sync")
+router.register(r"metrics", Metrics, "metrics")
+router.register(r"search", Search, "search")
+router.register(r"calendar", Calendar, "calendar")
+
+api_urls = router.urls
+if settings.ASYNC_READ_VIEWS:
+    api_urls = async_read_urls(api_urls)
 
 
 # Wire up our API using automatic URL routing.
 # Additionally, we include login URLs for the browsable API.
 urlpatterns = [
-    path("", include(router.urls)),
+    path("", include(api_urls)),
     path("register", register_user),
     path("login", login_user),
     path("api-token-auth", obtain_auth_token),
+    path("live", live_updates),
+    path("live/token", live_token),
     path("api-auth", include("rest_framework.urls", namespace="rest_framework")),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -4,13 +4,6 @@ rm -rf driftnotesapi/migrations
 rm db.sqlite3
 python3 manage.py makemigrations driftnotesapi
 python3 manage.py migrate
-python3 manage.py loaddata user
-python3 manage.py loaddata category
-python3 manage.py loaddata token
-python3 manage.py loaddata trip
-python3 manage.py loaddata usertrip
-python3 manage.py loaddata day
-
-
-
-
+# Loads every fixture (users, categories, tokens, trips, usertrips, days, events)
+# with bulk inserts in one transaction
+python3 manage.py bulk_load